@@ -0,0 +1,59 @@
+# pyright: reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import SyntheticProjectSpec, generate_project  # noqa: E402
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("synthetic", "synthetic dbt project shape")
+    group.addoption("--synthetic-models", type=int, default=200, help="Number of models.")
+    group.addoption("--synthetic-depth", type=int, default=5, help="Number of DAG layers.")
+    group.addoption("--synthetic-columns", type=int, default=20, help="Columns per model.")
+    group.addoption(
+        "--synthetic-layout",
+        choices=["per-model", "per-folder", "single"],
+        default="per-folder",
+        help="Schema file layout.",
+    )
+    group.addoption("--synthetic-rounds", type=int, default=3, help="Rounds per benchmark.")
+
+
+@pytest.fixture(scope="session")
+def synthetic_spec(pytestconfig) -> SyntheticProjectSpec:
+    """コマンドライン オプションから合成プロジェクトの形状を作成します。"""
+    return SyntheticProjectSpec(
+        models=pytestconfig.getoption("synthetic_models"),
+        depth=pytestconfig.getoption("synthetic_depth"),
+        columns=pytestconfig.getoption("synthetic_columns"),
+        layout=pytestconfig.getoption("synthetic_layout"),
+    )
+
+
+@pytest.fixture(scope="session")
+def rounds(pytestconfig) -> int:
+    return pytestconfig.getoption("synthetic_rounds")
+
+
+@pytest.fixture(scope="session")
+def synthetic_project(tmp_path_factory, synthetic_spec) -> Path:
+    """読み取り専用のベンチマークで共有する合成プロジェクト。"""
+    return generate_project(tmp_path_factory.mktemp("synthetic"), synthetic_spec)
+
+
+@pytest.fixture
+def writable_project(tmp_path, synthetic_spec) -> Path:
+    """ディスクに書き込むベンチマーク用の、テストごとの合成プロジェクト。"""
+    return generate_project(tmp_path / "synthetic", synthetic_spec)
+
+
+@pytest.fixture(autouse=True)
+def _benchmark_info(request, synthetic_spec):
+    """プロジェクトの形状をベンチマークの JSON 出力に記録します。"""
+    if "benchmark" in request.fixturenames:
+        request.getfixturevalue("benchmark").extra_info.update(vars(synthetic_spec))
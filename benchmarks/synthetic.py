@@ -0,0 +1,174 @@
+"""ベンチマーク用の合成 dbt プロジェクトを生成します。
+
+モデルは `depth` 層の DAG に並び、各モデルは 1 つ前の層の `fan_in` 個のモデルを参照します。すべてのモデルが
+同じ列名を持つため、最初の層に書かれた説明は DAG 全体に継承されます。各モデルのテーブルは DuckDB に直接
+作成されるので、`dbt run` を実行しなくても列のイントロスペクションが機能します。
+"""
+
+from __future__ import annotations
+
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+
+import duckdb
+
+__all__ = ["SyntheticProjectSpec", "generate_project"]
+
+Layout = t.Literal["per-model", "per-folder", "single"]
+
+_TEMPLATES: dict[str, str] = {
+    "per-model": "{model}",
+    "per-folder": "_{parent}",
+    "single": "/schema",
+}
+_TYPES = ("integer", "varchar", "double", "date")
+_EXPRESSIONS = (
+    "cast(range as integer)",
+    "cast(range as varchar)",
+    "cast(range as double)",
+    "date '2020-01-01' + cast(range as integer)",
+)
+
+
+@dataclass(frozen=True)
+class SyntheticProjectSpec:
+    """合成プロジェクトの形状。"""
+
+    models: int = 200
+    """モデルの総数"""
+    depth: int = 5
+    """DAG の層の数。各層は `models/layer_<n>` フォルダーになります"""
+    columns: int = 20
+    """モデルごとの列数"""
+    layout: Layout = "per-folder"
+    """スキーマ ファイルの配置。モデルごと、フォルダーごと、または 1 ファイル"""
+    fan_in: int = 2
+    """各モデルが参照する上流モデルの数"""
+    misplaced: float = 0.1
+    """`organize` で移動が必要になるよう、レガシーな 1 ファイルに書かれるモデルの割合"""
+    threads: int = 4
+    """プロファイルのスレッド数"""
+
+    def layers(self) -> list[list[str]]:
+        """層ごとのモデル名を返します。"""
+        depth = max(1, min(self.depth, self.models))
+        return [
+            [f"m{layer}_{i}" for i in range(layer, self.models, depth)] for layer in range(depth)
+        ]
+
+
+def _column(i: int) -> str:
+    return f"col_{i}"
+
+
+def _model_sql(layer: int, index: int, upstream: list[str], spec: SyntheticProjectSpec) -> str:
+    if layer == 0:
+        selects = ",\n    ".join(
+            f"{_EXPRESSIONS[i % len(_EXPRESSIONS)]} as {_column(i)}" for i in range(spec.columns)
+        )
+        return f"select\n    {selects}\nfrom range({index + 10})\n"
+    parents = [
+        upstream[(index + k) % len(upstream)] for k in range(min(spec.fan_in, len(upstream)))
+    ]
+    joins = "\n".join(
+        f"join {{{{ ref('{parent}') }}}} as p{k} using ({_column(0)})"
+        for k, parent in enumerate(parents[1:], start=1)
+    )
+    selects = ",\n    ".join(f"p0.{_column(i)}" for i in range(spec.columns))
+    return f"select\n    {selects}\nfrom {{{{ ref('{parents[0]}') }}}} as p0\n{joins}\n"
+
+
+def _model_yaml(layer: int, name: str, spec: SyntheticProjectSpec) -> dict[str, t.Any]:
+    if layer == 0:
+        columns = [
+            {"name": _column(i), "description": f"Column {i} of the synthetic source."}
+            for i in range(spec.columns)
+        ]
+        return {"name": name, "description": f"Root model {name}.", "columns": columns}
+    # NOTE: only half of the columns are declared so that column injection has work to do
+    columns = [{"name": _column(i)} for i in range(0, spec.columns, 2)]
+    return {"name": name, "columns": columns}
+
+
+def _dump_yaml(path: Path, models: list[dict[str, t.Any]]) -> None:
+    lines = ["version: 2", "", "models:"]
+    for model in models:
+        lines.append(f"  - name: {model['name']}")
+        if "description" in model:
+            lines.append(f'    description: "{model["description"]}"')
+        lines.append("    columns:")
+        for column in model["columns"]:
+            lines.append(f"      - name: {column['name']}")
+            if "description" in column:
+                lines.append(f'        description: "{column["description"]}"')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _ = path.write_text("\n".join(lines) + "\n")
+
+
+def generate_project(root: Path, spec: SyntheticProjectSpec | None = None) -> Path:
+    """`root` に合成 dbt プロジェクトと DuckDB データベースを生成し、プロジェクトのパスを返します。
+
+    プロファイルも同じディレクトリに書かれるため、`--profiles-dir` にも同じパスを指定します。
+    """
+    spec = spec or SyntheticProjectSpec()
+    root.mkdir(parents=True, exist_ok=True)
+    database = root / "synthetic.duckdb"
+    _ = (root / "dbt_project.yml").write_text(
+        "\n".join([
+            'name: "synthetic"',
+            "config-version: 2",
+            'version: "0.1"',
+            'profile: "synthetic"',
+            'model-paths: ["models"]',
+            'target-path: "target"',
+            "models:",
+            "  synthetic:",
+            "    +materialized: table",
+            f'    +dbt-osmosis: "{_TEMPLATES[spec.layout]}"',
+            "",
+        ])
+    )
+    _ = (root / "profiles.yml").write_text(
+        "\n".join([
+            "synthetic:",
+            "  target: dev",
+            "  outputs:",
+            "    dev:",
+            "      type: duckdb",
+            f'      path: "{database}"',
+            f"      threads: {spec.threads}",
+            "",
+        ])
+    )
+
+    layers = spec.layers()
+    documents: dict[Path, list[dict[str, t.Any]]] = {}
+    misplaced_every = round(1 / spec.misplaced) if spec.misplaced > 0 else 0
+    models_dir = root / "models"
+    for layer, names in enumerate(layers):
+        folder = models_dir / f"layer_{layer}"
+        folder.mkdir(parents=True, exist_ok=True)
+        for index, name in enumerate(names):
+            upstream = layers[layer - 1] if layer else []
+            _ = (folder / f"{name}.sql").write_text(_model_sql(layer, index, upstream, spec))
+            if misplaced_every and index % misplaced_every == misplaced_every - 1:
+                path = models_dir / "_legacy.yml"
+            elif spec.layout == "per-model":
+                path = folder / f"{name}.yml"
+            elif spec.layout == "per-folder":
+                path = folder / f"_{folder.name}.yml"
+            else:
+                path = models_dir / "schema.yml"
+            documents.setdefault(path, []).append(_model_yaml(layer, name, spec))
+    for path, models in documents.items():
+        _dump_yaml(path, models)
+
+    with duckdb.connect(str(database)) as connection:
+        for names in layers:
+            for name in names:
+                columns = ", ".join(
+                    f"{_column(i)} {_TYPES[i % len(_TYPES)]}" for i in range(spec.columns)
+                )
+                _ = connection.execute(f"create or replace table main.{name} ({columns})")
+    return root
@@ -0,0 +1,166 @@
+# pyright: reportPrivateImportUsage=false, reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from dbt.artifacts.resources.types import NodeType
+
+pytest.importorskip("pytest_benchmark")
+
+from dbt_osmosis.core.concurrency import InstrumentedThreadPool  # noqa: E402
+from dbt_osmosis.core.config import (  # noqa: E402
+    DbtConfiguration,
+    DbtProjectContext,
+    _reload_manifest,
+    create_dbt_project_context,
+)
+from dbt_osmosis.core.introspection import _COLUMN_LIST_CACHE  # noqa: E402
+from dbt_osmosis.core.restructuring import (  # noqa: E402
+    _remove_models,
+    _remove_sources,
+    apply_restructure_operations,
+    iter_restructure_operations,
+)
+from dbt_osmosis.core.schema.reader import _YAML_BUFFER_CACHE  # noqa: E402
+from dbt_osmosis.core.settings import YamlRefactorContext, YamlRefactorSettings  # noqa: E402
+from dbt_osmosis.core.sync_operations import sync_node_to_yaml  # noqa: E402
+from dbt_osmosis.core.transforms import (  # noqa: E402
+    TransformPipeline,
+    inherit_upstream_column_knowledge,
+    inject_missing_columns,
+    remove_columns_not_in_database,
+    sort_columns_as_configured,
+    synchronize_data_types,
+)
+
+
+def _config(project_dir: Path) -> DbtConfiguration:
+    return DbtConfiguration(project_dir=str(project_dir), profiles_dir=str(project_dir))
+
+
+def _fresh_context(
+    project: DbtProjectContext, pool: InstrumentedThreadPool, dry_run: bool = True
+) -> YamlRefactorContext:
+    """マニフェストを再読み込みし、キャッシュを空にした新しいコンテキストを作成します。
+
+    ラウンドごとにスレッド プールを作成するとスレッドが解放されずに残るため、プールは共有します。
+    """
+    _reload_manifest(project)
+    _COLUMN_LIST_CACHE.clear()
+    _YAML_BUFFER_CACHE.clear()
+    return YamlRefactorContext(project, settings=YamlRefactorSettings(dry_run=dry_run), pool=pool)
+
+
+def _document() -> TransformPipeline:
+    return inject_missing_columns >> inherit_upstream_column_knowledge >> sort_columns_as_configured
+
+
+def _refactor() -> TransformPipeline:
+    return (
+        inject_missing_columns
+        >> remove_columns_not_in_database
+        >> inherit_upstream_column_knowledge
+        >> sort_columns_as_configured
+        >> synchronize_data_types
+    )
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = InstrumentedThreadPool()
+    yield pool
+    pool.shutdown(wait=True)
+
+
+@pytest.fixture(scope="module")
+def project(synthetic_project) -> DbtProjectContext:
+    return create_dbt_project_context(_config(synthetic_project))
+
+
+def test_manifest_load(benchmark, synthetic_project, rounds):
+    def setup():
+        # NOTE: measure a full parse, not a partial parse against the previous round's state
+        (synthetic_project / "target" / "partial_parse.msgpack").unlink(missing_ok=True)
+        return (_config(synthetic_project),), {}
+
+    _ = benchmark.pedantic(create_dbt_project_context, setup=setup, rounds=rounds)
+
+
+def test_document(benchmark, project, pool, rounds):
+    _ = benchmark.pedantic(
+        lambda context: _document()(context=context),
+        setup=lambda: ((_fresh_context(project, pool),), {}),
+        rounds=rounds,
+    )
+
+
+def test_organize(benchmark, project, pool, rounds):
+    _ = benchmark.pedantic(
+        lambda context: apply_restructure_operations(context, iter_restructure_operations(context)),
+        setup=lambda: ((_fresh_context(project, pool),), {}),
+        rounds=rounds,
+    )
+
+
+def test_refactor(benchmark, project, pool, rounds):
+    def refactor(context: YamlRefactorContext) -> None:
+        _ = apply_restructure_operations(context, iter_restructure_operations(context))
+        _ = _refactor()(context=context)
+
+    _ = benchmark.pedantic(
+        refactor, setup=lambda: ((_fresh_context(project, pool),), {}), rounds=rounds
+    )
+
+
+def test_commit(benchmark, writable_project, pool, rounds):
+    """YAML への書き込みフェーズだけを計測します。各ラウンドの前に元の YAML を復元します。"""
+    originals = {path: path.read_bytes() for path in writable_project.rglob("*.yml")}
+    project = create_dbt_project_context(_config(writable_project))
+
+    def setup():
+        for path, content in originals.items():
+            _ = path.write_bytes(content)
+        context = _fresh_context(project, pool, dry_run=False)
+        _ = TransformPipeline(_document().operations, commit_mode="none")(context=context)
+        return (context,), {}
+
+    _ = benchmark.pedantic(
+        lambda context: sync_node_to_yaml(context, commit=True), setup=setup, rounds=rounds
+    )
+
+
+def test_remove_superseded_entries(benchmark, rounds):
+    """大きな YAML ドキュメントから置き換えられたエントリを削除する処理を計測します。
+
+    削除はエントリ数に対して線形です。エントリ数 x ノード数の走査に戻ると、この規模では数秒かかります。
+    """
+    size = 20_000
+
+    def node(resource_type: NodeType, name: str, source_name: str | None = None):
+        return SimpleNamespace(resource_type=resource_type, name=name, source_name=source_name)
+
+    nodes = [node(NodeType.Model, f"m{i}") for i in range(0, size, 2)]
+    nodes += [
+        node(NodeType.Source, f"t{j}", f"src{i}")
+        for i in range(0, size // 20, 2)
+        for j in range(20)
+    ]
+
+    def setup():
+        doc = {
+            "models": [{"name": f"m{i}"} for i in range(size)],
+            "sources": [
+                {"name": f"src{i}", "tables": [{"name": f"t{j}"} for j in range(20)]}
+                for i in range(size // 20)
+            ],
+        }
+        return (doc,), {}
+
+    def remove(doc) -> None:
+        _remove_models(doc, nodes)
+        _remove_sources(doc, nodes)
+        assert len(doc["models"]) == size // 2
+        assert len(doc["sources"]) == size // 40
+
+    _ = benchmark.pedantic(remove, setup=setup, rounds=rounds)
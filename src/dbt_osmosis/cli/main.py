@@ -7,15 +7,18 @@ import io
 import subprocess
 import sys
 import typing as t
+from itertools import chain
 from pathlib import Path
 
 import click
 
 import dbt_osmosis.core.logger as logger
+import dbt_osmosis.core.tracing as tracing
 from dbt_osmosis.core.osmosis import (
     DbtConfiguration,
     YamlRefactorContext,
     YamlRefactorSettings,
+    apply_restructure_operations,
     apply_restructure_plan,
     compile_sql_code,
     create_dbt_project_context,
@@ -23,9 +26,14 @@ from dbt_osmosis.core.osmosis import (
     discover_profiles_dir,
     discover_project_dir,
     draft_restructure_delta_plan,
+    dump_restructure_plan,
     execute_sql_code,
     inherit_upstream_column_knowledge,
     inject_missing_columns,
+    iter_restructure_operations,
+    iter_restructure_plan_file,
+    iter_source_bootstrap_operations,
+    load_restructure_plan,
     remove_columns_not_in_database,
     sort_columns_as_configured,
     synchronize_data_types,
@@ -192,13 +200,34 @@ def yaml_opts(func: t.Callable[P, T]) -> t.Callable[P, T]:
         is_flag=True,
         help="Allows running the program without a database connection, it is recommended to use the --catalog-path option if using this.",
     )
+    @click.option(
+        "--trace-out",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Record per-node and per-operation timings and write them to this file. Chrome traces open in chrome://tracing or https://ui.perfetto.dev.",
+    )
+    @click.option(
+        "--trace-format",
+        type=click.Choice(["chrome", "otel"]),
+        default="chrome",
+        help="The format of the --trace-out file: Chrome trace events or OpenTelemetry (OTLP/JSON). Default is chrome.",
+    )
     @functools.wraps(func)
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        # NOTE: Remove the trace options from kwargs so they are not passed to the settings.
+        trace_out = kwargs.pop("trace_out", None)
+        trace_format = t.cast(tracing.TraceFormat, kwargs.pop("trace_format", "chrome"))
         if kwargs.get("disable_introspection") and not kwargs.get("catalog_path"):
             logger.warning(
                 ":construction: You have disabled introspection without providing a catalog path. This will result in some features not working as expected."
             )
-        return func(*args, **kwargs)
+        if not trace_out:
+            return func(*args, **kwargs)
+        _ = tracing.start_tracing()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if tracer := tracing.stop_tracing():
+                _ = tracer.export(Path(str(trace_out)), trace_format)
 
     return wrapper
 
@@ -274,6 +303,21 @@ def yaml_opts(func: t.Callable[P, T]) -> t.Callable[P, T]:
     is_flag=True,
     help="Automatically apply the restructure plan without confirmation.",
 )
+@click.option(
+    "--checkpoint",
+    is_flag=True,
+    help="Record progress in a journal in the target directory so that an interrupted run can be continued with --resume. Ignored with --dry-run.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume an interrupted --checkpoint run from the journal in the target directory, skipping nodes that were already processed. Implies --checkpoint.",
+)
+@click.option(
+    "--processes",
+    type=click.INT,
+    help="Run the transforms in this many worker processes, sharded by schema file. Speeds up CPU-bound phases beyond what --threads can. Inheritance runs in the workers one DAG depth at a time; synthesis runs in the parent process. Requires the fork start method.",
+)
 @click.option(
     "--synthesize",
     is_flag=True,
@@ -320,9 +364,13 @@ def refactor(
         settings.vars = context.yaml_handler.load(io.StringIO(vars))  # pyright: ignore[reportUnknownMemberType]
 
     create_missing_source_yamls(context=context)
-    apply_restructure_plan(
-        context=context, plan=draft_restructure_delta_plan(context), confirm=not auto_apply
-    )
+    if auto_apply:
+        # NOTE: nothing to confirm, so stream operations straight to disk with bounded memory
+        _ = apply_restructure_operations(context, iter_restructure_operations(context))
+    else:
+        apply_restructure_plan(
+            context=context, plan=draft_restructure_delta_plan(context), confirm=True
+        )
 
     transform = (
         inject_missing_columns
@@ -349,6 +397,16 @@ def refactor(
     is_flag=True,
     help="If specified, will automatically apply the restructure plan without confirmation.",
 )
+@click.option(
+    "--plan-out",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the restructure plan to this file (JSON lines) instead of applying it. Nothing in the project is modified, missing source YAMLs are recorded in the plan. Apply it later with --plan-in.",
+)
+@click.option(
+    "--plan-in",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Apply a restructure plan previously written with --plan-out instead of computing a new one. Refuses the plan if any file it touches changed since it was written.",
+)
 def organize(
     target: str | None = None,
     project_dir: str | None = None,
@@ -359,6 +417,8 @@ def organize(
     auto_apply: bool = False,
     threads: int | None = None,
     disable_introspection: bool = False,
+    plan_out: str | None = None,
+    plan_in: str | None = None,
     **kwargs: t.Any,
 ) -> None:
     """設定に基づいてスキーマymlを整理し、ドキュメント化されていないモデルを挿入します。
@@ -367,6 +427,8 @@ def organize(
     このコマンドは、`dbt_project.yml` に概説されているようにプロジェクト内のスキーマymlを準拠させ、
     ドキュメント化されていないdbtモデルをブートストラップします。
     """
+    if plan_in and plan_out:
+        raise click.UsageError("--plan-in and --plan-out are mutually exclusive.")
     logger.info(":water_wave: Executing dbt-osmosis\n")
     settings = DbtConfiguration(
         project_dir=t.cast(str, project_dir),
@@ -385,10 +447,31 @@ def organize(
     if vars:
         settings.vars = context.yaml_handler.load(io.StringIO(vars))  # pyright: ignore[reportUnknownMemberType]
 
-    create_missing_source_yamls(context=context)
-    apply_restructure_plan(
-        context=context, plan=draft_restructure_delta_plan(context), confirm=not auto_apply
-    )
+    if plan_in:
+        # NOTE: the plan already holds resolved paths, so skip source bootstrapping and drafting
+        if auto_apply:
+            _ = apply_restructure_operations(
+                context, iter_restructure_plan_file(context, Path(plan_in))
+            )
+        else:
+            apply_restructure_plan(
+                context=context, plan=load_restructure_plan(context, Path(plan_in)), confirm=True
+            )
+    elif plan_out:
+        # NOTE: record the source bootstrap in the plan so that computing a plan writes nothing
+        operations = chain(
+            iter_source_bootstrap_operations(context), iter_restructure_operations(context)
+        )
+        _ = dump_restructure_plan(context, operations, Path(plan_out))
+    else:
+        create_missing_source_yamls(context=context)
+        if auto_apply:
+            # NOTE: nothing to confirm, so stream operations straight to disk with bounded memory
+            _ = apply_restructure_operations(context, iter_restructure_operations(context))
+        else:
+            apply_restructure_plan(
+                context=context, plan=draft_restructure_delta_plan(context), confirm=True
+            )
 
     if check and context.mutated:
         exit(1)
@@ -460,6 +543,21 @@ def organize(
     is_flag=True,
     help="Output yaml file columns and data types in lowercase if possible.",
 )
+@click.option(
+    "--checkpoint",
+    is_flag=True,
+    help="Record progress in a journal in the target directory so that an interrupted run can be continued with --resume. Ignored with --dry-run.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume an interrupted --checkpoint run from the journal in the target directory, skipping nodes that were already processed. Implies --checkpoint.",
+)
+@click.option(
+    "--processes",
+    type=click.INT,
+    help="Run the transforms in this many worker processes, sharded by schema file. Speeds up CPU-bound phases beyond what --threads can. Inheritance runs in the workers one DAG depth at a time; synthesis runs in the parent process. Requires the fork start method.",
+)
 @click.option(
     "--synthesize",
     is_flag=True,
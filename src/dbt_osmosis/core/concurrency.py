@@ -0,0 +1,252 @@
+"""ロックとスレッド プールの競合メトリクス。
+
+`InstrumentedLock` は待ち時間、保持時間、待機中のスレッド数を、`InstrumentedThreadPool` はキューの深さ、
+キュー内での待ち時間、ワーカーの稼働率を記録します。競合のない取得では時刻を 2 回読むだけなので、
+本番環境で常に有効にしておけます。`--threads` を増やして効果があるかどうかの判断に使用します。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import dbt_osmosis.core.logger as logger
+
+__all__ = [
+    "InstrumentedLock",
+    "InstrumentedThreadPool",
+    "LockLike",
+    "after_all",
+    "log_concurrency_summary",
+]
+
+T = t.TypeVar("T")
+
+
+class InstrumentedLock:
+    """取得までの待ち時間、保持時間、待機中のスレッド数 (キューの深さ) を記録する `threading.Lock`。
+
+    `threading.Lock` と同じように `with` 文や `acquire`/`release` で使用できます。
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._acquired_at = 0.0
+        self._waiting = 0
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+        self.peak_waiting = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        """ロックを取得します。引数は `threading.Lock.acquire` と同じです。"""
+        if self._lock.acquire(False):
+            waited = 0.0
+        elif not blocking:
+            return False
+        else:
+            with self._stats_lock:
+                self._waiting += 1
+                self.peak_waiting = max(self.peak_waiting, self._waiting)
+            started = time.perf_counter()
+            try:
+                if not self._lock.acquire(True, timeout):
+                    return False
+            finally:
+                with self._stats_lock:
+                    self._waiting -= 1
+            waited = time.perf_counter() - started
+        # NOTE: the counters below are only written by the lock owner, so they need no extra lock
+        self._acquired_at = time.perf_counter()
+        self.acquisitions += 1
+        if waited:
+            self.contended += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return True
+
+    def release(self) -> None:
+        """ロックを解放します。"""
+        held = time.perf_counter() - self._acquired_at
+        self.hold_seconds += held
+        self.max_hold_seconds = max(self.max_hold_seconds, held)
+        self._lock.release()
+
+    def locked(self) -> bool:
+        """ロックが取得されているかどうかを返します。"""
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *_: t.Any) -> None:
+        self.release()
+
+    def stats(self) -> dict[str, t.Any]:
+        """記録したメトリクスを返します。時間の単位は秒です。"""
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+            "hold_seconds": self.hold_seconds,
+            "max_hold_seconds": self.max_hold_seconds,
+            "waiting": self._waiting,
+            "peak_waiting": self.peak_waiting,
+        }
+
+    def __repr__(self) -> str:  # pyright: ignore[reportImplicitOverride]
+        return f"<InstrumentedLock {self.name!r} locked={self.locked()}>"
+
+
+LockLike = t.Union[threading.Lock, InstrumentedLock]
+"""`threading.Lock` または `InstrumentedLock`。"""
+
+
+class InstrumentedThreadPool(ThreadPoolExecutor):
+    """キューの深さ、キュー内での待ち時間、実行時間を記録する `ThreadPoolExecutor`。"""
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._first_submit: float | None = None
+        self._last_done: float | None = None
+        self.tasks = 0
+        self.queued = 0
+        self.active = 0
+        self.peak_queued = 0
+        self.peak_active = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    @property
+    def max_workers(self) -> int:
+        """ワーカー スレッドの最大数。"""
+        return self._max_workers
+
+    def submit(  # pyright: ignore[reportIncompatibleMethodOverride]
+        self, fn: t.Callable[..., T], /, *args: t.Any, **kwargs: t.Any
+    ) -> Future[T]:
+        submitted = time.perf_counter()
+        with self._stats_lock:
+            if self._first_submit is None:
+                self._first_submit = submitted
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            future = super().submit(self._measure, submitted, fn, *args, **kwargs)
+        except BaseException:
+            with self._stats_lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+    def _forget_cancelled(self, future: Future[t.Any]) -> None:
+        if future.cancelled():
+            with self._stats_lock:
+                self.queued -= 1
+
+    def _measure(
+        self, submitted: float, fn: t.Callable[..., T], *args: t.Any, **kwargs: t.Any
+    ) -> T:
+        started = time.perf_counter()
+        waited = started - submitted
+        with self._stats_lock:
+            self.queued -= 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self.queue_wait_seconds += waited
+            self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self.active -= 1
+                self.tasks += 1
+                self.busy_seconds += finished - started
+                self._last_done = finished
+
+    def stats(self) -> dict[str, t.Any]:
+        """記録したメトリクスを返します。
+
+        `utilization` は最初の投入から最後の完了までの間にワーカーが稼働していた割合です。
+        """
+        with self._stats_lock:
+            elapsed = (
+                self._last_done - self._first_submit
+                if self._first_submit is not None and self._last_done is not None
+                else 0.0
+            )
+            workers = self._max_workers
+            return {
+                "workers": workers,
+                "tasks": self.tasks,
+                "queued": self.queued,
+                "active": self.active,
+                "peak_queued": self.peak_queued,
+                "peak_active": self.peak_active,
+                "queue_wait_seconds": self.queue_wait_seconds,
+                "max_queue_wait_seconds": self.max_queue_wait_seconds,
+                "busy_seconds": self.busy_seconds,
+                "utilization": self.busy_seconds / (elapsed * workers) if elapsed else 0.0,
+            }
+
+
+def after_all(deps: t.Sequence[Future[t.Any]], callback: t.Callable[[], None]) -> None:
+    """すべての `deps` が完了した時点で `callback` を呼び出します。呼び出し元のスレッドはブロックしません。
+
+    `callback` は最後に完了した Future の完了コールバックとして実行されます。依存関係の順に
+    スレッド プールへ投入する場合に使用し、ワーカーが他の Future の完了を待ってブロックしないようにします。
+    """
+    if not deps:
+        callback()
+        return
+    remaining = len(deps)
+    lock = threading.Lock()
+
+    def _on_done(_: Future[t.Any]) -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            ready = remaining == 0
+        if ready:
+            callback()
+
+    for dep in deps:
+        dep.add_done_callback(_on_done)
+
+
+def log_concurrency_summary(metrics: t.Mapping[str, t.Any]) -> None:
+    """`YamlRefactorContext.concurrency_metrics` の結果をログに出力します。"""
+    if pool := metrics.get("pool"):
+        logger.info(
+            ":bar_chart: Pool => %s tasks on %s workers, peak queued %s, avg queue wait %.3fs, utilization %.0f%%",
+            pool["tasks"],
+            pool["workers"],
+            pool["peak_queued"],
+            pool["queue_wait_seconds"] / pool["tasks"] if pool["tasks"] else 0.0,
+            pool["utilization"] * 100,
+        )
+    for name, lock in metrics.get("locks", {}).items():
+        if not lock["acquisitions"]:
+            continue
+        logger.info(
+            ":bar_chart: Lock %s => %s acquisitions, %s contended, waited %.3fs (max %.3fs), held %.3fs, peak waiting %s",
+            name,
+            lock["acquisitions"],
+            lock["contended"],
+            lock["wait_seconds"],
+            lock["max_wait_seconds"],
+            lock["hold_seconds"],
+            lock["peak_waiting"],
+        )
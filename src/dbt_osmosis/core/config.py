@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import argparse
 import importlib
+import json
 import os
 import threading
 import time
 import typing as t
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from pathlib import Path
 from threading import get_ident
@@ -13,7 +15,7 @@ from types import ModuleType
 
 import dbt.flags as dbt_flags
 from dbt.adapters.base.impl import BaseAdapter
-from dbt.adapters.factory import get_adapter, register_adapter
+from dbt.adapters.factory import get_adapter, register_adapter, reset_adapters
 from dbt.config.runtime import RuntimeConfig
 from dbt.context.providers import generate_runtime_macro_context
 from dbt.contracts.graph.manifest import Manifest
@@ -26,6 +28,7 @@ from dbt_common.clients.system import get_env
 from dbt_common.context import set_invocation_context
 
 import dbt_osmosis.core.logger as logger
+from dbt_osmosis.core.concurrency import InstrumentedLock
 
 __all__ = [
     "discover_project_dir",
@@ -33,6 +36,8 @@ __all__ = [
     "DbtConfiguration",
     "DbtProjectContext",
     "create_dbt_project_context",
+    "get_dbt_project_context",
+    "clear_dbt_project_contexts",
     "_reload_manifest",
 ]
 
@@ -144,8 +149,12 @@ class DbtProjectContext:
     connection_ttl: float = 3600.0
     """DB 接続をリサイクルする前に接続を維持する最大時間（秒）。主に非常に長い実行時に役立ちます。"""
 
-    _adapter_mutex: threading.Lock = field(default_factory=threading.Lock, init=False)
-    _manifest_mutex: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _adapter_mutex: InstrumentedLock = field(
+        default_factory=lambda: InstrumentedLock("adapter_mutex"), init=False
+    )
+    _manifest_mutex: InstrumentedLock = field(
+        default_factory=lambda: InstrumentedLock("manifest_mutex"), init=False
+    )
     _adapter: BaseAdapter | None = field(default=None, init=False)
     _connection_created_at: dict[int, float] = field(default_factory=dict, init=False)
 
@@ -164,12 +173,18 @@ class DbtProjectContext:
         """アダプタ インスタンスを取得し、
         現在のインスタンスの有効期限が切れている場合は新しいインスタンスを作成します。"""
         with self._adapter_mutex:
-            if not self._adapter:
-                logger.info(":wrench: Instantiating new adapter because none is currently set.")
+            if not self._adapter or not _ADAPTERS.is_registered(self._adapter):
+                if self._adapter:
+                    logger.info(
+                        ":wrench: Re-registering the adapter, another target swapped it out."
+                    )
+                else:
+                    logger.info(":wrench: Instantiating new adapter because none is currently set.")
                 adapter = _instantiate_adapter(self.runtime_cfg)
                 adapter.set_macro_resolver(self.manifest)
                 _ = adapter.acquire_connection()
                 self._adapter = adapter
+                self._connection_created_at.clear()
                 self._connection_created_at[get_ident()] = time.time()
                 logger.info(
                     ":wrench: Successfully acquired new adapter connection for thread => %s",
@@ -186,8 +201,18 @@ class DbtProjectContext:
                 self._connection_created_at[get_ident()] = time.time()
         return self._adapter
 
+    @contextmanager
+    def adapter_scope(self) -> t.Iterator[None]:
+        """この中では、dbt に登録されているアダプターがこのコンテキストのものであることが保証されます。
+
+        コンパイルやマクロの実行など、dbt が内部で `get_adapter` を呼び出す処理はこの中で行います。
+        別のターゲットのコンテキストは、スコープを抜けるまでアダプターを入れ替えられません。
+        """
+        with _ADAPTERS.lease(self.runtime_cfg):
+            yield
+
     @property
-    def manifest_mutex(self) -> threading.Lock:
+    def manifest_mutex(self) -> InstrumentedLock:
         """スレッドの安全性を確保するためにマニフェスト ミューテックスを返します。"""
         return self._manifest_mutex
 
@@ -217,12 +242,76 @@ def _add_cross_project_references(
     return manifest
 
 
+def _adapter_identity(config: t.Any) -> tuple[str, str, str]:
+    return (str(config.project_root), str(config.profile_name), str(config.target_name))
+
+
+def _registered_identity(config: t.Any) -> tuple[str, str, str] | None:
+    try:
+        return _adapter_identity(get_adapter(config).config)
+    except KeyError:
+        return None
+
+
+class _AdapterRegistry:
+    """dbt に登録されるアダプターを、アダプターの種類ごとに 1 つだけに保つレジストリ。
+
+    dbt はパース、コンパイル、マクロの実行時に `get_adapter(config)` でアダプターを引きますが、これは
+    種類ごとに登録された 1 つのアダプターを返します。別のプロジェクトやターゲットのコンテキストが
+    アダプターを必要とすると、使用中のリースがすべて返されるのを待ってから、`reset_adapters` と
+    `register_adapter` でそのターゲットのアダプターに入れ替えます。
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._leases: dict[tuple[str, str, str], int] = {}
+        self.swaps = 0
+
+    @contextmanager
+    def lease(self, runtime_config: RuntimeConfig) -> t.Iterator[None]:
+        """リースを保持している間、ランタイム構成のアダプターが dbt に登録されていることを保証します。"""
+        identity = _adapter_identity(runtime_config)
+        with self._cond:
+            while (registered := _registered_identity(runtime_config)) != identity and any(
+                self._leases.values()
+            ):
+                _ = self._cond.wait()
+            if registered != identity:
+                if registered is not None:
+                    logger.info(
+                        ":arrows_counterclockwise: Swapping the registered adapter to target => %s",
+                        runtime_config.target_name,
+                    )
+                    reset_adapters()
+                    self.swaps += 1
+                register_adapter(runtime_config, get_mp_context())
+            self._leases[identity] = self._leases.get(identity, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._leases[identity] -= 1
+                self._cond.notify_all()
+
+    @staticmethod
+    def is_registered(adapter: t.Any) -> bool:
+        """アダプターが現在 dbt に登録されているものかどうかを返します。"""
+        try:
+            return get_adapter(adapter.config) is adapter
+        except KeyError:
+            return False
+
+
+_ADAPTERS = _AdapterRegistry()
+
+
 def _instantiate_adapter(runtime_config: RuntimeConfig) -> BaseAdapter:
-    """ランタイム構成に基づいて dbt アダプターをインスタンス化します。"""
+    """ランタイム構成のアダプターを dbt に登録し、dbt-osmosis 用に設定して返します。"""
     logger.debug(":mag: Registering adapter for runtime config => %s", runtime_config)
-    adapter = get_adapter(runtime_config)
-    adapter.set_macro_context_generator(t.cast(t.Any, generate_runtime_macro_context))
-    adapter.connections.set_connection_name("dbt-osmosis")
+    with _ADAPTERS.lease(runtime_config):
+        adapter = get_adapter(runtime_config)
+        adapter.set_macro_context_generator(t.cast(t.Any, generate_runtime_macro_context))
+        adapter.connections.set_connection_name("dbt-osmosis")
     logger.debug(":hammer_and_wrench: Adapter instantiated => %s", adapter)
     return t.cast(BaseAdapter, t.cast(t.Any, adapter))
 
@@ -235,13 +324,13 @@ def create_dbt_project_context(config: DbtConfiguration) -> DbtProjectContext:
     runtime_cfg = RuntimeConfig.from_args(args)
 
     logger.info(":bookmark_tabs: Registering adapter as part of project context creation.")
-    register_adapter(runtime_cfg, get_mp_context())
-
-    loader = ManifestLoader(
-        runtime_cfg,
-        runtime_cfg.load_dependencies(),
-    )
-    manifest = loader.load()
+    # NOTE: parsing looks the adapter up through dbt, so this target's adapter must be the registered one
+    with _ADAPTERS.lease(runtime_cfg):
+        loader = ManifestLoader(
+            runtime_cfg,
+            runtime_cfg.load_dependencies(),
+        )
+        manifest = loader.load()
 
     try:
         dbt_loom = importlib.import_module("dbt_loom")
@@ -274,10 +363,62 @@ def create_dbt_project_context(config: DbtConfiguration) -> DbtProjectContext:
 def _reload_manifest(context: DbtProjectContext) -> None:
     """dbt プロジェクトマニフェストを再読み込みします。ミューテーションの取得に役立ちます。"""
     logger.info(":arrows_counterclockwise: Reloading the dbt project manifest!")
-    loader = ManifestLoader(context.runtime_cfg, context.runtime_cfg.load_dependencies())
-    manifest = loader.load()
+    with context.adapter_scope():
+        loader = ManifestLoader(context.runtime_cfg, context.runtime_cfg.load_dependencies())
+        manifest = loader.load()
     manifest.build_flat_graph()
     if not context.config.disable_introspection:
         context.adapter.set_macro_resolver(manifest)
     context.manifest = manifest
     logger.info(":white_check_mark: Manifest reloaded => %s", context.manifest.metadata)
+
+
+_CONTEXT_REGISTRY: dict[tuple[str, ...], DbtProjectContext] = {}
+_CONTEXT_REGISTRY_LOCK = threading.Lock()
+
+
+def _context_key(
+    config: DbtConfiguration, profile: str | None, target: str | None
+) -> tuple[str, ...]:
+    return (
+        str(Path(config.project_dir).resolve()),
+        str(Path(config.profiles_dir).resolve()),
+        profile or "",
+        target or "",
+        json.dumps(config.vars, sort_keys=True, default=str),
+        str(config.disable_introspection),
+    )
+
+
+def get_dbt_project_context(config: DbtConfiguration, reload: bool = False) -> DbtProjectContext:
+    """プロセス全体で共有される DbtProjectContext を取得します。
+
+    コンテキストはプロジェクト ディレクトリ、プロファイル ディレクトリ、プロファイル、ターゲット、vars を
+    キーとして登録され、同じキーでの 2 回目以降の呼び出しではパース済みのマニフェストとアダプターが
+    再利用されます。`reload` が True の場合は登録済みのコンテキストのマニフェストを再読み込みします。
+    """
+    args = config_to_namespace(config)
+    key = _context_key(config, args.profile, args.target)
+    with _CONTEXT_REGISTRY_LOCK:
+        context = _CONTEXT_REGISTRY.get(key)
+        if context is None:
+            context = create_dbt_project_context(config)
+            _CONTEXT_REGISTRY[key] = context
+            # NOTE: leaving out the profile or target resolves to the same context as naming them
+            for profile in {args.profile, context.runtime_cfg.profile_name}:
+                for target in {args.target, context.runtime_cfg.target_name}:
+                    _ = _CONTEXT_REGISTRY.setdefault(_context_key(config, profile, target), context)
+        elif reload:
+            _reload_manifest(context)
+        else:
+            logger.info(
+                ":recycle: Reusing the dbt project context for target => %s",
+                context.runtime_cfg.target_name,
+            )
+    return context
+
+
+def clear_dbt_project_contexts() -> None:
+    """登録済みの DbtProjectContext をすべて破棄します。"""
+    with _CONTEXT_REGISTRY_LOCK:
+        _CONTEXT_REGISTRY.clear()
@@ -15,6 +15,7 @@ from dbt.contracts.results import CatalogArtifact, CatalogResults, ColumnMetadat
 from dbt.task.docs.generate import Catalog
 
 import dbt_osmosis.core.logger as logger
+import dbt_osmosis.core.tracing as tracing
 
 __all__ = [
     "_find_first",
@@ -239,14 +240,19 @@ def get_columns(
 
     try:
         logger.info(":mag: Introspecting columns in warehouse for => %s", rendered_relation)
-        for column in t.cast(
-            t.Iterable[BaseColumn], context.project.adapter.get_columns_in_relation(relation)
+        with (
+            tracing.span("Introspect columns", "introspection", relation=rendered_relation),
+            context.project.adapter_scope(),
         ):
+            warehouse_columns = context.project.adapter.get_columns_in_relation(relation)
+        for column in t.cast(t.Iterable[BaseColumn], warehouse_columns):
             process_column(column)
     except Exception as ex:
         logger.warning(":warning: Could not introspect columns for %s: %s", rendered_relation, ex)
 
     _COLUMN_LIST_CACHE[rendered_relation] = normalized_columns
+    if (journal := getattr(context, "journal", None)) is not None:
+        journal.record_columns(rendered_relation, normalized_columns)
     return normalized_columns
 
 
@@ -282,10 +288,11 @@ def _generate_catalog(context: t.Any) -> CatalogResults | None:
         ],
         [t.cast(t.Any, node) for node in context.manifest.sources.values()],  # pyright: ignore[reportInvalidCast]
     )
-    table, exceptions = context.adapter.get_filtered_catalog(
-        catalogable_nodes,
-        context.manifest.get_used_schemas(),  # pyright: ignore[reportArgumentType]
-    )
+    with context.adapter_scope():
+        table, exceptions = context.adapter.get_filtered_catalog(
+            catalogable_nodes,
+            context.manifest.get_used_schemas(),  # pyright: ignore[reportArgumentType]
+        )
 
     logger.debug(":mag_right: Building catalog from returned table => %s", table)
     catalog = Catalog(
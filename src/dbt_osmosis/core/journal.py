@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+from dbt.contracts.graph.nodes import ColumnInfo, ResultNode
+from dbt.contracts.results import ColumnMetadata
+
+import dbt_osmosis.core.logger as logger
+
+__all__ = [
+    "JOURNAL_FILE_NAME",
+    "RefactorJournal",
+    "get_journal_path",
+    "project_fingerprint",
+    "yaml_state",
+]
+
+JOURNAL_FILE_NAME = "dbt_osmosis_journal.jsonl"
+"""ターゲット ディレクトリ内に作成されるジャーナル ファイルの名前。"""
+
+_JOURNAL_FORMAT = "dbt-osmosis-journal"
+_JOURNAL_FORMAT_VERSION = 3
+
+
+def get_journal_path(context: t.Any) -> Path:
+    """dbt プロジェクトのターゲット ディレクトリ内のジャーナル ファイルのパスを返します。"""
+    runtime_cfg = context.project.runtime_cfg
+    return Path(runtime_cfg.project_root) / runtime_cfg.target_path / JOURNAL_FILE_NAME
+
+
+def project_fingerprint(context: t.Any) -> str:
+    """対象ノードのチェックサムから計算したハッシュを返します。
+
+    ジャーナルの作成後に SQL が変更されていないかどうかの照合に使用します。YAML は `atomic` コミットで
+    実行中にも書き込まれるため、ここには含めず `yaml_state` として別に記録します。
+    """
+    from dbt_osmosis.core.node_filters import _iter_candidate_nodes
+
+    entries: list[str] = []
+    for uid, node in _iter_candidate_nodes(context):
+        checksum = getattr(getattr(node, "checksum", None), "checksum", "")
+        entries.append(f"{uid}:{checksum}")
+    return hashlib.sha256("\n".join(sorted(entries)).encode()).hexdigest()
+
+
+def yaml_state(context: t.Any) -> dict[str, str]:
+    """対象ノードのスキーマ YAML ファイルのパスと、その内容のハッシュの辞書を返します。"""
+    from dbt_osmosis.core.node_filters import _iter_candidate_nodes
+    from dbt_osmosis.core.path_management import get_current_yaml_path
+
+    paths: set[Path] = set()
+    for _, node in _iter_candidate_nodes(context):
+        if (path := get_current_yaml_path(context, node)) is not None:
+            paths.add(path)
+    return {
+        str(path): hashlib.sha256(path.read_bytes() if path.is_file() else b"").hexdigest()
+        for path in sorted(paths)
+    }
+
+
+class RefactorJournal:
+    """変換パイプラインのノードごとの完了状態と収集した列メタデータを記録する追記専用のジャーナル。
+
+    各変換操作がノードを処理し終えるたびに、そのノードの列と説明のスナップショットを 1 行追記します。
+    実行が途中で失敗した場合、次回の `--resume` 実行では記録済みの (操作, ノード) の組をスキップし、
+    スナップショットをノードに復元します。イントロスペクトした列も記録されるため、再度ウェアハウスに問い合わせる必要はありません。
+    YAML ファイルの状態はヘッダーと、実行中に YAML をコミットするたびに追記される行に記録され、
+    再開時には最後に記録された状態と現在のファイルが一致する場合にだけジャーナルを使用します。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        operations: t.Sequence[str],
+        fingerprint: str = "",
+        yaml: dict[str, str] | None = None,
+    ) -> None:
+        self.path = path
+        self.operations = list(operations)
+        self.fingerprint = fingerprint
+        self.yaml = yaml or {}
+        self._lock = threading.Lock()
+        self._completed: dict[tuple[str, str], dict[str, t.Any]] = {}
+        self._columns: dict[str, dict[str, t.Any]] = {}
+        self._handle: t.TextIO | None = None
+
+    @classmethod
+    def open(
+        cls, context: t.Any, operations: t.Sequence[str], resume: bool = False
+    ) -> RefactorJournal:
+        """ジャーナルを開きます。`resume` が真の場合は既存のエントリを読み込み、そうでない場合は新規に作成します。
+
+        既存のジャーナルは、プロジェクト、操作、`project_fingerprint` がすべて一致し、YAML ファイルが
+        最後に記録された状態から変更されていない場合にだけ読み込まれます。
+        """
+        journal = cls(
+            get_journal_path(context),
+            operations,
+            project_fingerprint(context),
+            yaml_state(context),
+        )
+        if resume:
+            journal._load(context.project.runtime_cfg.project_name)
+        journal._start(context.project.runtime_cfg.project_name, append=bool(journal))
+        return journal
+
+    def __bool__(self) -> bool:
+        return bool(self._completed or self._columns)
+
+    def __len__(self) -> int:
+        return len(self._completed)
+
+    def _load(self, project_name: str) -> None:
+        if not self.path.exists():
+            logger.info(":notebook: No journal found at => %s, starting from scratch.", self.path)
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if (
+                header.get("format") != _JOURNAL_FORMAT
+                or header.get("version") != _JOURNAL_FORMAT_VERSION
+                or header.get("project") != project_name
+                or header.get("operations") != self.operations
+            ):
+                logger.warning(
+                    ":warning: Journal at => %s does not match this run, starting from scratch.",
+                    self.path,
+                )
+                return
+            if header.get("fingerprint") != self.fingerprint:
+                logger.warning(
+                    ":warning: Models changed since the journal at => %s was written, refusing to resume from it.",
+                    self.path,
+                )
+                return
+            recorded_yaml = header.get("yaml")
+            completed: dict[tuple[str, str], dict[str, t.Any]] = {}
+            columns: dict[str, dict[str, t.Any]] = {}
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # NOTE: the last line may be truncated if the previous run was killed mid-write
+                    logger.debug(":warning: Skipping truncated journal line.")
+                    continue
+                if "yaml" in record:
+                    recorded_yaml = record["yaml"]
+                elif "relation" in record:
+                    columns[record["relation"]] = record["columns"]
+                else:
+                    completed[(record["op"], record["uid"])] = record
+        if recorded_yaml != self.yaml:
+            logger.warning(
+                ":warning: YAML files changed since the journal at => %s was last committed, refusing to resume from it.",
+                self.path,
+            )
+            return
+        self._completed, self._columns = completed, columns
+        logger.info(
+            ":notebook: Resuming from journal => %s with %s completed steps and %s cached relations.",
+            self.path,
+            len(self._completed),
+            len(self._columns),
+        )
+
+    def _start(self, project_name: str, append: bool) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if append:
+            self._handle = self.path.open("a", encoding="utf-8")
+            return
+        self._handle = self.path.open("w", encoding="utf-8")
+        self._write({
+            "format": _JOURNAL_FORMAT,
+            "version": _JOURNAL_FORMAT_VERSION,
+            "project": project_name,
+            "operations": self.operations,
+            "fingerprint": self.fingerprint,
+            "yaml": self.yaml,
+        })
+
+    def _write(self, record: dict[str, t.Any]) -> None:
+        if self._handle is None:
+            return
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            _ = self._handle.write(line)
+            self._handle.flush()
+
+    def record_yaml_state(self, context: t.Any) -> None:
+        """YAML ファイルをコミットした後に呼び出し、再開時に照合する YAML ファイルの状態を更新します。"""
+        self.yaml = yaml_state(context)
+        self._write({"yaml": self.yaml})
+
+    def restore(self, op_name: str, node: ResultNode) -> bool:
+        """記録済みのスナップショットをノードに復元します。記録がない場合は False を返します。"""
+        record = self._completed.get((op_name, node.unique_id))
+        if record is None:
+            return False
+        logger.debug(":rewind: Restoring => %s for => %s from journal", op_name, node.unique_id)
+        node.description = record["description"]
+        node.columns = {name: ColumnInfo.from_dict(col) for name, col in record["columns"].items()}
+        return True
+
+    def record(self, op_name: str, node: ResultNode) -> None:
+        """ノードに対する操作の完了と、その時点の列と説明のスナップショットを記録します。"""
+        record = {
+            "op": op_name,
+            "uid": node.unique_id,
+            "description": node.description,
+            "columns": {name: col.to_dict(omit_none=True) for name, col in node.columns.items()},
+        }
+        self._completed[(op_name, node.unique_id)] = record
+        self._write(record)
+
+    def record_columns(self, relation: str, columns: t.Mapping[str, ColumnMetadata]) -> None:
+        """リレーションに対してイントロスペクトした列を記録します。"""
+        record = {"relation": relation, "columns": {k: v.to_dict() for k, v in columns.items()}}
+        self._columns[relation] = record["columns"]
+        self._write(record)
+
+    def restore_columns(self, cache: dict[str, OrderedDict[str, ColumnMetadata]]) -> int:
+        """記録済みの列を列リスト キャッシュに読み込み、読み込んだリレーションの数を返します。"""
+        for relation, columns in self._columns.items():
+            cache.setdefault(
+                relation,
+                OrderedDict((k, ColumnMetadata.from_dict(v)) for k, v in columns.items()),
+            )
+        return len(self._columns)
+
+    def close(self) -> None:
+        """ジャーナル ファイルを閉じます。ファイル自体は次回の再開のために残されます。"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def clear(self) -> None:
+        """ジャーナルを閉じて削除します。変更がすべてコミットされた後に呼び出されます。"""
+        self.close()
+        self._completed.clear()
+        self._columns.clear()
+        self.path.unlink(missing_ok=True)
+        logger.debug(":wastebasket: Removed journal => %s", self.path)
@@ -2,17 +2,38 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import os
+import random
+import re
+import threading
+import time
 import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
 from textwrap import dedent
 
 import openai
 from openai import OpenAI
 
+import dbt_osmosis.core.logger as logger
+
 __all__ = [
+    "PROMPT_TEMPLATE_VERSION",
+    "CompletionCache",
+    "RateLimiter",
+    "SynthesisEngine",
+    "compact_sql",
+    "count_tokens",
+    "select_upstream_docs",
+    "get_shared_llm_client",
+    "get_synthesis_engine",
     "generate_model_spec_as_json",
     "generate_column_doc",
+    "generate_column_docs",
     "generate_table_doc",
 ]
 
@@ -119,13 +140,595 @@ def get_llm_client():
     return client, model_engine
 
 
+_LLM_ENV_PREFIXES = (
+    "LLM_",
+    "OPENAI_",
+    "AZURE_OPENAI_",
+    "LM_STUDIO_",
+    "OLLAMA_",
+    "GOOGLE_GEMINI_",
+    "ANTHROPIC_",
+)
+_CLIENT_CACHE: dict[tuple[tuple[str, str], ...], tuple[t.Any, str]] = {}
+_CLIENT_CACHE_LOCK = threading.Lock()
+
+
+def _llm_env_key() -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, v) for k, v in os.environ.items() if k.startswith(_LLM_ENV_PREFIXES)))
+
+
+def get_shared_llm_client() -> tuple[t.Any, str]:
+    """LLM クライアントとモデル エンジン文字列を返します。
+
+    クライアントは関連する環境変数の組み合わせごとに 1 回だけ作成され、すべてのリクエストで共有されるため、
+    HTTP 接続プールが再利用されます。"""
+    key = _llm_env_key()
+    with _CLIENT_CACHE_LOCK:
+        if key not in _CLIENT_CACHE:
+            _CLIENT_CACHE[key] = get_llm_client()
+        return _CLIENT_CACHE[key]
+
+
+@dataclass
+class _TokenBucket:
+    """1 分あたりの容量で補充されるトークン バケット。容量が 0 の場合は無制限です。"""
+
+    per_minute: float
+    _level: float = field(init=False)
+    _updated: float = field(init=False, default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self._level = self.per_minute
+
+    def reserve(self, amount: float) -> float:
+        """`amount` を予約し、予約が有効になるまで待機すべき秒数を返します。"""
+        if self.per_minute <= 0:
+            return 0.0
+        now = time.monotonic()
+        rate = self.per_minute / 60.0
+        self._level = min(self.per_minute, self._level + (now - self._updated) * rate)
+        self._updated = now
+        # NOTE: a single request larger than the bucket is let through once the bucket is full
+        self._level -= min(amount, self.per_minute)
+        return max(0.0, -self._level / rate)
+
+    def adjust(self, amount: float) -> None:
+        """見積もりと実際の消費量の差を反映します。"""
+        if self.per_minute > 0:
+            self._level -= amount
+
+
+class RateLimiter:
+    """リクエスト数とトークン数の両方を制限するスレッドセーフなレート リミッター。"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0) -> None:
+        self._lock = threading.Lock()
+        self._requests = _TokenBucket(requests_per_minute)
+        self._tokens = _TokenBucket(tokens_per_minute)
+
+    def reserve(self, tokens: int) -> float:
+        """1 リクエストと `tokens` トークンを予約し、送信前に待機すべき秒数を返します。"""
+        with self._lock:
+            return max(self._requests.reserve(1), self._tokens.reserve(tokens))
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """実際に消費されたトークン数で予約を補正します。"""
+        with self._lock:
+            self._tokens.adjust(actual - estimated)
+
+
+_TOKEN_ENCODER: t.Any = None
+_TOKEN_ENCODER_LOADED = False
+
+
+def _get_token_encoder() -> t.Any:
+    """tiktoken がインストールされている場合はエンコーダーを返し、そうでない場合は None を返します。"""
+    global _TOKEN_ENCODER, _TOKEN_ENCODER_LOADED
+    if not _TOKEN_ENCODER_LOADED:
+        try:
+            import tiktoken
+
+            _TOKEN_ENCODER = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _TOKEN_ENCODER = None
+        _TOKEN_ENCODER_LOADED = True
+    return _TOKEN_ENCODER
+
+
+def count_tokens(text: str) -> int:
+    """テキストのトークン数を数えます。tiktoken がない場合は 1 トークン ≒ 4 文字として見積もります。"""
+    if not text:
+        return 0
+    if (encoder := _get_token_encoder()) is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """テキストを最大トークン数に収まるように切り詰めます。"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if (encoder := _get_token_encoder()) is not None:
+        text = encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        text = text[: max_tokens * 4]
+    return text + "... (TRUNCATED)"
+
+
+def _estimate_tokens(messages: list[dict[str, t.Any]]) -> int:
+    """プロンプトのトークン数を見積もります。"""
+    return sum(count_tokens(str(m.get("content", ""))) for m in messages) + 1
+
+
+_SQL_TOKEN_PATTERN = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`)|(--[^\n]*|/\*.*?\*/)|([ \t]+)""",
+    re.DOTALL,
+)
+
+
+def compact_sql(sql: str) -> str:
+    """SQL からコメントと余分な空白を取り除きます。文字列リテラルと引用符付き識別子は保持されます。"""
+
+    def _replace(match: re.Match[str]) -> str:
+        if match.group(1) is not None:
+            return match.group(1)
+        if match.group(2) is not None:
+            return " " if match.group(2).startswith("/*") else ""
+        return " "
+
+    # NOTE: the second pass folds the whitespace left on either side of a removed comment
+    compacted = _SQL_TOKEN_PATTERN.sub(_replace, _SQL_TOKEN_PATTERN.sub(_replace, sql))
+    return "\n".join(line.strip() for line in compacted.splitlines() if line.strip())
+
+
+def _prepare_sql(sql_content: str) -> str:
+    """プロンプトに埋め込む SQL を圧縮し、トークン予算に収まるように切り詰めます。"""
+    sql_content = compact_sql(sql_content)
+    if max_sql_chars := os.getenv("OSMOSIS_LLM_MAX_SQL_CHARS"):
+        if len(sql_content) > int(max_sql_chars):
+            sql_content = sql_content[: int(max_sql_chars)] + "... (TRUNCATED)"
+    return _truncate_to_tokens(sql_content, int(os.getenv("OSMOSIS_LLM_MAX_SQL_TOKENS", "6000")))
+
+
+def select_upstream_docs(
+    upstream_docs: list[str],
+    target_columns: t.Iterable[str] = (),
+    max_tokens: int | None = None,
+) -> list[str]:
+    """上流のドキュメントを対象の列との関連度で並べ替え、トークン予算に収まるものだけを返します。
+
+    対象の列と同じ名前の列のドキュメントが最優先され、次にノードの説明、その他の列の順に選ばれます。
+    同じ関連度の中では元の順序が保たれ、見出し (`#` で始まる行) は常に残されます。"""
+    if max_tokens is None:
+        max_tokens = int(os.getenv("OSMOSIS_LLM_MAX_UPSTREAM_TOKENS", "2000"))
+    targets = {c.lower() for c in target_columns}
+
+    def _relevance(doc: str) -> int:
+        if doc.startswith("#"):
+            return 3
+        if doc.startswith("- "):
+            name = doc[2:].split(":", 1)[0].strip().lower()
+            return 2 if name in targets else 0
+        return 1
+
+    ranked = sorted(enumerate(upstream_docs), key=lambda e: (-_relevance(e[1]), e[0]))
+    selected: set[int] = set()
+    used = 0
+    for i, doc in ranked:
+        cost = count_tokens(doc)
+        if used + cost > max_tokens and _relevance(doc) < 3:
+            continue
+        selected.add(i)
+        used += cost
+    docs = [doc for i, doc in enumerate(upstream_docs) if i in selected]
+    if omitted := len(upstream_docs) - len(docs):
+        docs.append(f"# ({omitted} less relevant upstream entries omitted)")
+    return docs
+
+
+_COMPLETION_TOKEN_ESTIMATE = 256
+"""応答のトークン数の見積もり。実際の消費量は応答の usage で補正されます。"""
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def _request_completion(
+    messages: list[dict[str, t.Any]], temperature: float
+) -> tuple[str | None, t.Any]:
+    """チャット補完リクエストを 1 回送信し、応答テキストと使用量 (usage) を返します。"""
+    client, model_engine = get_shared_llm_client()
+    if os.getenv("LLM_PROVIDER", "openai").lower() == "azure-openai":
+        # Legacy structure for Azure OpenAI Service
+        response = client.ChatCompletion.create(
+            engine=model_engine, messages=messages, temperature=temperature
+        )
+    else:
+        # New SDK structure for OpenAI default, LM Studio, Ollama
+        response = client.chat.completions.create(
+            model=model_engine, messages=messages, temperature=temperature
+        )
+    return response.choices[0].message.content, getattr(response, "usage", None)
+
+
+def _usage_tokens(usage: t.Any) -> tuple[int | None, int | None]:
+    """応答の使用量からプロンプトと応答のトークン数を取り出します。合計しかない場合は応答側を None とします。"""
+    if usage is None:
+        return None, None
+    if isinstance(usage, int):
+        return usage, None
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+PROMPT_TEMPLATE_VERSION = "2"
+"""プロンプト テンプレートのバージョン。プロンプトの文言を変更した場合は更新し、キャッシュされた応答を無効にします。"""
+
+
+class CompletionCache:
+    """プロンプトの内容をキーとして LLM の応答を保存するローカル ファイル ストア。
+
+    キーはテンプレートのバージョン、メッセージ (モデルの SQL、列名、上流のドキュメントを含む)、
+    モデル エンジン、温度の SHA-256 ハッシュです。合計サイズが上限を超えると、最も長く使われていない
+    エントリから削除されます。"""
+
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    @classmethod
+    def from_env(cls) -> CompletionCache | None:
+        """`OSMOSIS_LLM_CACHE*` 環境変数からキャッシュを構成します。無効化されている場合は None を返します。"""
+        if os.getenv("OSMOSIS_LLM_CACHE", "1").lower() in ("0", "false", "no", "off"):
+            return None
+        directory = os.getenv("OSMOSIS_LLM_CACHE_DIR") or (
+            Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "dbt-osmosis" / "llm"
+        )
+        return cls(
+            Path(directory),
+            max_bytes=int(os.getenv("OSMOSIS_LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        )
+
+    @staticmethod
+    def key(messages: list[dict[str, t.Any]], model_engine: str, temperature: float) -> str:
+        """リクエストの内容からキャッシュ キーを計算します。"""
+        payload = json.dumps(
+            {
+                "version": PROMPT_TEMPLATE_VERSION,
+                "engine": model_engine,
+                "temperature": temperature,
+                "messages": messages,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.txt"
+
+    def _entries(self) -> list[Path]:
+        return [p for p in self.directory.glob("*/*.txt") if p.is_file()]
+
+    def get(self, key: str) -> str | None:
+        """キャッシュされた応答を返します。存在しない場合は None を返します。"""
+        path = self._path(key)
+        try:
+            content = path.read_text(encoding="utf-8")
+            os.utime(path)
+        except OSError:
+            return None
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """応答を保存し、必要に応じて古いエントリを削除します。"""
+        path = self._path(key)
+        data = content.encode("utf-8")
+        with self._lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                _ = tmp.write_bytes(data)
+                _ = tmp.replace(path)
+            except OSError as e:
+                logger.debug(":warning: Could not write LLM cache entry => %s: %s", path, e)
+                return
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # NOTE: trim to 90% of the limit so a full cache does not rescan on every write
+        entries = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in self._entries()),
+            key=lambda e: e[0],
+        )
+        size = sum(e[1] for e in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            evicted += 1
+        self._size = size
+        logger.debug(":wastebasket: Evicted => %s LLM cache entries", evicted)
+
+    def clear(self) -> None:
+        """すべてのエントリを削除します。"""
+        with self._lock:
+            for path in self._entries():
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+
+class SynthesisEngine:
+    """LLM リクエストを並行して実行する asyncio ベースのエンジン。
+
+    専用スレッドでイベント ループを実行し、ブロッキングな HTTP 呼び出しは専用のスレッドプールで行います。
+    同時実行数はセマフォで制限され、リクエスト数とトークン数はレート リミッターで制限されます。
+    一時的なエラーはジッター付きの指数バックオフで再試行されます。どのスレッドからでも呼び出せます。
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        max_retries: int = 5,
+        limiter: RateLimiter | None = None,
+        request: t.Callable[
+            [list[dict[str, t.Any]], float], tuple[str | None, t.Any]
+        ] = _request_completion,
+        progress_interval: float = 5.0,
+        cache: CompletionCache | None = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.cache = cache
+        self.max_retries = max(0, max_retries)
+        self.limiter = limiter or RateLimiter()
+        self.progress_interval = progress_interval
+        self._request = request
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="osmosis-llm"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="osmosis-llm-loop", daemon=True
+        )
+        self._thread.start()
+        self._stats: dict[str, int] = {}
+        self._latencies: list[float] = []
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._stats = dict.fromkeys(
+            (
+                "submitted",
+                "completed",
+                "cached",
+                "failed",
+                "retries",
+                "tokens",
+                "prompt_tokens",
+                "completion_tokens",
+            ),
+            0,
+        )
+        self._latencies = []
+        self._started = time.monotonic()
+        self._last_report = self._started
+
+    def reset_stats(self) -> None:
+        """統計をリセットします。エンジンはプロセス全体で共有されるため、合成の実行ごとに呼び出します。"""
+
+        async def _reset() -> None:
+            self._reset_stats()
+
+        # NOTE: the counters are only touched on the loop thread, so reset them there too
+        asyncio.run_coroutine_threadsafe(_reset(), self._loop).result()
+
+    @classmethod
+    def from_env(cls) -> SynthesisEngine:
+        """`OSMOSIS_LLM_*` 環境変数からエンジンを構成します。"""
+        return cls(
+            concurrency=int(os.getenv("OSMOSIS_LLM_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("OSMOSIS_LLM_MAX_RETRIES", "5")),
+            limiter=RateLimiter(
+                requests_per_minute=float(os.getenv("OSMOSIS_LLM_REQUESTS_PER_MINUTE", "0")),
+                tokens_per_minute=float(os.getenv("OSMOSIS_LLM_TOKENS_PER_MINUTE", "0")),
+            ),
+            cache=CompletionCache.from_env(),
+        )
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """送信、完了、キャッシュから応答、失敗、再試行されたリクエスト数と消費トークン数。"""
+        return dict(self._stats)
+
+    def summary(self) -> dict[str, float]:
+        """コストの調整に使用できる、トークン数とレイテンシー (ミリ秒) の統計を返します。"""
+        latencies = sorted(self._latencies)
+        requests = len(latencies)
+        return {
+            **self._stats,
+            "latency_mean_ms": 1000 * sum(latencies) / requests if requests else 0.0,
+            "latency_p95_ms": 1000 * latencies[min(requests - 1, int(requests * 0.95))]
+            if requests
+            else 0.0,
+            "latency_max_ms": 1000 * latencies[-1] if requests else 0.0,
+            "prompt_tokens_per_request": self._stats["prompt_tokens"] / requests
+            if requests
+            else 0.0,
+        }
+
+    def log_summary(self) -> None:
+        """トークン数とレイテンシーの統計をログに出力します。"""
+        summary = self.summary()
+        logger.info(
+            ":bar_chart: LLM usage => %s requests (%s cached), %s prompt + %s completion tokens, "
+            "latency mean %.0fms / p95 %.0fms / max %.0fms",
+            summary["completed"],
+            summary["cached"],
+            summary["prompt_tokens"],
+            summary["completion_tokens"],
+            summary["latency_mean_ms"],
+            summary["latency_p95_ms"],
+            summary["latency_max_ms"],
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # NOTE: full jitter keeps concurrent retries from hitting the API in lockstep
+        return random.uniform(0, min(60.0, 2.0**attempt))
+
+    def _report_progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        logger.info(
+            ":robot: LLM progress => %s/%s requests done (%s cached, %s failed, %s retries, %s tokens) in %.1fs",
+            self._stats["completed"] + self._stats["failed"],
+            self._stats["submitted"],
+            self._stats["cached"],
+            self._stats["failed"],
+            self._stats["retries"],
+            self._stats["tokens"],
+            now - self._started,
+        )
+
+    async def _acomplete(self, messages: list[dict[str, t.Any]], temperature: float) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._stats["submitted"] += 1
+        cache_key: str | None = None
+        if self.cache is not None:
+            cache_key = self.cache.key(messages, get_shared_llm_client()[1], temperature)
+            # NOTE: cache IO runs off the loop thread so it never stalls other in-flight requests
+            if (cached := await asyncio.to_thread(self.cache.get, cache_key)) is not None:
+                self._stats["cached"] += 1
+                self._stats["completed"] += 1
+                self._report_progress()
+                return cached
+        prompt_tokens = _estimate_tokens(messages)
+        estimated = prompt_tokens + _COMPLETION_TOKEN_ESTIMATE
+        attempt = 0
+        while True:
+            if delay := self.limiter.reserve(estimated):
+                logger.debug(":hourglass: Rate limited, waiting => %.2fs", delay)
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    content, usage = await self._loop.run_in_executor(
+                        self._executor, self._request, messages, temperature
+                    )
+                    self._latencies.append(time.perf_counter() - started)
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._stats["failed"] += 1
+                    self._report_progress()
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.warning(
+                    ":warning: LLM request failed with => %s, retrying in %.2fs (attempt %s/%s)",
+                    type(e).__name__,
+                    delay,
+                    attempt,
+                    self.max_retries,
+                )
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self._stats["failed"] += 1
+                self._report_progress()
+                raise
+            used_prompt, used_completion = _usage_tokens(usage)
+            if used_completion is None:
+                # NOTE: only a total (or nothing) was reported, attribute it all to the prompt
+                used_prompt, used_completion = used_prompt or prompt_tokens, 0
+            else:
+                used_prompt = used_prompt or prompt_tokens
+            if usage is not None:
+                self.limiter.settle(estimated, used_prompt + used_completion)
+            self._stats["prompt_tokens"] += used_prompt
+            self._stats["completion_tokens"] += used_completion
+            self._stats["tokens"] += used_prompt + used_completion
+            self._stats["completed"] += 1
+            self._report_progress()
+            if not content:
+                raise ValueError("LLM returned an empty response")
+            if cache_key is not None:
+                await asyncio.to_thread(self.cache.put, cache_key, content)  # pyright: ignore[reportOptionalMemberAccess]
+            return content
+
+    async def _acomplete_many(
+        self, requests: t.Sequence[tuple[list[dict[str, t.Any]], float]]
+    ) -> list[str | BaseException]:
+        return await asyncio.gather(
+            *(self._acomplete(messages, temperature) for messages, temperature in requests),
+            return_exceptions=True,
+        )
+
+    def complete(self, messages: list[dict[str, t.Any]], temperature: float) -> str:
+        """1 つのプロンプトを送信し、応答テキストを返します。呼び出し元のスレッドは応答までブロックされます。"""
+        return asyncio.run_coroutine_threadsafe(
+            self._acomplete(messages, temperature), self._loop
+        ).result()
+
+    def complete_many(
+        self, requests: t.Sequence[tuple[list[dict[str, t.Any]], float]]
+    ) -> list[str | BaseException]:
+        """複数のプロンプトを並行して送信し、要求と同じ順序で応答テキストまたは例外を返します。"""
+        if not requests:
+            return []
+        return asyncio.run_coroutine_threadsafe(self._acomplete_many(requests), self._loop).result()
+
+    def close(self) -> None:
+        """イベント ループとスレッドプールを停止します。"""
+        self._report_progress(force=True)
+        asyncio.run_coroutine_threadsafe(
+            self._loop.shutdown_default_executor(), self._loop
+        ).result()
+        _ = self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=False)
+        self._loop.close()
+
+
+_ENGINE: SynthesisEngine | None = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_synthesis_engine() -> SynthesisEngine:
+    """プロセス全体で共有される SynthesisEngine を返します。"""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = SynthesisEngine.from_env()
+        return _ENGINE
+
+
 def _create_llm_prompt_for_model_docs_as_json(
     sql_content: str,
     existing_context: str | None = None,
     upstream_docs: list[str] | None = None,
+    columns: t.Mapping[str, str | None] | None = None,
 ) -> list[dict[str, t.Any]]:
-    """モデル全体 (列を含む) を記述する JSON 構造を生成するようにモデルに指示するシステム + 
-    ユーザー プロンプトを構築します。"""
+    """モデル全体 (列を含む) を記述する JSON 構造を生成するようにモデルに指示するシステム +
+    ユーザー プロンプトを構築します。
+
+    `columns` を指定すると、指定した列 (列名と列ごとのコンテキストの対応) だけを記述するよう指示します。"""
     if upstream_docs is None:
         upstream_docs = []
 
@@ -167,9 +770,8 @@ def _create_llm_prompt_for_model_docs_as_json(
     """
     )
 
-    if max_sql_chars := os.getenv("OSMOSIS_LLM_MAX_SQL_CHARS"):
-        if len(sql_content) > int(max_sql_chars):
-            sql_content = sql_content[: int(max_sql_chars)] + "... (TRUNCATED)"
+    sql_content = _prepare_sql(sql_content)
+    upstream_docs = select_upstream_docs(upstream_docs, columns or ())
 
     user_message = dedent(
         f"""
@@ -189,6 +791,18 @@ def _create_llm_prompt_for_model_docs_as_json(
     """
     )
 
+    if columns:
+        column_list = os.linesep.join(
+            f"- {name}: {context}" if context else f"- {name}" for name, context in columns.items()
+        )
+        user_message = (
+            user_message.rstrip()
+            + "\n\n"
+            + 'Document ONLY the following columns. "columns" must contain exactly one entry for each\n'
+            + "of them, using the column name verbatim. Any extra context for a column follows its name:\n"
+            + column_list
+        )
+
     return [
         {"role": "system", "content": system_prompt.strip()},
         {"role": "user", "content": user_message.strip()},
@@ -234,6 +848,8 @@ def _create_llm_prompt_for_column(
     """
     )
 
+    upstream_docs = select_upstream_docs(upstream_docs, [column_name])
+
     user_message = dedent(
         f"""
     The column name is: {column_name}
@@ -287,9 +903,8 @@ def _create_llm_prompt_for_table(
     """
     )
 
-    if max_sql_chars := os.getenv("OSMOSIS_LLM_MAX_SQL_CHARS"):
-        if len(sql_content) > int(max_sql_chars):
-            sql_content = sql_content[: int(max_sql_chars)] + "... (TRUNCATED)"
+    sql_content = _prepare_sql(sql_content)
+    upstream_docs = select_upstream_docs(upstream_docs)
 
     user_message = dedent(
         f"""
@@ -341,24 +956,11 @@ def generate_model_spec_as_json(
     messages = _create_llm_prompt_for_model_docs_as_json(
         sql_content, existing_context, upstream_docs
     )
+    return _parse_json_response(get_synthesis_engine().complete(messages, temperature))
 
-    client, model_engine = get_llm_client()
-
-    if os.getenv("LLM_PROVIDER", "openai").lower() == "azure-openai":
-        # Legacy structure for Azure OpenAI Service
-        response = client.ChatCompletion.create(
-            engine=model_engine, messages=messages, temperature=temperature
-        )
-    else:
-        # New SDK structure for OpenAI default, LM Studio, Ollama
-        response = client.chat.completions.create(
-            model=model_engine, messages=messages, temperature=temperature
-        )
-
-    content = response.choices[0].message.content
-    if content is None:
-        raise ValueError("LLM returned an empty response")
 
+def _parse_json_response(content: str) -> dict[str, t.Any]:
+    """LLM の応答から JSON オブジェクトを取り出します。"""
     content = content.strip()
     if content.startswith("```") and content.endswith("```"):
         content = content[content.find("{") : content.rfind("}") + 1]
@@ -393,24 +995,112 @@ def generate_column_doc(
     messages = _create_llm_prompt_for_column(
         column_name, existing_context, table_name, upstream_docs
     )
+    return get_synthesis_engine().complete(messages, temperature).strip()
+
+
+_COLUMN_DOC_TOKEN_ESTIMATE = 40
+"""バッチ処理で 1 列分の説明が応答に占めるトークン数の見積もり。"""
+
+
+def _chunk_columns(
+    columns: t.Mapping[str, str | None], token_budget: int
+) -> list[dict[str, str | None]]:
+    """列ごとのコンテキストと応答の見積もりトークン数の合計が予算に収まるように列を分割します。"""
+    chunks: list[dict[str, str | None]] = []
+    current: dict[str, str | None] = {}
+    used = 0
+    for name, context in columns.items():
+        cost = (len(name) + len(context or "")) // 4 + 1 + _COLUMN_DOC_TOKEN_ESTIMATE
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = {}, 0
+        current[name] = context
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _collect_batched_column_docs(
+    chunk: t.Mapping[str, str | None], result: str | BaseException
+) -> dict[str, str | BaseException]:
+    """バッチ リクエストの応答を列ごとの説明に分解します。応答に含まれない列は値を持ちません。"""
+    if isinstance(result, BaseException):
+        return dict.fromkeys(chunk, result)
+    try:
+        spec = _parse_json_response(result)
+    except ValueError as e:
+        return dict.fromkeys(chunk, e)
+    by_name: dict[str, str] = {}
+    for col in spec.get("columns", []):
+        if isinstance(col, dict) and col.get("name") and col.get("description"):
+            by_name[str(col["name"]).lower()] = str(col["description"]).strip()
+    return {name: by_name[name.lower()] for name in chunk if name.lower() in by_name}
+
+
+def generate_column_docs(
+    columns: t.Mapping[str, str | None],
+    table_name: str | None = None,
+    upstream_docs: list[str] | None = None,
+    temperature: float = 0.7,
+    sql_content: str | None = None,
+    existing_context: str | None = None,
+    batch: bool = True,
+) -> dict[str, str | BaseException]:
+    """複数の列のドキュメントを生成します。
 
-    client, model_engine = get_llm_client()
+    `batch` が真の場合、列はトークン予算 (`OSMOSIS_LLM_BATCH_TOKEN_BUDGET`) に収まるように分割され、
+    分割ごとに 1 つの JSON 形式のリクエストで記述されます。テーブルのコンテキストと上流のドキュメントは
+    リクエストごとに 1 回だけ送信されます。応答に含まれなかった列は 1 列ずつのプロンプトで再試行されます。
 
-    provider = os.getenv("LLM_PROVIDER", "openai").lower()
-    if provider == "azure-openai":
-        response = client.ChatCompletion.create(
-            engine=model_engine, messages=messages, temperature=temperature
+    Args:
+        columns (Mapping[str, str | None]): 列名と、その列に関連するコンテキストの対応
+        table_name (str | None): テーブル/モデルの名前（オプション）
+        upstream_docs (list[str] | None): オプションのドキュメントや参考資料
+        temperature (float): OpenAI完了温度
+        sql_content (str | None): モデルのSQLコード（バッチ処理で使用）
+        existing_context (str | None): テーブル全体に関連するメタデータ
+        batch (bool): 複数の列を 1 つのリクエストにまとめるかどうか
+
+    Returns:
+        dict[str, str | BaseException]: 列名と生成されたドキュメント文字列、または失敗した場合の例外の対応
+    """
+    engine = get_synthesis_engine()
+    docs: dict[str, str | BaseException] = {}
+    if batch and len(columns) > 1:
+        chunks = _chunk_columns(columns, int(os.getenv("OSMOSIS_LLM_BATCH_TOKEN_BUDGET", "2000")))
+        context = "\n".join(
+            filter(None, [f"TableName={table_name}" if table_name else None, existing_context])
         )
-    else:
-        response = client.chat.completions.create(
-            model=model_engine, messages=messages, temperature=temperature
+        results = engine.complete_many([
+            (
+                _create_llm_prompt_for_model_docs_as_json(
+                    sql_content or "(not available)", context or None, upstream_docs, chunk
+                ),
+                temperature,
+            )
+            for chunk in chunks
+        ])
+        for chunk, result in zip(chunks, results):
+            docs.update(_collect_batched_column_docs(chunk, result))
+
+    # NOTE: columns a batch failed to parse or left out fall back to one prompt per column
+    remaining = [name for name in columns if name not in docs or isinstance(docs[name], ValueError)]
+    results = engine.complete_many([
+        (
+            _create_llm_prompt_for_column(
+                name,
+                "\n".join(filter(None, [columns[name], existing_context])) or None,
+                table_name,
+                upstream_docs,
+            ),
+            temperature,
         )
-
-    content = response.choices[0].message.content
-    if not content:
-        raise ValueError("LLM returned an empty response")
-
-    return content.strip()
+        for name in remaining
+    ])
+    for name, result in zip(remaining, results):
+        docs[name] = result.strip() if isinstance(result, str) else result
+    return {name: docs[name] for name in columns}
 
 
 def generate_table_doc(
@@ -432,24 +1122,7 @@ def generate_table_doc(
         str: 「説明」フィールドに適した短いドキュメント文字列
     """
     messages = _create_llm_prompt_for_table(sql_content, table_name, upstream_docs)
-
-    client, model_engine = get_llm_client()
-
-    provider = os.getenv("LLM_PROVIDER", "openai").lower()
-    if provider == "azure-openai":
-        response = client.ChatCompletion.create(
-            engine=model_engine, messages=messages, temperature=temperature
-        )
-    else:
-        response = client.chat.completions.create(
-            model=model_engine, messages=messages, temperature=temperature
-        )
-
-    content = response.choices[0].message.content
-    if not content:
-        raise ValueError("LLM returned an empty response")
-
-    return content.strip()
+    return get_synthesis_engine().complete(messages, temperature).strip()
 
 
 if __name__ == "__main__":
@@ -11,10 +11,12 @@ from dbt_osmosis.core.config import (
     DbtConfiguration,
     DbtProjectContext,
     _reload_manifest,
+    clear_dbt_project_contexts,
     config_to_namespace,
     create_dbt_project_context,
     discover_profiles_dir,
     discover_project_dir,
+    get_dbt_project_context,
 )
 
 # Inheritance functionality
@@ -34,6 +36,11 @@ from dbt_osmosis.core.introspection import (
     normalize_column_name,
 )
 
+# Checkpoint journal
+from dbt_osmosis.core.journal import (
+    RefactorJournal,
+)
+
 # Node filtering and sorting
 from dbt_osmosis.core.node_filters import (
     _topological_sort,
@@ -47,6 +54,7 @@ from dbt_osmosis.core.path_management import (
     create_missing_source_yamls,
     get_current_yaml_path,
     get_target_yaml_path,
+    iter_missing_source_yamls,
 )
 
 # Plugin system
@@ -60,8 +68,14 @@ from dbt_osmosis.core.plugins import (
 from dbt_osmosis.core.restructuring import (
     RestructureDeltaPlan,
     RestructureOperation,
+    apply_restructure_operations,
     apply_restructure_plan,
     draft_restructure_delta_plan,
+    dump_restructure_plan,
+    iter_restructure_operations,
+    iter_restructure_plan_file,
+    iter_source_bootstrap_operations,
+    load_restructure_plan,
     pretty_print_plan,
 )
 
@@ -87,6 +101,7 @@ from dbt_osmosis.core.settings import (
 from dbt_osmosis.core.sql_operations import (
     compile_sql_code,
     execute_sql_code,
+    stream_sql_code,
 )
 
 # Sync operations
@@ -127,15 +142,20 @@ __all__ = [
     "DbtConfiguration",
     "DbtProjectContext",
     "create_dbt_project_context",
+    "get_dbt_project_context",
+    "clear_dbt_project_contexts",
     "create_yaml_instance",
     "YamlRefactorSettings",
     "YamlRefactorContext",
     "EMPTY_STRING",
+    "RefactorJournal",
     "compile_sql_code",
     "execute_sql_code",
+    "stream_sql_code",
     "normalize_column_name",
     "get_columns",
     "create_missing_source_yamls",
+    "iter_missing_source_yamls",
     "get_current_yaml_path",
     "get_target_yaml_path",
     "build_yaml_file_mapping",
@@ -144,6 +164,12 @@ __all__ = [
     "pretty_print_plan",
     "sync_node_to_yaml",
     "apply_restructure_plan",
+    "apply_restructure_operations",
+    "iter_restructure_operations",
+    "dump_restructure_plan",
+    "iter_restructure_plan_file",
+    "iter_source_bootstrap_operations",
+    "load_restructure_plan",
     "inherit_upstream_column_knowledge",
     "inject_missing_columns",
     "remove_columns_not_in_database",
@@ -19,6 +19,7 @@ __all__ = [
     "get_target_yaml_path",
     "build_yaml_file_mapping",
     "create_missing_source_yamls",
+    "iter_missing_source_yamls",
 ]
 
 
@@ -165,25 +166,20 @@ def build_yaml_file_mapping(
     return out_map
 
 
-def create_missing_source_yamls(context: t.Any) -> None:
-    """dbt_project.yml の dbt-osmosis 変数で定義されているが、
-    ノードとして存在しないソースのソースファイルを作成します。
+def iter_missing_source_yamls(context: t.Any) -> t.Iterator[tuple[Path, dict[str, t.Any]]]:
+    """dbt_project.yml の dbt-osmosis 変数で定義されているが、ノードとして存在しないソースについて、
+    作成するソースファイルのパスと YAML ドキュメントを 1 つずつ生成します。
 
-    これは、すべてのソースが dbt プロジェクトマニフェストに確実に含まれるようにするための便利な前処理手順です。
-    存在しないソースについては詳細なノード情報がないため、
-    ここでは代替コードパスを使用してそれらをブートストラップしています。
+    ディスクには何も書き込みません。テーブルと列はウェアハウスから取得します。
     """
-    from dbt_osmosis.core.config import _reload_manifest
     from dbt_osmosis.core.introspection import _find_first, get_columns
 
     if context.project.config.disable_introspection:
         logger.warning(":warning: Introspection is disabled, cannot create missing source YAMLs.")
         return
-    logger.info(":factory: Creating missing source YAMLs (if any).")
     database: str = context.project.runtime_cfg.credentials.database
     lowercase: bool = context.settings.output_to_lower
 
-    did_side_effect: bool = False
     for source, spec in context.source_definitions.items():
         if isinstance(spec, str):
             schema = source
@@ -229,18 +225,34 @@ def create_missing_source_yamls(context: t.Any) -> None:
                     _ = col.pop("data_type", None)
             return s
 
-        tables = [
-            _describe(relation)
-            for relation in context.project.adapter.list_relations(database=database, schema=schema)
-        ]
+        with context.project.adapter_scope():
+            relations = context.project.adapter.list_relations(database=database, schema=schema)
+        tables = [_describe(relation) for relation in relations]
         source_dict = {"name": source, "database": database, "schema": schema, "tables": tables}
+        yield src_yaml_path_obj, {"version": 2, "sources": [source_dict]}
+
+
+def create_missing_source_yamls(context: t.Any) -> None:
+    """dbt_project.yml の dbt-osmosis 変数で定義されているが、
+    ノードとして存在しないソースのソースファイルを作成します。
 
+    これは、すべてのソースが dbt プロジェクトマニフェストに確実に含まれるようにするための便利な前処理手順です。
+    存在しないソースについては詳細なノード情報がないため、
+    ここでは代替コードパスを使用してそれらをブートストラップしています。
+    """
+    from dbt_osmosis.core.config import _reload_manifest
+
+    logger.info(":factory: Creating missing source YAMLs (if any).")
+    did_side_effect: bool = False
+    for src_yaml_path_obj, doc in iter_missing_source_yamls(context):
         src_yaml_path_obj.parent.mkdir(parents=True, exist_ok=True)
         with src_yaml_path_obj.open("w") as f:
             logger.info(
-                ":books: Injecting new source => %s => %s", source_dict["name"], src_yaml_path_obj
+                ":books: Injecting new source => %s => %s",
+                doc["sources"][0]["name"],
+                src_yaml_path_obj,
             )
-            context.yaml_handler.dump({"version": 2, "sources": [source_dict]}, f)
+            context.yaml_handler.dump(doc, f)
             context.register_mutations(1)
 
         did_side_effect = True
@@ -0,0 +1,284 @@
+"""変換パイプラインをワーカー プロセスで実行するモード。
+
+継承グラフの構築、`_sync_doc_section`、ruamel.yaml のダンプは純粋な Python の CPU 処理であり、GIL により
+スレッドを増やしても速くなりません。このモードでは候補ノードを同期先のスキーマ ファイルごとにまとめて
+シャードに分割し、fork したワーカー プロセスで変換と同期を行います。各スキーマ ファイルは 1 つのシャードだけが
+所有するため、ワーカーがダンプした YAML を親プロセスでそのまま書き込むだけでマージできます。
+
+ワーカーはアダプターに接続しません。列のイントロスペクションは fork の前に親プロセスのスレッド プールで
+行われ、その結果のキャッシュがワーカーに引き継がれます。
+
+上流ノードを参照する操作 (`node_local` でない操作) はシャードをまたぐため、操作はパイプラインの順に
+フェーズに分けられ、各フェーズのワーカーは前のフェーズの結果をマージした後に fork されます。継承のように
+上流ノードだけを読み取る操作 (`topological` な操作) は、ノードを DAG の深さごとのレベルに分け、上流の
+レベルから順にワーカーで実行します。各レベルのワーカーは上流のレベルの結果をマージした後に fork されるため、
+完了した上流ノードのスナップショットを参照します。それ以外の操作は親プロセスでプロジェクト全体に対して実行されます。
+"""
+
+from __future__ import annotations
+
+import io
+import multiprocessing
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from dbt.artifacts.resources.types import NodeType
+from dbt.contracts.graph.nodes import ResultNode
+
+import dbt_osmosis.core.logger as logger
+import dbt_osmosis.core.tracing as tracing
+
+__all__ = [
+    "ShardResult",
+    "can_fork",
+    "run_pipeline_in_processes",
+]
+
+_FORKED: tuple[t.Any, list[t.Any]] | None = None
+"""fork したワーカーに引き継ぐ (コンテキスト, 操作) のペア。"""
+
+
+@dataclass
+class ShardResult:
+    """ワーカーがシャードを処理した結果。"""
+
+    documents: dict[Path, bytes] = field(default_factory=dict)
+    """シャードが所有するスキーマ ファイルのパスと、ダンプした YAML"""
+    nodes: dict[str, tuple[str, dict[str, t.Any]]] = field(default_factory=dict)
+    """ノードの unique_id と、変換後の (説明, 列)"""
+
+
+def can_fork() -> bool:
+    """このプラットフォームで fork によるワーカー プロセスを使用できるかどうかを返します。"""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _shard_nodes(context: t.Any, shards: int) -> list[tuple[list[Path], list[str]]]:
+    """候補ノードを同期先のスキーマ ファイルごとにまとめ、ノード数が均等になるようにシャードへ詰めます。"""
+    from dbt_osmosis.core.node_filters import _iter_candidate_nodes
+    from dbt_osmosis.core.sync_operations import _get_sync_path
+
+    groups: dict[Path, list[str]] = {}
+    for uid, node in _iter_candidate_nodes(context):
+        groups.setdefault(_get_sync_path(context, node), []).append(uid)
+
+    bins: list[tuple[list[Path], list[str]]] = [([], []) for _ in range(min(shards, len(groups)))]
+    for path, uids in sorted(groups.items(), key=lambda item: len(item[1]), reverse=True):
+        paths, members = min(bins, key=lambda b: len(b[1]))
+        paths.append(path)
+        members.extend(uids)
+    return bins
+
+
+def _prefetch_columns(context: t.Any, uids: t.Iterable[str]) -> None:
+    """ワーカーがアダプターに触れずに済むよう、列のイントロスペクション結果をキャッシュに読み込みます。"""
+    from dbt_osmosis.core.introspection import get_columns
+
+    nodes = [_lookup(context, uid) for uid in uids]
+    with tracing.span("Prefetch columns", "introspection", nodes=len(nodes)):
+        for _ in context.pool.map(partial(get_columns, context), nodes):
+            ...
+
+
+def _lookup(context: t.Any, uid: str) -> ResultNode:
+    manifest = context.project.manifest
+    return t.cast(ResultNode, manifest.nodes.get(uid) or manifest.sources[uid])
+
+
+def _reset_forked_state() -> None:
+    """fork 直後のワーカーで、親プロセスのスレッドに紐づく状態を作り直します。"""
+    import dbt_osmosis.core.config as config
+    from dbt_osmosis.core.concurrency import InstrumentedLock, InstrumentedThreadPool
+
+    assert _FORKED is not None
+    context, _ = _FORKED
+    # NOTE: locks may have been held by parent threads at fork time, and pool threads do not survive it
+    context.yaml_handler_lock = InstrumentedLock("yaml_handler_lock")
+    context.pool = InstrumentedThreadPool(max_workers=1)
+    context.journal = None
+    project = context.project
+    project._adapter_mutex = InstrumentedLock("adapter_mutex")
+    project._manifest_mutex = InstrumentedLock("manifest_mutex")
+    config._ADAPTERS = config._AdapterRegistry()
+    # NOTE: never refresh the inherited adapter connection, columns come from the prefetched cache
+    project.connection_ttl = float("inf")
+    _ = tracing.stop_tracing()
+
+
+def _run_shard(paths: list[Path], uids: list[str], sync: bool) -> ShardResult:
+    """ワーカー プロセスでシャードのノードを変換します。
+
+    `sync` が True の場合は、ノードを YAML に同期し、所有するスキーマ ファイルをダンプします。
+    """
+    from dbt_osmosis.core.schema.reader import _YAML_BUFFER_CACHE
+    from dbt_osmosis.core.sync_operations import sync_node_to_yaml
+
+    assert _FORKED is not None
+    context, operations = _FORKED
+    nodes = [_lookup(context, uid) for uid in uids]
+    for node in nodes:
+        for op in operations:
+            _ = op(context, node)
+
+    result = ShardResult()
+    for node in nodes:
+        result.nodes[node.unique_id] = (node.description, dict(node.columns))
+    if not sync:
+        return result
+
+    synced_models: set[str] = set()
+    for node in nodes:
+        # NOTE: mirrors the project-wide sync, which syncs each versioned model name once
+        if node.resource_type == NodeType.Model:
+            if node.name in synced_models:
+                continue
+            synced_models.add(node.name)
+        sync_node_to_yaml(context, node, commit=False)
+
+    for path in paths:
+        if (doc := _YAML_BUFFER_CACHE.get(path)) is None:
+            continue
+        context.yaml_handler.dump(doc, staging := io.BytesIO())
+        result.documents[path] = staging.getvalue()
+    return result
+
+
+def _merge(context: t.Any, result: ShardResult) -> None:
+    """ワーカーの結果をマニフェストに反映し、変更されたスキーマ ファイルを書き込みます。"""
+    from dbt_osmosis.core.schema.reader import _YAML_BUFFER_CACHE
+
+    for uid, (description, columns) in result.nodes.items():
+        node = _lookup(context, uid)
+        node.description = description
+        node.columns = columns
+    for path, content in result.documents.items():
+        _ = _YAML_BUFFER_CACHE.pop(path, None)
+        if context.settings.dry_run:
+            continue
+        original = path.read_bytes() if path.is_file() else b""
+        if content == original:
+            logger.debug(":white_check_mark: Skipping write => %s (no changes)", path)
+            continue
+        logger.info(":writing_hand: Writing changes to => %s", path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _ = path.write_bytes(content)
+        context.register_mutations(1)
+
+
+def _run_phase(
+    context: t.Any,
+    shards: list[tuple[list[Path], list[str]]],
+    operations: list[t.Any],
+    processes: int,
+    sync: bool,
+) -> None:
+    """ノード単位の操作をワーカー プロセスで実行し、結果をマージします。"""
+    global _FORKED
+    _FORKED = (context, operations)
+    try:
+        # NOTE: a fresh pool per phase, so workers fork after the previous phase was merged
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_reset_forked_state,
+        ) as executor:
+            futures = [
+                executor.submit(_run_shard, paths, members, sync) for paths, members in shards
+            ]
+            for future in futures:
+                with tracing.span("Merge shard", "process"):
+                    _merge(context, future.result())
+    finally:
+        _FORKED = None
+
+
+def _topological_levels(context: t.Any) -> list[list[str]]:
+    """継承の対象ノードを、上流の対象ノードがすべて前のレベルに含まれるようにレベルへ分けます。"""
+    from dbt_osmosis.core.node_filters import _iter_candidate_nodes
+
+    manifest = context.project.manifest
+    members = {uid for uid, _ in _iter_candidate_nodes(context, include_external=True)}
+    depths: dict[str, int] = {}
+
+    def _depth(uid: str) -> int:
+        if (depth := depths.get(uid)) is not None:
+            return depth
+        depth = 0
+        node = manifest.nodes.get(uid) or manifest.sources.get(uid)
+        for dep in getattr(getattr(node, "depends_on", None), "nodes", []):
+            # NOTE: mirrors the ancestor tree, which walks through non-candidate ancestors as well
+            if dep.startswith(("model.", "seed.", "source.")) and (
+                dep in manifest.nodes or dep in manifest.sources
+            ):
+                depth = max(depth, _depth(dep) + (dep in members))
+        depths[uid] = depth
+        return depth
+
+    levels: dict[int, list[str]] = {}
+    for uid in sorted(members):
+        levels.setdefault(_depth(uid), []).append(uid)
+    return [levels[depth] for depth in sorted(levels)]
+
+
+def _run_levels(context: t.Any, op: t.Any, processes: int) -> None:
+    """上流ノードだけを読み取る操作を、上流のレベルから順にワーカー プロセスで実行します。"""
+    levels = _topological_levels(context)
+    logger.info(
+        ":gear: Running => %s on worker processes in => %s upstream-first levels",
+        op.name,
+        len(levels),
+    )
+    for level in levels:
+        shards: list[tuple[list[Path], list[str]]] = [
+            ([], level[i::processes]) for i in range(min(processes, len(level)))
+        ]
+        with tracing.span("Run level", "process", operation=op.name, nodes=len(level)):
+            _run_phase(context, shards, [op], len(shards), sync=False)
+
+
+def run_pipeline_in_processes(context: t.Any, operations: list[t.Any], processes: int) -> None:
+    """変換操作をワーカー プロセスで実行し、結果の YAML を書き込みます。
+
+    連続するノード単位の操作はワーカーで各ノードに順に適用され、`topological` な操作は上流のレベルから
+    順にワーカーで実行されます。それ以外の操作はフェーズの間に親プロセスで実行されます。最後のフェーズで
+    ノードが YAML に同期されます。書き込みは親プロセスで行われ、`dry_run` の場合は何も書き込みません。
+    """
+    shards = _shard_nodes(context, processes * 4)
+    uids = [uid for _, members in shards for uid in members]
+    logger.info(
+        ":rocket: Running => %s nodes in => %s shards on => %s worker processes",
+        len(uids),
+        len(shards),
+        processes,
+    )
+    if not uids:
+        return
+    if fallback := [
+        op.name
+        for op in operations
+        if not getattr(op, "node_local", False) and not getattr(op, "topological", False)
+    ]:
+        logger.info(
+            ":warning: Operations => %s read nodes across shards and run in the parent process",
+            fallback,
+        )
+    _ = context.read_catalog()
+    _prefetch_columns(context, uids)
+
+    local: list[t.Any] = []
+    for op in operations:
+        if getattr(op, "node_local", False):
+            local.append(op)
+            continue
+        if local:
+            _run_phase(context, shards, local, processes, sync=False)
+            local = []
+        if getattr(op, "topological", False):
+            _run_levels(context, op, processes)
+            continue
+        logger.info(":gear: Running => %s across all nodes in the parent process", op.name)
+        _ = op(context)
+    _run_phase(context, shards, local, processes, sync=True)
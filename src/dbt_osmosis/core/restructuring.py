@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import copy
+import hashlib
+import io
+import json
 import threading
 import typing as t
-from concurrent.futures import FIRST_EXCEPTION, Future, wait
+from concurrent.futures import Future, wait
 from dataclasses import dataclass, field
+from itertools import chain
 from pathlib import Path
 
 from dbt.artifacts.resources.types import NodeType
 from dbt.contracts.graph.nodes import ModelNode, ResultNode, SeedNode, SourceDefinition
 
 import dbt_osmosis.core.logger as logger
+from dbt_osmosis.core.concurrency import after_all
 
 __all__ = [
     "RestructureOperation",
@@ -17,11 +23,19 @@ __all__ = [
     "_generate_minimal_model_yaml",
     "_generate_minimal_source_yaml",
     "_create_operations_for_node",
+    "_merge_restructure_operations",
+    "iter_restructure_operations",
+    "iter_source_bootstrap_operations",
     "draft_restructure_delta_plan",
     "pretty_print_plan",
+    "SupersededNodeRef",
+    "dump_restructure_plan",
+    "iter_restructure_plan_file",
+    "load_restructure_plan",
     "_remove_models",
     "_remove_seeds",
     "_remove_sources",
+    "apply_restructure_operations",
     "apply_restructure_plan",
 ]
 
@@ -127,67 +141,98 @@ def _create_operations_for_node(
     return ops
 
 
-def draft_restructure_delta_plan(context: t.Any) -> RestructureDeltaPlan:
-    """dbt プロジェクトの再編成計画を起草します。"""
-    logger.info(":bulb: Drafting restructure delta plan for the project.")
-    plan = RestructureDeltaPlan()
-    lock = threading.Lock()
+def _merge_source_tables(into: dict[str, t.Any], other: dict[str, t.Any]) -> dict[str, t.Any]:
+    """同じ名前の 2 つの source エントリを、テーブル名をキーとして重複排除しながらマージします。"""
+    tables = {tbl.get("name"): tbl for tbl in into.get("tables", [])}
+    for tbl in other.get("tables", []):
+        _ = tables.setdefault(tbl.get("name"), tbl)
+    return {**into, "tables": list(tables.values())}
+
+
+def _merge_restructure_operations(
+    file_path: Path, operations: t.Iterable[RestructureOperation]
+) -> RestructureOperation | None:
+    """同じターゲット ファイルに対する操作を 1 つの操作にマージします。
+
+    models/seeds は名前、sources はソース名 (およびテーブル名) をキーとした辞書で重複排除するため、
+    マージはエントリ数に対して線形です。"""
+    content: dict[str, t.Any] = {}
+    keyed: dict[str, dict[t.Any, dict[str, t.Any]]] = {}
+    superseded_paths: dict[Path, list[ResultNode]] = {}
+    merged_any = False
+    for op in operations:
+        merged_any = True
+        for resource_type, resources in op.content.items():
+            if resource_type in ("models", "seeds", "sources") and isinstance(resources, list):
+                by_name = keyed.setdefault(resource_type, {})
+                _ = content.setdefault(resource_type, [])
+                for entry in resources:
+                    name = entry.get("name")
+                    existing = by_name.get(name)
+                    if existing is None:
+                        by_name[name] = entry
+                    elif resource_type == "sources" and existing is not entry:
+                        by_name[name] = _merge_source_tables(existing, entry)
+                    # duplicate models and seeds are already included
+            elif isinstance(resources, list) and isinstance(content.get(resource_type), list):
+                content[resource_type].extend(resources)
+            else:
+                _ = content.setdefault(resource_type, resources)
+        for path, nodes in op.superseded_paths.items():
+            superseded_paths.setdefault(path, []).extend(nodes)
+    if not merged_any:
+        return None
+    for resource_type, by_name in keyed.items():
+        content[resource_type] = list(by_name.values())
+    return RestructureOperation(
+        file_path=file_path, content=content, superseded_paths=superseded_paths
+    )
 
-    def _job(uid: str, loc: t.Any) -> None:
-        ops = _create_operations_for_node(context, uid, loc)
-        with lock:
-            plan.operations.extend(ops)
 
-    futs: list[Future[None]] = []
+def iter_restructure_operations(context: t.Any) -> t.Iterator[RestructureOperation]:
+    """dbt プロジェクトの再編成操作を、ターゲット ファイルごとに 1 つずつ生成します。
+
+    ノードはターゲット ファイルごとにグループ化され、グループ単位でドキュメントを読み取ってマージするため、
+    メモリに保持されるのは常に 1 つのターゲット ファイル分の内容だけです。"""
     from dbt_osmosis.core.path_management import build_yaml_file_mapping
 
+    groups: dict[Path, list[tuple[str, t.Any]]] = {}
     for uid, loc in build_yaml_file_mapping(context).items():
         if not loc.is_valid:
-            futs.append(context.pool.submit(_job, uid, loc))
-    done, _ = wait(futs, return_when=FIRST_EXCEPTION)
-    for fut in done:
-        exc = fut.exception()
-        if exc:
+            groups.setdefault(loc.target, []).append((uid, loc))
+    logger.info(":bulb: Streaming restructure operations for => %s target files.", len(groups))
+
+    for file_path, members in groups.items():
+        try:
+            ops = list(
+                chain.from_iterable(
+                    context.pool.map(lambda m: _create_operations_for_node(context, *m), members)
+                )
+            )
+        except Exception as exc:
             logger.error(":bomb: Error encountered while drafting plan => %s", exc)
-            raise exc
+            raise
+        if (merged := _merge_restructure_operations(file_path, ops)) is not None:
+            # NOTE: entries alias cached docs that operations applied concurrently may still rewrite
+            merged.content = copy.deepcopy(merged.content)
+            yield merged
 
-    # Deduplicate operations by target file path
-    deduplicated_ops: dict[Path, RestructureOperation] = {}
-    for op in plan.operations:
-        if op.file_path in deduplicated_ops:
-            # merge content rather than replacing
-            existing_op = deduplicated_ops[op.file_path]
-            for resource_type, resources in op.content.items():
-                if resource_type not in existing_op.content:
-                    existing_op.content[resource_type] = resources
-                elif isinstance(resources, list) and isinstance(
-                    existing_op.content[resource_type], list
-                ):
-                    # for model lists, deduplicate by model name
-                    if resource_type in ("models", "seeds"):
-                        existing_models = {
-                            m.get("name"): m for m in existing_op.content[resource_type]
-                        }
-                        for model in resources:
-                            if model.get("name") in existing_models:
-                                # skip duplicate models - they're already included
-                                continue
-                            existing_op.content[resource_type].append(model)
-                    else:
-                        # for other types (like sources), just append
-                        existing_op.content[resource_type].extend(resources)
-
-            # merge superseded paths
-            for path, nodes in op.superseded_paths.items():
-                if path in existing_op.superseded_paths:
-                    existing_op.superseded_paths[path].extend(nodes)
-                else:
-                    existing_op.superseded_paths[path] = nodes
-        else:
-            deduplicated_ops[op.file_path] = op
 
-    plan.operations = list(deduplicated_ops.values())
+def iter_source_bootstrap_operations(context: t.Any) -> t.Iterator[RestructureOperation]:
+    """`create_missing_source_yamls` が作成するソースファイルを、ディスクに書き込まずに作成操作として生成します。
+
+    計画ファイルに記録することで、`--plan-out` が副作用を持たず、`--plan-in` だけでソースも作成されます。"""
+    from dbt_osmosis.core.path_management import iter_missing_source_yamls
+
+    for path, doc in iter_missing_source_yamls(context):
+        logger.info(":books: Planning new source => %s => %s", doc["sources"][0]["name"], path)
+        yield RestructureOperation(file_path=path, content=doc)
+
 
+def draft_restructure_delta_plan(context: t.Any) -> RestructureDeltaPlan:
+    """dbt プロジェクトの再編成計画を起草します。"""
+    logger.info(":bulb: Drafting restructure delta plan for the project.")
+    plan = RestructureDeltaPlan(operations=list(iter_restructure_operations(context)))
     logger.info(":star2: Draft plan creation complete => %s operations", len(plan.operations))
     return plan
 
@@ -205,134 +250,377 @@ def pretty_print_plan(plan: RestructureDeltaPlan) -> None:
             logger.info(":blue_book: %s -> %s", old_paths, op.file_path)
 
 
-def _remove_models(existing_doc: dict[str, t.Any], nodes: list[ResultNode]) -> None:
+_PLAN_FORMAT = "dbt-osmosis-restructure-plan"
+_PLAN_FORMAT_VERSION = 2
+
+
+@dataclass(frozen=True)
+class SupersededNodeRef:
+    """シリアル化された計画から復元された、置き換えられたノードへの軽量な参照。
+
+    ノードの削除に必要な属性だけを持つため、計画の適用時にマニフェストを参照する必要はありません。"""
+
+    unique_id: str
+    resource_type: NodeType
+    name: str
+    source_name: str | None = None
+
+
+def _digest(path: Path) -> str | None:
+    """ファイル内容の SHA-256 を返します。ファイルが存在しない場合は None です。"""
+    if not path.is_file():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _relativize(path: Path, root: Path) -> str:
+    """可能であればプロジェクト ルートからの相対パスを返し、計画ファイルをチェックアウト間で移植可能にします。"""
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def dump_restructure_plan(
+    context: t.Any, operations: t.Iterable[RestructureOperation], path: Path
+) -> int:
+    """再構築操作を JSON Lines 形式で書き出し、書き出した操作の数を返します。
+
+    1 行目はヘッダー、以降は 1 行に 1 操作です。操作は 1 つずつ書き出されるため、
+    `iter_restructure_operations` と組み合わせると計画全体をメモリに保持しません。
+    内容は ruamel.yaml のラウンドトリップで YAML テキストとして保存されるため、日付やタグ付きの値も
+    そのまま復元されます。操作が触れるすべてのファイルについて、計画作成時の内容のハッシュも記録します。"""
+    root = Path(context.project.runtime_cfg.project_root).resolve()
+    header = {
+        "format": _PLAN_FORMAT,
+        "version": _PLAN_FORMAT_VERSION,
+        "project": context.project.runtime_cfg.project_name,
+    }
+    count = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        _ = f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for op in operations:
+            context.yaml_handler.dump(op.content, content := io.StringIO())
+            record = {
+                "file_path": _relativize(op.file_path, root),
+                "content": content.getvalue(),
+                "superseded_paths": {
+                    _relativize(p, root): [
+                        {
+                            "unique_id": n.unique_id,
+                            "resource_type": str(n.resource_type),
+                            "name": n.name,
+                            "source_name": getattr(n, "source_name", None),
+                        }
+                        for n in nodes
+                    ]
+                    for p, nodes in op.superseded_paths.items()
+                },
+                "hashes": {_relativize(p, root): _digest(p) for p in _touched_paths(op)},
+            }
+            _ = f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            count += 1
+    logger.info(":floppy_disk: Wrote restructure plan with => %s operations to => %s", count, path)
+    return count
+
+
+def _read_plan_header(context: t.Any, f: t.TextIO, path: Path) -> None:
+    header = json.loads(f.readline() or "{}")
+    if header.get("format") != _PLAN_FORMAT or header.get("version") != _PLAN_FORMAT_VERSION:
+        raise ValueError(f"Unsupported restructure plan file: {path}")
+    if header.get("project") != context.project.runtime_cfg.project_name:
+        logger.warning(
+            ":warning: Restructure plan was created for project => %s, not => %s",
+            header.get("project"),
+            context.project.runtime_cfg.project_name,
+        )
+
+
+def _verify_restructure_plan(context: t.Any, path: Path, root: Path) -> None:
+    """計画が触れるファイルが計画作成後に変更されていないことを確認します。変更されていれば例外を送出します。"""
+    stale: set[str] = set()
+    with path.open("r", encoding="utf-8") as f:
+        _read_plan_header(context, f, path)
+        for line in f:
+            if not line.strip():
+                continue
+            for p, digest in json.loads(line)["hashes"].items():
+                if _digest(root / p) != digest:
+                    stale.add(p)
+    if stale:
+        raise ValueError(
+            f"Restructure plan {path} is stale, these files changed since it was written: "
+            + ", ".join(sorted(stale))
+        )
+
+
+def iter_restructure_plan_file(context: t.Any, path: Path) -> t.Iterator[RestructureOperation]:
+    """`dump_restructure_plan` で書き出された計画ファイルから再構築操作を 1 つずつ読み込みます。
+
+    パスは現在のプロジェクト ルートに対して解決されるため、マニフェストのフィルタリングや
+    パス解決を再実行する必要はありません。操作を返す前に計画ファイル全体を 1 行ずつ走査し、
+    計画作成後に変更されたファイルがあれば、何も適用されないうちに ValueError を送出します。"""
+    root = Path(context.project.runtime_cfg.project_root).resolve()
+    _verify_restructure_plan(context, path, root)
+    return _iter_plan_records(context, path, root)
+
+
+def _iter_plan_records(context: t.Any, path: Path, root: Path) -> t.Iterator[RestructureOperation]:
+    with path.open("r", encoding="utf-8") as f:
+        _read_plan_header(context, f, path)
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield RestructureOperation(
+                file_path=root / record["file_path"],
+                content=context.yaml_handler.load(io.StringIO(record["content"])),
+                superseded_paths={
+                    root / p: [
+                        SupersededNodeRef(
+                            unique_id=n["unique_id"],
+                            resource_type=NodeType(n["resource_type"]),
+                            name=n["name"],
+                            source_name=n.get("source_name"),
+                        )
+                        for n in nodes
+                    ]
+                    for p, nodes in record["superseded_paths"].items()
+                },
+            )
+
+
+def load_restructure_plan(context: t.Any, path: Path) -> RestructureDeltaPlan:
+    """計画ファイル全体を読み込み、レビューや確認に使用できる RestructureDeltaPlan を返します。"""
+    logger.info(":open_file_folder: Loading restructure plan => %s", path)
+    return RestructureDeltaPlan(operations=list(iter_restructure_plan_file(context, path)))
+
+
+@dataclass
+class _SupersededKeys:
+    """置き換えられたノードを、YAML エントリとの照合に使用するキーのセットにまとめたものです。"""
+
+    models: set[str] = field(default_factory=set)
+    seeds: set[str] = field(default_factory=set)
+    sources: dict[str, set[str]] = field(default_factory=dict)
+    """ソース名 -> 削除するテーブル名のセット"""
+
+    @classmethod
+    def from_nodes(cls, nodes: t.Iterable[ResultNode]) -> _SupersededKeys:
+        """ノードのリストを 1 回走査してキーのセットを構築します。"""
+        keys = cls()
+        for n in nodes:
+            if n.resource_type == NodeType.Model:
+                keys.models.add(n.name)
+            elif n.resource_type == NodeType.Seed:
+                keys.seeds.add(n.name)
+            elif n.resource_type == NodeType.Source:
+                keys.sources.setdefault(n.source_name, set()).add(n.name)
+        return keys
+
+
+def _filter_named(entries: list[dict[str, t.Any]], to_remove: set[str]) -> list[dict[str, t.Any]]:
+    """名前が `to_remove` に含まれるエントリを 1 回の走査で取り除きます。"""
+    if not to_remove:
+        return entries
+    return [e for e in entries if e.get("name") not in to_remove]
+
+
+def _remove_models(
+    existing_doc: dict[str, t.Any],
+    nodes: list[ResultNode],
+    keys: _SupersededKeys | None = None,
+) -> None:
     """再構築計画によって置き換えられた model を削除して、既存の yaml ドキュメントをクリーンアップします。"""
-    logger.debug(":scissors: Removing superseded models => %s", [n.name for n in nodes])
-    to_remove = {n.name for n in nodes if n.resource_type == NodeType.Model}
-    keep = []
-    for section in existing_doc.get("models", []):
-        if section.get("name") not in to_remove:
-            keep.append(section)
-    existing_doc["models"] = keep
+    keys = keys or _SupersededKeys.from_nodes(nodes)
+    logger.debug(":scissors: Removing superseded models => %s", sorted(keys.models))
+    existing_doc["models"] = _filter_named(existing_doc.get("models", []), keys.models)
 
 
-def _remove_seeds(existing_doc: dict[str, t.Any], nodes: list[ResultNode]) -> None:
+def _remove_seeds(
+    existing_doc: dict[str, t.Any],
+    nodes: list[ResultNode],
+    keys: _SupersededKeys | None = None,
+) -> None:
     """再構築計画によって置き換えられた seed を削除して、既存の yaml ドキュメントをクリーンアップします。"""
-    logger.debug(":scissors: Removing superseded seeds => %s", [n.name for n in nodes])
-    to_remove = {n.name for n in nodes if n.resource_type == NodeType.Seed}
-    keep = []
-    for section in existing_doc.get("seeds", []):
-        if section.get("name") not in to_remove:
-            keep.append(section)
-    existing_doc["seeds"] = keep
-
-
-def _remove_sources(existing_doc: dict[str, t.Any], nodes: list[ResultNode]) -> None:
-    """再構築計画によって置き換えられた source を削除して、既存の yaml ドキュメントをクリーンアップします。"""
-    to_remove_sources = {
-        (n.source_name, n.name) for n in nodes if n.resource_type == NodeType.Source
-    }
-    logger.debug(":scissors: Removing superseded sources => %s", sorted(to_remove_sources))
+    keys = keys or _SupersededKeys.from_nodes(nodes)
+    logger.debug(":scissors: Removing superseded seeds => %s", sorted(keys.seeds))
+    existing_doc["seeds"] = _filter_named(existing_doc.get("seeds", []), keys.seeds)
+
+
+def _remove_sources(
+    existing_doc: dict[str, t.Any],
+    nodes: list[ResultNode],
+    keys: _SupersededKeys | None = None,
+) -> None:
+    """再構築計画によって置き換えられた source を削除して、既存の yaml ドキュメントをクリーンアップします。
+
+    削除対象のテーブルはソースごとにまとめられているため、各ソースのテーブルは 1 回だけ走査され、
+    対象外のソースのテーブルには触れません。テーブルが残らないソースは削除されます。"""
+    keys = keys or _SupersededKeys.from_nodes(nodes)
+    logger.debug(
+        ":scissors: Removing superseded sources => %s",
+        sorted((s, tbl) for s, tables in keys.sources.items() for tbl in tables),
+    )
     keep_sources = []
     for section in existing_doc.get("sources", []):
-        keep_tables = []
-        for tbl in section.get("tables", []):
-            if (section["name"], tbl["name"]) not in to_remove_sources:
-                keep_tables.append(tbl)
-        if keep_tables:
-            section["tables"] = keep_tables
+        if tables_to_remove := keys.sources.get(section["name"]):
+            section["tables"] = _filter_named(section.get("tables", []), tables_to_remove)
+        if section.get("tables"):
             keep_sources.append(section)
     existing_doc["sources"] = keep_sources
 
 
-def apply_restructure_plan(
-    context: t.Any, plan: RestructureDeltaPlan, *, confirm: bool = False
-) -> None:
-    """dbt プロジェクトの再編成計画を適用します。"""
-    if not plan.operations:
-        logger.info(":white_check_mark: No changes needed in the restructure plan.")
-        return
-
-    if confirm:
-        logger.info(":warning: Confirm option set => printing plan and waiting for user input.")
-        pretty_print_plan(plan)
-
-    while confirm:
-        response = input("Apply the restructure plan? [y/N]: ")
-        if response.lower() in ("y", "yes"):
-            break
-        elif response.lower() in ("n", "no", ""):
-            logger.info("Skipping restructure plan.")
-            return
-        logger.warning(":loudspeaker: Please respond with 'y' or 'n'.")
-
-    from dbt_osmosis.core.config import _reload_manifest
+def _apply_restructure_operation(context: t.Any, op: RestructureOperation) -> None:
+    """単一の再構築操作を適用し、ターゲット ファイルを書き込んで置き換えられたノードを削除します。"""
     from dbt_osmosis.core.schema.reader import _YAML_BUFFER_CACHE, _read_yaml
     from dbt_osmosis.core.schema.writer import _write_yaml
 
-    for op in plan.operations:
-        logger.debug(":arrow_right: Applying restructure operation => %s", op)
-        output_doc: dict[str, t.Any] = {"version": 2}
-        if op.file_path.exists():
-            existing_data = _read_yaml(
-                context.yaml_handler, context.yaml_handler_lock, op.file_path
-            )
-            output_doc.update(existing_data)
+    logger.debug(":arrow_right: Applying restructure operation => %s", op)
+    output_doc: dict[str, t.Any] = {"version": 2}
+    if op.file_path.exists():
+        # NOTE: cached docs are shared with operations still being drafted, so never edit them in place
+        existing_data = _read_yaml(context.yaml_handler, context.yaml_handler_lock, op.file_path)
+        output_doc.update(copy.deepcopy(existing_data))
+
+    for key, val in op.content.items():
+        if isinstance(val, list):
+            output_doc.setdefault(key, []).extend(val)
+        elif isinstance(val, dict):
+            output_doc.setdefault(key, {}).update(val)
+        else:
+            output_doc[key] = val
 
-        for key, val in op.content.items():
-            if isinstance(val, list):
-                output_doc.setdefault(key, []).extend(val)
-            elif isinstance(val, dict):
-                output_doc.setdefault(key, {}).update(val)
-            else:
-                output_doc[key] = val
-
-        _write_yaml(
-            context.yaml_handler,
-            context.yaml_handler_lock,
-            op.file_path,
-            output_doc,
-            context.settings.dry_run,
-            context.register_mutations,
-        )
+    _write_yaml(
+        context.yaml_handler,
+        context.yaml_handler_lock,
+        op.file_path,
+        output_doc,
+        context.settings.dry_run,
+        context.register_mutations,
+    )
 
-        for path, nodes in op.superseded_paths.items():
-            if path.is_file():
-                existing_data = _read_yaml(context.yaml_handler, context.yaml_handler_lock, path)
-
-                if "models" in existing_data:
-                    _remove_models(existing_data, nodes)
-                if "sources" in existing_data:
-                    _remove_sources(existing_data, nodes)
-                if "seeds" in existing_data:
-                    _remove_seeds(existing_data, nodes)
-
-                keys = set(existing_data.keys()) - {"version"}
-                if all(len(existing_data.get(k, [])) == 0 for k in keys):
-                    if not context.settings.dry_run:
+    for path, nodes in op.superseded_paths.items():
+        if path.is_file():
+            existing_data = copy.deepcopy(
+                _read_yaml(context.yaml_handler, context.yaml_handler_lock, path)
+            )
+
+            keys = _SupersededKeys.from_nodes(nodes)
+            if "models" in existing_data:
+                _remove_models(existing_data, nodes, keys)
+            if "sources" in existing_data:
+                _remove_sources(existing_data, nodes, keys)
+            if "seeds" in existing_data:
+                _remove_seeds(existing_data, nodes, keys)
+
+            sections = set(existing_data.keys()) - {"version"}
+            if all(len(existing_data.get(k, [])) == 0 for k in sections):
+                if not context.settings.dry_run:
+                    # NOTE: held so a concurrent write into the same directory cannot race the rmdir
+                    with context.yaml_handler_lock:
                         path.unlink(missing_ok=True)
                         if path.parent.exists() and not any(path.parent.iterdir()):
                             path.parent.rmdir()
                         if path in _YAML_BUFFER_CACHE:
                             del _YAML_BUFFER_CACHE[path]
-                    context.register_mutations(1)
-                    logger.info(":heavy_minus_sign: Superseded entire file => %s", path)
-                else:
-                    _write_yaml(
-                        context.yaml_handler,
-                        context.yaml_handler_lock,
-                        path,
-                        existing_data,
-                        context.settings.dry_run,
-                        context.register_mutations,
-                    )
-                    logger.info(
-                        ":arrow_forward: Migrated doc from => %s to => %s", path, op.file_path
-                    )
+                context.register_mutations(1)
+                logger.info(":heavy_minus_sign: Superseded entire file => %s", path)
+            else:
+                _write_yaml(
+                    context.yaml_handler,
+                    context.yaml_handler_lock,
+                    path,
+                    existing_data,
+                    context.settings.dry_run,
+                    context.register_mutations,
+                )
+                logger.info(":arrow_forward: Migrated doc from => %s to => %s", path, op.file_path)
+
+
+def _touched_paths(op: RestructureOperation) -> set[Path]:
+    """操作が読み書きするすべてのファイル パスを返します。"""
+    return {op.file_path, *op.superseded_paths}
+
+
+def apply_restructure_operations(
+    context: t.Any,
+    operations: t.Iterable[RestructureOperation],
+    *,
+    max_pending: int | None = None,
+) -> int:
+    """再構築操作を生成されるそばから適用し、最後に一度だけコミットとマニフェストの再読み込みを行います。
+
+    操作はコンテキストのスレッドプールで並行に適用されます。ターゲット ファイルまたは置き換えられるファイルを
+    共有する操作は依存関係として扱われ、先行する操作が完了してからプールに投入されるため、ファイルごとの順序は
+    保証され、ワーカー スレッドが依存関係を待ってブロックすることもありません。実行中の操作数は `max_pending`
+    (既定ではプールのワーカー数の 2 倍) に制限されるため、`iter_restructure_operations` と組み合わせると、
+    計画全体をメモリに保持せずに再編成できます。いずれかの操作が失敗すると、それ以降の操作は投入も適用も
+    されず、最初の例外が送出されます。`operations` の生成中に例外が発生した場合は、投入済みの操作の完了を
+    待ってから送出します。適用した操作の数を返します。"""
+    if max_pending is None:
+        max_pending = 2 * (getattr(context.pool, "max_workers", None) or 1)
+    window = threading.BoundedSemaphore(max(1, max_pending))
+    failed = threading.Event()
+    errors: list[BaseException] = []
+    last_touch: dict[Path, Future[None]] = {}
+    applied = 0
+
+    def _run(op: RestructureOperation, done: Future[None]) -> None:
+        try:
+            if not failed.is_set():
+                _apply_restructure_operation(context, op)
+        except BaseException as exc:
+            errors.append(exc)
+            failed.set()
+        finally:
+            window.release()
+            done.set_result(None)
+
+    def _submit(op: RestructureOperation, done: Future[None]) -> None:
+        try:
+            _ = context.pool.submit(_run, op, done)
+        except BaseException as exc:
+            errors.append(exc)
+            failed.set()
+            window.release()
+            done.set_result(None)
+
+    try:
+        for op in operations:
+            _ = window.acquire()
+            if failed.is_set():
+                window.release()
+                break
+            touched = _touched_paths(op)
+            deps = list({id(f): f for p in touched if (f := last_touch.get(p))}.values())
+            done: Future[None] = Future()
+            for path in touched:
+                last_touch[path] = done
+            applied += 1
+            after_all(deps, lambda op=op, done=done: _submit(op, done))
+    finally:
+        # NOTE: also on a planning error, so nothing is still writing when it propagates. Every operation
+        # is either the last to touch one of its files or a dependency of one
+        _ = wait(set(last_touch.values()))
+    if errors:
+        logger.error(":bomb: Error encountered while applying restructure plan => %s", errors[0])
+        raise errors[0]
+    logger.debug(
+        ":white_check_mark: Applied => %s operations touching => %s files.",
+        applied,
+        len(last_touch),
+    )
+
+    if not applied:
+        logger.info(":white_check_mark: No changes needed in the restructure plan.")
+        return applied
 
     logger.info(
         ":arrows_counterclockwise: Committing all restructure changes and reloading manifest."
     )
+    from dbt_osmosis.core.config import _reload_manifest
     from dbt_osmosis.core.schema.writer import commit_yamls
 
     commit_yamls(
@@ -342,3 +630,28 @@ def apply_restructure_plan(
         context.register_mutations,
     )
     _reload_manifest(context.project)
+    return applied
+
+
+def apply_restructure_plan(
+    context: t.Any, plan: RestructureDeltaPlan, *, confirm: bool = False
+) -> None:
+    """dbt プロジェクトの再編成計画を適用します。"""
+    if not plan.operations:
+        logger.info(":white_check_mark: No changes needed in the restructure plan.")
+        return
+
+    if confirm:
+        logger.info(":warning: Confirm option set => printing plan and waiting for user input.")
+        pretty_print_plan(plan)
+
+    while confirm:
+        response = input("Apply the restructure plan? [y/N]: ")
+        if response.lower() in ("y", "yes"):
+            break
+        elif response.lower() in ("n", "no", ""):
+            logger.info("Skipping restructure plan.")
+            return
+        logger.warning(":loudspeaker: Please respond with 'y' or 'n'.")
+
+    _ = apply_restructure_operations(context, plan.operations)
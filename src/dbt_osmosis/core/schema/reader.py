@@ -1,10 +1,11 @@
-import threading
 import typing as t
 from pathlib import Path
 
 import ruamel.yaml
 
 import dbt_osmosis.core.logger as logger
+import dbt_osmosis.core.tracing as tracing
+from dbt_osmosis.core.concurrency import LockLike
 
 __all__ = [
     "_read_yaml",
@@ -16,15 +17,16 @@ _YAML_BUFFER_CACHE: dict[Path, t.Any] = {}
 
 
 def _read_yaml(
-    yaml_handler: ruamel.yaml.YAML, yaml_handler_lock: threading.Lock, path: Path
+    yaml_handler: ruamel.yaml.YAML, yaml_handler_lock: LockLike, path: Path
 ) -> dict[str, t.Any]:
     """ディスクから yaml ファイルを読み取ります。
     バッファキャッシュにエントリを追加することで、パス上のすべての操作の一貫性を保ちます。"""
-    with yaml_handler_lock:
+    with tracing.locked(yaml_handler_lock, "YAML lock"):
         if path not in _YAML_BUFFER_CACHE:
             if not path.is_file():
                 logger.debug(":warning: Path => %s is not a file. Returning empty doc.", path)
                 return _YAML_BUFFER_CACHE.setdefault(path, {})
             logger.debug(":open_file_folder: Reading YAML doc => %s", path)
-            _YAML_BUFFER_CACHE[path] = t.cast(dict[str, t.Any], yaml_handler.load(path))
+            with tracing.span("Read YAML", "yaml", path=str(path)):
+                _YAML_BUFFER_CACHE[path] = t.cast(dict[str, t.Any], yaml_handler.load(path))
     return _YAML_BUFFER_CACHE[path]
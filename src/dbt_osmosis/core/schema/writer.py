@@ -1,11 +1,12 @@
 import io
-import threading
 import typing as t
 from pathlib import Path
 
 import ruamel.yaml
 
 import dbt_osmosis.core.logger as logger
+import dbt_osmosis.core.tracing as tracing
+from dbt_osmosis.core.concurrency import LockLike
 from dbt_osmosis.core.schema.reader import _YAML_BUFFER_CACHE
 
 __all__ = [
@@ -16,7 +17,7 @@ __all__ = [
 
 def _write_yaml(
     yaml_handler: ruamel.yaml.YAML,
-    yaml_handler_lock: threading.Lock,
+    yaml_handler_lock: LockLike,
     path: Path,
     data: dict[str, t.Any],
     dry_run: bool = False,
@@ -26,7 +27,10 @@ def _write_yaml(
     バッファキャッシュからパスをクリアします。"""
     logger.debug(":page_with_curl: Attempting to write YAML to => %s", path)
     if not dry_run:
-        with yaml_handler_lock:
+        with (
+            tracing.locked(yaml_handler_lock, "YAML lock"),
+            tracing.span("Write YAML", "yaml", path=str(path)),
+        ):
             path.parent.mkdir(parents=True, exist_ok=True)
             original = path.read_bytes() if path.is_file() else b""
             yaml_handler.dump(data, staging := io.BytesIO())
@@ -46,7 +50,7 @@ def _write_yaml(
 
 def commit_yamls(
     yaml_handler: ruamel.yaml.YAML,
-    yaml_handler_lock: threading.Lock,
+    yaml_handler_lock: LockLike,
     dry_run: bool = False,
     mutation_tracker: t.Callable[[int], None] | None = None,
 ) -> None:
@@ -54,18 +58,19 @@ def commit_yamls(
     バッファキャッシュをクリアし、ミューテーションを登録します。"""
     logger.info(":inbox_tray: Committing all YAMLs from buffer cache to disk.")
     if not dry_run:
-        with yaml_handler_lock:
+        with tracing.locked(yaml_handler_lock, "YAML lock"):
             for path in list(_YAML_BUFFER_CACHE.keys()):
-                original = path.read_bytes() if path.is_file() else b""
-                yaml_handler.dump(_YAML_BUFFER_CACHE[path], staging := io.BytesIO())
-                modified = staging.getvalue()
-                if modified != original:
-                    logger.info(":writing_hand: Writing => %s", path)
-                    with path.open("wb") as f:
-                        logger.info(f"Writing {path}")
-                        _ = f.write(modified)
-                        if mutation_tracker:
-                            mutation_tracker(1)
-                else:
-                    logger.debug(":white_check_mark: Skipping => %s (no changes)", path)
-                del _YAML_BUFFER_CACHE[path]
+                with tracing.span("Write YAML", "yaml", path=str(path)):
+                    original = path.read_bytes() if path.is_file() else b""
+                    yaml_handler.dump(_YAML_BUFFER_CACHE[path], staging := io.BytesIO())
+                    modified = staging.getvalue()
+                    if modified != original:
+                        logger.info(":writing_hand: Writing => %s", path)
+                        with path.open("wb") as f:
+                            logger.info(f"Writing {path}")
+                            _ = f.write(modified)
+                            if mutation_tracker:
+                                mutation_tracker(1)
+                    else:
+                        logger.debug(":white_check_mark: Skipping => %s (no changes)", path)
+                    del _YAML_BUFFER_CACHE[path]
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import threading
 import typing as t
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
@@ -10,9 +9,11 @@ import ruamel.yaml
 from dbt.contracts.results import CatalogResults
 
 import dbt_osmosis.core.logger as logger
+from dbt_osmosis.core.concurrency import InstrumentedLock, InstrumentedThreadPool, LockLike
 
 if t.TYPE_CHECKING:
     from dbt_osmosis.core.config import DbtProjectContext
+    from dbt_osmosis.core.journal import RefactorJournal
 
 __all__ = [
     "EMPTY_STRING",
@@ -62,6 +63,12 @@ class YamlRefactorSettings:
     """ライブ ウェアハウス イントロスペクションの代わりに優先的に使用する dbt catalog.json ファイルへのパス"""
     create_catalog_if_not_exists: bool = False
     """プロジェクトの catalog.json が存在しない場合は生成し、イントロスペクト クエリに使用します。"""
+    checkpoint: bool = False
+    """変換の進捗をジャーナルに記録し、中断された実行を `resume` で再開できるようにします。"""
+    resume: bool = False
+    """前回中断された実行のジャーナルを読み込み、処理済みのノードをスキップします。`checkpoint` を含みます。"""
+    processes: int = 0
+    """2 以上の場合、変換パイプラインをスキーマ ファイル単位でワーカー プロセスに分割して実行します。"""
 
 
 @dataclass
@@ -78,11 +85,13 @@ class YamlRefactorContext:
 
     project: DbtProjectContext  # 循環インポートを避けるための前方参照
     settings: YamlRefactorSettings = field(default_factory=YamlRefactorSettings)
-    pool: ThreadPoolExecutor = field(default_factory=ThreadPoolExecutor)
+    pool: ThreadPoolExecutor = field(default_factory=InstrumentedThreadPool)
     yaml_handler: ruamel.yaml.YAML = field(
         default_factory=lambda: None
     )  # __post_init__ で設定されます
-    yaml_handler_lock: threading.Lock = field(default_factory=threading.Lock)
+    yaml_handler_lock: LockLike = field(
+        default_factory=lambda: InstrumentedLock("yaml_handler_lock")
+    )
 
     placeholders: tuple[str, ...] = (
         EMPTY_STRING,
@@ -92,6 +101,9 @@ class YamlRefactorContext:
         "Undefined",
     )
 
+    journal: RefactorJournal | None = field(default=None, init=False)
+    """変換パイプラインの実行中に開かれるチェックポイント ジャーナル。"""
+
     _mutation_count: int = field(default=0, init=False)
     _catalog: CatalogResults | None = field(default=None, init=False)
 
@@ -143,6 +155,26 @@ class YamlRefactorContext:
         )
         return toplevel_conf.get("yaml_settings", {})
 
+    def concurrency_metrics(self) -> dict[str, t.Any]:
+        """スレッド プールとロックの競合メトリクスを返します。
+
+        計測されていない (`InstrumentedThreadPool` や `InstrumentedLock` でない) ものは含まれません。
+        """
+        pool = self.pool.stats() if isinstance(self.pool, InstrumentedThreadPool) else None
+        candidates = {
+            "yaml_handler_lock": self.yaml_handler_lock,
+            "adapter_mutex": getattr(self.project, "_adapter_mutex", None),
+            "manifest_mutex": getattr(self.project, "_manifest_mutex", None),
+        }
+        return {
+            "pool": pool,
+            "locks": {
+                name: lock.stats()
+                for name, lock in candidates.items()
+                if isinstance(lock, InstrumentedLock)
+            },
+        }
+
     def read_catalog(self) -> CatalogResults | None:
         """カタログ ファイルが存在する場合はそれを読み取ります。"""
         logger.debug(":mag: Checking if catalog is already loaded => %s", bool(self._catalog))
@@ -1,23 +1,112 @@
 from __future__ import annotations
 
+import copy
+import hashlib
+import json
+import os
+import threading
+import typing as t
 import uuid
+import weakref
+from collections import ChainMap, OrderedDict
 
 from agate.table import Table  # pyright: ignore[reportMissingTypeStubs]
 from dbt.adapters.contracts.connection import AdapterResponse
+from dbt.contracts.graph.manifest import Manifest
 from dbt.contracts.graph.nodes import ManifestSQLNode
-from dbt.node_types import NodeType
 from dbt.parser.manifest import process_node
+from dbt.parser.sql import SqlBlockParser
 from dbt.task.sql import SqlCompileRunner
 
 import dbt_osmosis.core.logger as logger
 from dbt_osmosis.core.config import DbtProjectContext
 
 __all__ = [
+    "CompiledSqlCache",
     "compile_sql_code",
     "execute_sql_code",
+    "stream_sql_code",
 ]
 
 
+class CompiledSqlCache:
+    """コンパイル済みの SQL ノードを保持する、スレッドセーフな LRU キャッシュ。
+
+    キーは生の SQL のハッシュ、マニフェストの識別子、ターゲット、変数のハッシュの組です。
+    マニフェストは弱参照で保持され、再読み込みで置き換えられたマニフェストのエントリはヒットしません。
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, ...], tuple[weakref.ref[t.Any], ManifestSQLNode]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(context: DbtProjectContext, raw_sql: str) -> tuple[str, ...]:
+        """SQL とプロジェクトの状態からキャッシュ キーを作成します。"""
+        runtime_cfg = context.runtime_cfg
+        variables = json.dumps(
+            [runtime_cfg.cli_vars, runtime_cfg.vars.to_dict()], sort_keys=True, default=str
+        )
+        return (
+            hashlib.sha256(raw_sql.encode("utf-8")).hexdigest(),
+            str(id(context.manifest)),
+            str(runtime_cfg.target_name),
+            hashlib.sha256(variables.encode("utf-8")).hexdigest(),
+        )
+
+    def get(self, context: DbtProjectContext, key: tuple[str, ...]) -> ManifestSQLNode | None:
+        """キャッシュされたノードを返します。存在しない場合は None を返します。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            # NOTE: ids can be reused once a manifest is collected, so confirm it is the same object
+            if entry is None or entry[0]() is not context.manifest:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, context: DbtProjectContext, key: tuple[str, ...], node: ManifestSQLNode) -> None:
+        """ノードをキャッシュに追加し、上限を超えた場合は最も古いエントリを破棄します。"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (weakref.ref(context.manifest), node)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                _ = self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """すべてのエントリと統計をリセットします。"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, float]:
+        """ヒット数、ミス数、破棄数、ヒット率を返します。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_COMPILED_SQL_CACHE = CompiledSqlCache(int(os.getenv("OSMOSIS_COMPILE_CACHE_SIZE", "256")))
+"""`compile_sql_code` が使用するプロセス全体のキャッシュ。`OSMOSIS_COMPILE_CACHE_SIZE=0` で無効になります。"""
+
+
 def _has_jinja(code: str) -> bool:
     """コード文字列に Jinja トークンが含まれているかどうかを確認します。"""
     logger.debug(":crystal_ball: Checking if code snippet has Jinja => %s", code[:50] + "...")
@@ -25,41 +114,141 @@ def _has_jinja(code: str) -> bool:
 
 
 def compile_sql_code(context: DbtProjectContext, raw_sql: str) -> ManifestSQLNode:
-    """コンテキストのマニフェストとアダプターを使用して jinja SQL をコンパイルします。"""
+    """コンテキストのマニフェストとアダプターを使用して jinja SQL をコンパイルします。
+
+    一時ノードはリクエストごとのオーバーレイ マニフェストに追加されるため、共有マニフェストは変更されず、
+    複数のコンパイルをロックなしで並行して実行できます。結果は `_COMPILED_SQL_CACHE` にキャッシュされます。
+    返されるノードは呼び出し元間で共有されるため、変更しないでください。
+    """
+    cache_key = _COMPILED_SQL_CACHE.key(context, raw_sql)
+    if (cached := _COMPILED_SQL_CACHE.get(context, cache_key)) is not None:
+        logger.debug(":zap: Compiled SQL cache hit => %s", _COMPILED_SQL_CACHE.stats())
+        return cached
+    node = _compile_sql_code(context, raw_sql)
+    _COMPILED_SQL_CACHE.put(context, cache_key, node)
+    return node
+
+
+_MANIFEST_LOOKUPS = (
+    "doc_lookup",
+    "source_lookup",
+    "ref_lookup",
+    "disabled_lookup",
+    "metric_lookup",
+    "saved_query_lookup",
+    "semantic_model_by_measure_lookup",
+    "analysis_lookup",
+    "singular_test_lookup",
+)
+
+
+class _CopyOnWriteNodes(ChainMap[str, t.Any]):
+    """共有マニフェストのノードの上に重ねる、リクエストごとのノード レジストリ。
+
+    書き込みはオーバーレイにのみ行われます。エフェメラル モデルはコンパイル時に CTE として
+    その場で変更されるため、最初に読み取られたときにオーバーレイへコピーされます。
+    """
+
+    def __getitem__(self, key: str) -> t.Any:
+        overlay = self.maps[0]
+        if key in overlay:
+            return overlay[key]
+        node = super().__getitem__(key)
+        if getattr(node, "is_ephemeral_model", False):
+            node = overlay[key] = copy.deepcopy(node)
+        return node
+
+
+def _overlay_manifest(context: DbtProjectContext) -> Manifest:
+    """共有マニフェストを変更せずに一時ノードを追加できる、コピーオンライトのマニフェスト ビューを作成します。"""
+    manifest = context.manifest
+    if any(getattr(manifest, f"_{name}") is None for name in _MANIFEST_LOOKUPS):
+        # NOTE: warm the lazily built lookups once so every overlay shares them instead of rebuilding
+        with context.manifest_mutex:
+            for name in _MANIFEST_LOOKUPS:
+                _ = getattr(manifest, name)
+    overlay = t.cast(Manifest, object.__new__(type(manifest)))
+    overlay.__dict__.update(manifest.__dict__)
+    overlay.nodes = _CopyOnWriteNodes({}, manifest.nodes)
+    return overlay
+
+
+def _compile_sql_code(context: DbtProjectContext, raw_sql: str) -> ManifestSQLNode:
     logger.info(":zap: Compiling SQL code. Possibly with jinja => %s", raw_sql[:75] + "...")
-    tmp_id = str(uuid.uuid4())
-    with context.manifest_mutex:
-        key = f"{NodeType.SqlOperation}.{context.runtime_cfg.project_name}.{tmp_id}"
-        _ = context.manifest.nodes.pop(key, None)
-
-        node = context.sql_parser.parse_remote(raw_sql, tmp_id)
-        if not _has_jinja(raw_sql):
-            logger.debug(":scroll: No jinja found in the raw SQL, skipping compile steps.")
-            return node
-        process_node(context.runtime_cfg, context.manifest, node)
+    # NOTE: the temporary node only ever lands in this request's overlay, so no lock is needed
+    manifest = _overlay_manifest(context)
+    parser = SqlBlockParser(context.runtime_cfg, manifest, context.runtime_cfg)
+
+    node = parser.parse_remote(raw_sql, str(uuid.uuid4()))
+    if not _has_jinja(raw_sql):
+        logger.debug(":scroll: No jinja found in the raw SQL, skipping compile steps.")
+        return node
+    with context.adapter_scope():
+        process_node(context.runtime_cfg, manifest, node)
         compiled_node = SqlCompileRunner(
             context.runtime_cfg,
             context.adapter,
             node=node,
             node_index=1,
             num_nodes=1,
-        ).compile(context.manifest)
-
-        _ = context.manifest.nodes.pop(key, None)
+        ).compile(manifest)
 
     logger.info(":sparkles: Compilation complete.")
     return compiled_node
 
 
+def _render_sql(context: DbtProjectContext, raw_sql: str) -> str:
+    """SQL に Jinja が含まれている場合はコンパイルし、実行可能な SQL を返します。"""
+    if _has_jinja(raw_sql):
+        comp = compile_sql_code(context, raw_sql)
+        return comp.compiled_code or comp.raw_code
+    return raw_sql
+
+
 def execute_sql_code(context: DbtProjectContext, raw_sql: str) -> tuple[AdapterResponse, Table]:
     """コンテキストのマニフェストとアダプターを使用して Jinja SQL を実行します。"""
     logger.info(":running: Attempting to execute SQL => %s", raw_sql[:75] + "...")
-    if _has_jinja(raw_sql):
-        comp = compile_sql_code(context, raw_sql)
-        sql_to_exec = comp.compiled_code or comp.raw_code
-    else:
-        sql_to_exec = raw_sql
+    sql_to_exec = _render_sql(context, raw_sql)
 
-    resp, table = context.adapter.execute(sql_to_exec, auto_begin=False, fetch=True)
+    with context.adapter_scope():
+        resp, table = context.adapter.execute(sql_to_exec, auto_begin=False, fetch=True)
     logger.info(":white_check_mark: SQL execution complete => %s rows returned.", len(table.rows))  # pyright: ignore[reportUnknownArgumentType]
     return resp, table
+
+
+def stream_sql_code(
+    context: DbtProjectContext, raw_sql: str, chunk_size: int = 1000, max_rows: int | None = None
+) -> tuple[list[str], t.Iterator[list[tuple[t.Any, ...]]]]:
+    """Jinja SQL を実行し、列名と結果行をチャンク単位で返すイテレーターを返します。
+
+    結果は agate テーブルに実体化されず、アダプターのカーソルから `chunk_size` 行ずつ取得されます。
+    `max_rows` を指定すると、その行数で取得を打ち切ります。アダプターの接続はスレッドごとに
+    保持されるため、イテレーターはこの関数を呼び出したスレッドで消費する必要があります。
+
+    メモリ使用量が抑えられるかどうかはアダプターのドライバーに依存します。DuckDB や Snowflake、
+    BigQuery は `fetchmany` のたびに結果を取得しますが、psycopg2 (Postgres、Redshift) や MySQL の
+    既定のカーソルはクエリの実行時に結果全体をクライアントに読み込むため、チャンク化されるのは
+    下流への受け渡しだけです。大きな結果には `max_rows` で上限を設けてください。
+    """
+    logger.info(":ocean: Attempting to stream SQL => %s", raw_sql[:75] + "...")
+    sql_to_exec = _render_sql(context, raw_sql)
+
+    with context.adapter_scope():
+        _, cursor = context.adapter.connections.add_query(sql_to_exec, auto_begin=False)
+    columns = [str(d[0]) for d in cursor.description or ()]
+
+    def _iter_chunks() -> t.Iterator[list[tuple[t.Any, ...]]]:
+        fetched = 0
+        while max_rows is None or fetched < max_rows:
+            size = chunk_size if max_rows is None else min(chunk_size, max_rows - fetched)
+            rows = cursor.fetchmany(size)
+            if not rows:
+                logger.info(
+                    ":white_check_mark: SQL streaming complete => %s rows returned.", fetched
+                )
+                return
+            fetched += len(rows)
+            yield [tuple(row) for row in rows]
+        logger.warning(":scissors: Result truncated at the row cap => %s rows.", max_rows)
+
+    return columns, _iter_chunks()
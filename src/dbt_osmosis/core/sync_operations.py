@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import typing as t
 from functools import partial
+from pathlib import Path
 
 from dbt.contracts.graph.nodes import ModelNode, ResultNode
 from dbt.node_types import NodeType
@@ -9,6 +10,7 @@ from dbt.node_types import NodeType
 import dbt_osmosis.core.logger as logger
 
 __all__ = [
+    "_get_sync_path",
     "_sync_doc_section",
     "sync_node_to_yaml",
 ]
@@ -77,6 +79,19 @@ def _sync_doc_section(context: t.Any, node: ResultNode, doc_section: dict[str, t
     doc_section["columns"] = incoming_columns
 
 
+def _get_sync_path(context: t.Any, node: ResultNode) -> Path:
+    """ノードを同期する YAML ファイルのパスを返します。現在のファイルがない場合はターゲット パスです。"""
+    from dbt_osmosis.core.path_management import get_current_yaml_path, get_target_yaml_path
+
+    current_path = get_current_yaml_path(context, node)
+    if not current_path or not current_path.exists():
+        logger.debug(
+            ":warning: Current path does not exist => %s. Using target path instead.", current_path
+        )
+        current_path = get_target_yaml_path(context, node)
+    return current_path
+
+
 def sync_node_to_yaml(
     context: t.Any, node: t.Optional[ResultNode] = None, *, commit: bool = True
 ) -> None:
@@ -115,17 +130,10 @@ def sync_node_to_yaml(
             ...
         return
 
-    from dbt_osmosis.core.path_management import get_current_yaml_path, get_target_yaml_path
     from dbt_osmosis.core.schema.reader import _read_yaml
     from dbt_osmosis.core.schema.writer import _write_yaml
 
-    current_path = get_current_yaml_path(context, node)
-    if not current_path or not current_path.exists():
-        logger.debug(
-            ":warning: Current path does not exist => %s. Using target path instead.", current_path
-        )
-        current_path = get_target_yaml_path(context, node)
-
+    current_path = _get_sync_path(context, node)
     doc: dict[str, t.Any] = _read_yaml(
         context.yaml_handler, context.yaml_handler_lock, current_path
     )
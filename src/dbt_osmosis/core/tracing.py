@@ -0,0 +1,257 @@
+"""変換パイプラインのパフォーマンス トレース。
+
+ノードや操作ごとのスパン (イントロスペクション、継承、YAML の読み書き、ロック待ちなど) を記録し、
+Chrome のトレース イベント形式 (chrome://tracing や Perfetto で表示可能) または OpenTelemetry の
+OTLP/JSON 形式でファイルに出力します。トレースが開始されていない間、スパンは何も記録しません。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+
+import dbt_osmosis.core.logger as logger
+from dbt_osmosis.core.concurrency import LockLike
+
+__all__ = [
+    "Span",
+    "TraceFormat",
+    "Tracer",
+    "get_tracer",
+    "locked",
+    "span",
+    "start_tracing",
+    "stop_tracing",
+]
+
+TraceFormat = t.Literal["chrome", "otel"]
+
+
+@dataclass(frozen=True)
+class Span:
+    """記録されたスパン。時刻は `time.perf_counter_ns` の値です。"""
+
+    name: str
+    category: str
+    start_ns: int
+    end_ns: int
+    thread_id: int
+    thread_name: str
+    span_id: int
+    parent_id: int | None
+    attributes: dict[str, t.Any]
+
+    @property
+    def duration(self) -> float:
+        """スパンの長さ (秒)。"""
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+class Tracer:
+    """スパンを記録するトレーサー。複数のスレッドから同時に使用できます。
+
+    スパンの親子関係はスレッドごとに追跡されるため、スレッド プールで実行されるノードごとの操作は
+    それぞれのスレッドのトラックに表示されます。
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self.origin_ns = time.perf_counter_ns()
+        self.origin_unix_ns = time.time_ns()
+
+    def _stack(self) -> list[int]:
+        if (stack := getattr(self._local, "stack", None)) is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **attributes: t.Any) -> t.Iterator[None]:
+        """ブロックの実行をスパンとして記録します。例外が発生した場合は `error` 属性に記録されます。"""
+        stack = self._stack()
+        span_id = next(self._ids)
+        parent_id = stack[-1] if stack else None
+        stack.append(span_id)
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as error:
+            attributes["error"] = repr(error)
+            raise
+        finally:
+            end_ns = time.perf_counter_ns()
+            _ = stack.pop()
+            thread = threading.current_thread()
+            record = Span(
+                name,
+                category,
+                start_ns,
+                end_ns,
+                t.cast(int, thread.ident),
+                thread.name,
+                span_id,
+                parent_id,
+                attributes,
+            )
+            with self._lock:
+                self.spans.append(record)
+
+    def _snapshot(self) -> list[Span]:
+        with self._lock:
+            return sorted(self.spans, key=lambda s: s.start_ns)
+
+    def to_chrome(self) -> dict[str, t.Any]:
+        """Chrome のトレース イベント形式 (JSON オブジェクト形式) に変換します。"""
+        pid = os.getpid()
+        events: list[dict[str, t.Any]] = []
+        threads: dict[int, str] = {}
+        for s in self._snapshot():
+            _ = threads.setdefault(s.thread_id, s.thread_name)
+            events.append({
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": (s.start_ns - self.origin_ns) / 1000,
+                "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": s.attributes,
+            })
+        for tid, thread_name in threads.items():
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread_name},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otel(self) -> dict[str, t.Any]:
+        """OpenTelemetry の OTLP/JSON 形式 (`resourceSpans`) に変換します。"""
+        trace_id = os.urandom(16).hex()
+
+        def unix_ns(perf_ns: int) -> str:
+            return str(self.origin_unix_ns + perf_ns - self.origin_ns)
+
+        spans: list[dict[str, t.Any]] = []
+        for s in self._snapshot():
+            attributes = {
+                "osmosis.category": s.category,
+                "thread.id": s.thread_id,
+                "thread.name": s.thread_name,
+                **s.attributes,
+            }
+            spans.append({
+                "traceId": trace_id,
+                "spanId": f"{s.span_id:016x}",
+                "parentSpanId": f"{s.parent_id:016x}" if s.parent_id else "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": unix_ns(s.start_ns),
+                "endTimeUnixNano": unix_ns(s.end_ns),
+                "attributes": [
+                    {"key": key, "value": _otel_value(value)} for key, value in attributes.items()
+                ],
+                "status": {"code": 2 if "error" in s.attributes else 0},
+            })
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": "dbt-osmosis"}}
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "dbt_osmosis"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def slowest_nodes(self, limit: int = 10) -> list[tuple[str, float]]:
+        """ノードごとの合計時間 (秒) が長い順に、ノードの unique_id と合計時間を返します。
+
+        同じノードのスパンが入れ子になっている場合は、最も外側のスパンだけを数えます。
+        """
+        spans = self._snapshot()
+        by_id = {s.span_id: s for s in spans}
+        totals: dict[str, float] = {}
+        for s in spans:
+            if (node := s.attributes.get("node")) is None:
+                continue
+            parent = by_id.get(s.parent_id) if s.parent_id else None
+            if parent is not None and parent.attributes.get("node") == node:
+                continue
+            totals[node] = totals.get(node, 0.0) + s.duration
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def export(self, path: Path | str, format: TraceFormat = "chrome") -> Path:
+        """トレースを JSON ファイルに書き込みます。"""
+        path = Path(path)
+        document = self.to_otel() if format == "otel" else self.to_chrome()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _ = path.write_text(json.dumps(document, default=str), encoding="utf-8")
+        logger.info(":stopwatch: Wrote => %s spans to => %s (%s)", len(self.spans), path, format)
+        for node, seconds in self.slowest_nodes(5):
+            logger.info(":turtle: %.2fs => %s", seconds, node)
+        return path
+
+
+def _otel_value(value: t.Any) -> dict[str, t.Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_TRACER: Tracer | None = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+def get_tracer() -> Tracer | None:
+    """現在のトレーサーを返します。トレースが開始されていない場合は None です。"""
+    return _TRACER
+
+
+def start_tracing() -> Tracer:
+    """新しいトレーサーでトレースを開始し、それを返します。"""
+    global _TRACER
+    _TRACER = Tracer()
+    return _TRACER
+
+
+def stop_tracing() -> Tracer | None:
+    """トレースを停止し、それまで使用していたトレーサーを返します。"""
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    return tracer
+
+
+def span(name: str, category: str = "osmosis", **attributes: t.Any) -> t.ContextManager[None]:
+    """現在のトレーサーでスパンを記録します。トレースが開始されていない場合は何もしません。"""
+    if (tracer := _TRACER) is None:
+        return _NO_SPAN
+    return tracer.span(name, category, **attributes)
+
+
+@contextlib.contextmanager
+def locked(lock: LockLike, name: str) -> t.Iterator[None]:
+    """ロックを取得して保持します。取得までの待ち時間は `lock` カテゴリのスパンとして記録されます。"""
+    with span(f"Wait for {name}", "lock"):
+        _ = lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import atexit
+import threading
 import time
 import typing as t
 from collections import ChainMap
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from functools import partial
 from types import MappingProxyType
@@ -12,6 +14,10 @@ from dbt.artifacts.resources.types import NodeType
 from dbt.contracts.graph.nodes import ColumnInfo, ResultNode
 
 import dbt_osmosis.core.logger as logger
+import dbt_osmosis.core.tracing as tracing
+
+if t.TYPE_CHECKING:
+    from dbt_osmosis.core.journal import RefactorJournal
 
 __all__ = [
     "TransformOperation",
@@ -34,6 +40,11 @@ class TransformOperation:
 
     func: t.Callable[..., t.Any]
     name: str
+    node_local: bool = False
+    """操作が対象のノードだけを読み書きするかどうか。ワーカー プロセスではノード単位の操作だけがシャードで実行されます。"""
+    topological: bool = False
+    """操作が対象のノードに書き込み、読み取るのは対象のノードとその上流ノードだけかどうか。ワーカー プロセスでは
+    上流から順に DAG の深さごとにシャードで実行されます。"""
 
     _result: t.Any | None = field(init=False, default=None)
     _context: t.Any | None = field(init=False, default=None)  # YamlRefactorContext
@@ -59,12 +70,20 @@ class TransformOperation:
         self._context = context
         self._node = node
         self._metadata["started"] = True
+        journal = getattr(context, "journal", None) if node is not None else None
+        if journal is not None and journal.restore(self.name, t.cast(ResultNode, node)):
+            self._metadata["success"] = True
+            return self
+        attributes = {"node": node.unique_id} if node is not None else {}
         try:
-            self.func(context, node)
+            with tracing.span(self.name, "transform", **attributes):
+                self.func(context, node)
             self._metadata["success"] = True
         except Exception as e:
             self._metadata["error"] = str(e)
             raise
+        if journal is not None:
+            journal.record(self.name, t.cast(ResultNode, node))
         return self
 
     def __rshift__(self, next_op: TransformOperation) -> TransformPipeline:
@@ -111,7 +130,125 @@ class TransformPipeline:
             [op.name for op in self.operations],
         )
 
+        processes = self._processes(context, node)
+        journal = self._open_journal(context, node) if not processes else None
         self._metadata["started_at"] = (pipeline_start := time.time())
+        try:
+            with tracing.span("Run pipeline", "pipeline", operations=len(self.operations)):
+                if processes:
+                    from dbt_osmosis.core.process_pool import run_pipeline_in_processes
+
+                    self._metadata["processes"] = processes
+                    run_pipeline_in_processes(context, self.operations, processes)
+                else:
+                    self._run_operations(context, node)
+        finally:
+            if journal is not None:
+                # NOTE: keep the file on failure so the next run can pick up with --resume
+                journal.close()
+                context.journal = None
+        self._metadata["completed_at"] = (pipeline_end := time.time())
+
+        logger.info(
+            ":checkered_flag: [b]Manifest transformation pipeline [green]completed[/green] in => %.2fs[/b]",
+            pipeline_end - pipeline_start,
+        )
+
+        def _commit() -> None:
+            logger.info(":hourglass: Committing all changes to YAML files in batch.")
+            _commit_start = time.time()
+            from dbt_osmosis.core.sync_operations import sync_node_to_yaml
+
+            with tracing.span("Commit YAML", "yaml"):
+                sync_node_to_yaml(context, node, commit=True)
+            _commit_end = time.time()
+            logger.info(
+                ":checkered_flag: YAML commits completed in => %.2fs", _commit_end - _commit_start
+            )
+            if journal is not None:
+                journal.clear()
+
+        if self.commit_mode == "batch" and not processes:
+            _commit()
+        elif self.commit_mode == "defer":
+            _ = atexit.register(_commit)
+        elif journal is not None:
+            journal.clear()
+
+        if hasattr(context, "concurrency_metrics"):
+            from dbt_osmosis.core.concurrency import log_concurrency_summary
+
+            self._metadata["concurrency"] = metrics = context.concurrency_metrics()
+            log_concurrency_summary(metrics)
+
+        return self
+
+    def _processes(self, context: t.Any, node: ResultNode | None) -> int:
+        """ワーカー プロセスで実行する場合はプロセス数を、スレッドで実行する場合は 0 を返します。
+
+        プロセス モードはプロジェクト全体に対する `batch` コミットの実行でのみ使用され、YAML はワーカーの
+        結果をマージするときに書き込まれます。チェックポイントはワーカーでは記録できないため、
+        `checkpoint` または `resume` が有効な場合はスレッドで実行します。
+        """
+        settings = getattr(context, "settings", None)
+        processes = getattr(settings, "processes", 0)
+        if processes < 2 or node is not None:
+            return 0
+        from dbt_osmosis.core.process_pool import can_fork
+
+        if getattr(settings, "checkpoint", False) or getattr(settings, "resume", False):
+            logger.warning(
+                ":warning: Checkpoints are not supported with worker processes, falling back to threads."
+            )
+            return 0
+        if self.commit_mode != "batch":
+            logger.warning(
+                ":warning: Worker processes require the batch commit mode, falling back to threads."
+            )
+            return 0
+        if not can_fork():
+            logger.warning(
+                ":warning: Worker processes require the fork start method, falling back to threads."
+            )
+            return 0
+        if tracing.get_tracer() is not None:
+            logger.warning(
+                ":warning: Spans inside worker processes are not recorded, the trace only covers the parent process."
+            )
+        return processes
+
+    def _open_journal(self, context: t.Any, node: ResultNode | None) -> RefactorJournal | None:
+        """チェックポイントまたは再開が有効なプロジェクト全体に対する実行の場合、ジャーナルを開いてコンテキストに設定します。
+
+        ドライランではジャーナルを作成しません。
+        """
+        if node is not None or not hasattr(context, "journal") or context.journal is not None:
+            return None
+        settings = context.settings
+        if not (getattr(settings, "checkpoint", False) or getattr(settings, "resume", False)):
+            return None
+        if getattr(settings, "dry_run", False):
+            logger.warning(":warning: Checkpoints are not recorded during a dry run.")
+            return None
+        from dbt_osmosis.core.introspection import _COLUMN_LIST_CACHE
+        from dbt_osmosis.core.journal import RefactorJournal
+
+        journal = RefactorJournal.open(
+            context,
+            [op.name for op in self.operations],
+            resume=getattr(context.settings, "resume", False),
+        )
+        if journal:
+            logger.info(
+                ":rewind: Resuming with => %s completed steps and => %s cached relations",
+                len(journal),
+                journal.restore_columns(_COLUMN_LIST_CACHE),
+            )
+            self._metadata["resumed_steps"] = len(journal)
+        context.journal = journal
+        return journal
+
+    def _run_operations(self, context: t.Any, node: ResultNode | None) -> None:
         for op in self.operations:
             logger.info(
                 ":gear:  [b]Starting to[/b] [yellow]%s[/yellow]",
@@ -136,32 +273,11 @@ class TransformPipeline:
                 )
                 from dbt_osmosis.core.sync_operations import sync_node_to_yaml
 
-                sync_node_to_yaml(context, node, commit=True)
+                with tracing.span("Commit YAML", "yaml", operation=op.name):
+                    sync_node_to_yaml(context, node, commit=True)
+                if (journal := getattr(context, "journal", None)) is not None:
+                    journal.record_yaml_state(context)
                 logger.info(":checkered_flag: [b]Committed[/b] \n")
-        self._metadata["completed_at"] = (pipeline_end := time.time())
-
-        logger.info(
-            ":checkered_flag: [b]Manifest transformation pipeline [green]completed[/green] in => %.2fs[/b]",
-            pipeline_end - pipeline_start,
-        )
-
-        def _commit() -> None:
-            logger.info(":hourglass: Committing all changes to YAML files in batch.")
-            _commit_start = time.time()
-            from dbt_osmosis.core.sync_operations import sync_node_to_yaml
-
-            sync_node_to_yaml(context, node, commit=True)
-            _commit_end = time.time()
-            logger.info(
-                ":checkered_flag: YAML commits completed in => %.2fs", _commit_end - _commit_start
-            )
-
-        if self.commit_mode == "batch":
-            _commit()
-        elif self.commit_mode == "defer":
-            _ = atexit.register(_commit)
-
-        return self
 
     def __repr__(self) -> str:  # pyright: ignore[reportImplicitOverride]
         steps = [op.name for op in self.operations]
@@ -170,18 +286,22 @@ class TransformPipeline:
 
 def _transform_op(
     name: str | None = None,
+    node_local: bool = False,
+    topological: bool = False,
 ) -> t.Callable[[t.Callable[[t.Any, ResultNode | None], None]], TransformOperation]:
     """関数から TransformOperation を作成するためのデコレータ。"""
 
     def decorator(
         func: t.Callable[[t.Any, ResultNode | None], None],  # YamlRefactorContext
     ) -> TransformOperation:
-        return TransformOperation(func, name=name or func.__name__)
+        return TransformOperation(
+            func, name=name or func.__name__, node_local=node_local, topological=topological
+        )
 
     return decorator
 
 
-@_transform_op("Inherit Upstream Column Knowledge")
+@_transform_op("Inherit Upstream Column Knowledge", topological=True)
 def inherit_upstream_column_knowledge(
     context: t.Any,
     node: ResultNode | None = None,  # YamlRefactorContext
@@ -203,7 +323,8 @@ def inherit_upstream_column_knowledge(
     from dbt_osmosis.core.inheritance import _build_column_knowledge_graph
     from dbt_osmosis.core.introspection import _get_setting_for_node
 
-    column_knowledge_graph = _build_column_knowledge_graph(context, node)
+    with tracing.span("Build column knowledge graph", "inheritance", node=node.unique_id):
+        column_knowledge_graph = _build_column_knowledge_graph(context, node)
     kwargs = None
     for name, node_column in node.columns.items():
         kwargs = column_knowledge_graph.get(name)
@@ -234,7 +355,7 @@ def inherit_upstream_column_knowledge(
         node.columns[name] = node_column.replace(**updated_metadata)
 
 
-@_transform_op("Inject Missing Columns")
+@_transform_op("Inject Missing Columns", node_local=True)
 def inject_missing_columns(context: t.Any, node: ResultNode | None = None) -> None:
     """不足している列をdbtノードと対応するyamlセクションに追加します。
     変更は、commit_yamlsが呼び出されるまで暗黙的にバッファリングされます。"""
@@ -283,7 +404,7 @@ def inject_missing_columns(context: t.Any, node: ResultNode | None = None) -> No
             node.columns[incoming_name] = ColumnInfo.from_dict(gen_col)
 
 
-@_transform_op("Remove Extra Columns")
+@_transform_op("Remove Extra Columns", node_local=True)
 def remove_columns_not_in_database(context: t.Any, node: ResultNode | None = None) -> None:
     """dbtノードとそれに対応するyamlセクションから、データベースに存在しない列を削除します。
     変更は、commit_yamlsが呼び出されるまで暗黙的にバッファリングされます。"""
@@ -319,7 +440,7 @@ def remove_columns_not_in_database(context: t.Any, node: ResultNode | None = Non
         _ = node.columns.pop(current_columns[extra_column], None)
 
 
-@_transform_op("Sort Columns in DB Order")
+@_transform_op("Sort Columns in DB Order", node_local=True)
 def sort_columns_as_in_database(context: t.Any, node: ResultNode | None = None) -> None:
     """dbtノード内の列と、それに対応するyamlセクションを、データベースに表示されるとおりにソートします。
     変更は、commit_yamlsが呼び出されるまで暗黙的にバッファリングされます。"""
@@ -354,7 +475,7 @@ def sort_columns_as_in_database(context: t.Any, node: ResultNode | None = None)
     node.columns = {k: v for k, v in sorted(node.columns.items(), key=lambda i: _position(i[0]))}
 
 
-@_transform_op("Sort Columns Alphabetically")
+@_transform_op("Sort Columns Alphabetically", node_local=True)
 def sort_columns_alphabetically(context: t.Any, node: ResultNode | None = None) -> None:
     """dbtノードとそれに対応するyamlセクション内の列をアルファベット順に並べ替えます。
     変更は、commit_yamlsが呼び出されるまで暗黙的にバッファリングされます。"""
@@ -372,7 +493,7 @@ def sort_columns_alphabetically(context: t.Any, node: ResultNode | None = None)
     node.columns = {k: v for k, v in sorted(node.columns.items(), key=lambda i: i[0])}
 
 
-@_transform_op("Sort Columns")
+@_transform_op("Sort Columns", node_local=True)
 def sort_columns_as_configured(context: t.Any, node: ResultNode | None = None) -> None:
     from dbt_osmosis.core.introspection import _get_setting_for_node
     from dbt_osmosis.core.node_filters import _iter_candidate_nodes
@@ -394,7 +515,7 @@ def sort_columns_as_configured(context: t.Any, node: ResultNode | None = None) -
         raise ValueError(f"Invalid sort-by value: {sort_by} for node: {node.unique_id}")
 
 
-@_transform_op("Synchronize Data Types")
+@_transform_op("Synchronize Data Types", node_local=True)
 def synchronize_data_types(context: t.Any, node: ResultNode | None = None) -> None:
     """dbtノードとそれに対応するyamlセクションの列のデータ型を設定します。
     変更は、commit_yamlsが呼び出されるまで暗黙的にバッファリングされます。"""
@@ -443,9 +564,10 @@ def synthesize_missing_documentation_with_openai(
 
     try:
         from dbt_osmosis.core.llm import (
-            generate_column_doc,
+            generate_column_docs,
             generate_model_spec_as_json,
             generate_table_doc,
+            get_synthesis_engine,
         )
     except ImportError:
         raise ImportError(
@@ -453,11 +575,13 @@ def synthesize_missing_documentation_with_openai(
         ) from None
     if node is None:
         logger.info(":wave: Synthesizing missing documentation across all matched nodes.")
-        for _ in context.pool.map(
-            partial(synthesize_missing_documentation_with_openai, context),
-            (n for _, n in _iter_candidate_nodes(context)),
-        ):
-            ...
+        get_synthesis_engine().reset_stats()
+        _synthesize_in_dependency_order(
+            context,
+            synthesize_missing_documentation_with_openai,
+            [n for _, n in _iter_candidate_nodes(context)],
+        )
+        get_synthesis_engine().log_summary()
         return
     # since we are topologically sorted, we continually pass down synthesized knowledge leveraging our inheritance system
     # which minimizes synthesis requests -- in some cases by an order of magnitude while increasing accuracy
@@ -497,6 +621,11 @@ def synthesize_missing_documentation_with_openai(
             break
     if len(upstream_docs) == 1:
         upstream_docs[0] = "(no upstream documentation found)"
+    sql_content = getattr(
+        node,
+        "compiled_sql",
+        f"SELECT {', '.join(node.columns)} FROM {node.schema}.{node.name}",
+    )
     if (
         total - documented
         > 10  # a semi-arbitrary limit by which its probably better to one shot the table versus many smaller requests
@@ -507,11 +636,7 @@ def synthesize_missing_documentation_with_openai(
             node.unique_id,
         )
         spec = generate_model_spec_as_json(
-            getattr(
-                node,
-                "compiled_sql",
-                f"SELECT {', '.join(node.columns)} FROM {node.schema}.{node.name}",
-            ),
+            sql_content,
             upstream_docs=upstream_docs,
             existing_context=f"NodeId={node.unique_id}\nTableDescription={node.description}",
             temperature=0.4,
@@ -522,32 +647,96 @@ def synthesize_missing_documentation_with_openai(
             usr_col = node.columns.get(synth_col["name"])
             if usr_col and (not usr_col.description or usr_col.description in context.placeholders):
                 usr_col.description = synth_col.get("description", usr_col.description)
-    else:
-        if not node.description or node.description in context.placeholders:
-            logger.info(
-                ":robot: Synthesizing documentation for node => %s",
+    elif not node.description or node.description in context.placeholders:
+        logger.info(
+            ":robot: Synthesizing documentation for node => %s",
+            node.unique_id,
+        )
+        node.description = generate_table_doc(
+            sql_content,
+            table_name=node.relation_name or node.name,
+            upstream_docs=upstream_docs,
+        )
+    # NOTE: a one-shot spec for a wide table routinely skips columns, so sweep up whatever is left in batches
+    missing = {
+        column_name: f"DataType={column.data_type or 'unknown'}"
+        for column_name, column in node.columns.items()
+        if not column.description or column.description in context.placeholders
+    }
+    if not missing:
+        return
+    logger.info(
+        ":robot: Synthesizing documentation for => %s columns in node => %s",
+        len(missing),
+        node.unique_id,
+    )
+    for column_name, doc in generate_column_docs(
+        missing,
+        table_name=node.relation_name or node.name,
+        upstream_docs=upstream_docs,
+        temperature=0.7,
+        sql_content=sql_content,
+        existing_context=f"ColumnParent={node.unique_id}\nTableDescription={node.description}",
+    ).items():
+        if isinstance(doc, BaseException):
+            logger.warning(
+                ":warning: Could not synthesize documentation for column => %s in node => %s: %s",
+                column_name,
                 node.unique_id,
+                doc,
             )
-            node.description = generate_table_doc(
-                getattr(
-                    node,
-                    "compiled_sql",
-                    f"SELECT {', '.join(node.columns)} FROM {node.schema}.{node.name}",
-                ),
-                table_name=node.relation_name or node.name,
-                upstream_docs=upstream_docs,
+            continue
+        node.columns[column_name].description = doc
+
+
+def _synthesize_in_dependency_order(
+    context: t.Any, op: TransformOperation, nodes: list[ResultNode]
+) -> None:
+    """ノードごとの合成をスレッドプールで並行して実行します。各ノードは上流の候補ノードの完了後に開始されます。
+
+    ノードは上流の Future の完了コールバックからプールに投入されるため、ワーカーが他のノードの完了を
+    待ってブロックすることはありません。上流の合成が失敗した場合、下流のノードは実行されずに同じ例外で
+    失敗し、最初の例外が送出されます。"""
+    from dbt_osmosis.core.concurrency import after_all
+
+    futures: dict[str, Future[None]] = {}
+    total = len(nodes)
+    done = 0
+    done_lock = threading.Lock()
+
+    def _run(node: ResultNode, future: Future[None]) -> None:
+        nonlocal done
+        try:
+            _ = op(context, node)
+        except BaseException as error:
+            future.set_exception(error)
+            return
+        with done_lock:
+            done += 1
+            logger.info(
+                ":robot: Synthesized documentation for => %s/%s nodes (%s)",
+                done,
+                total,
+                node.unique_id,
             )
-        for column_name, column in node.columns.items():
-            if not column.description or column.description in context.placeholders:
-                logger.info(
-                    ":robot: Synthesizing documentation for column => %s in node => %s",
-                    column_name,
-                    node.unique_id,
-                )
-                column.description = generate_column_doc(
-                    column_name,
-                    existing_context=f"DataType={column.data_type or 'unknown'}>\nColumnParent={node.unique_id}\nTableDescription={node.description}",
-                    table_name=node.relation_name or node.name,
-                    upstream_docs=upstream_docs,
-                    temperature=0.7,
-                )
+        future.set_result(None)
+
+    def _start(node: ResultNode, upstream: list[Future[None]], future: Future[None]) -> None:
+        if failed := next((dep for dep in upstream if dep.exception() is not None), None):
+            future.set_exception(t.cast(BaseException, failed.exception()))
+            return
+        try:
+            _ = context.pool.submit(_run, node, future)
+        except BaseException as error:
+            future.set_exception(error)
+
+    for node in nodes:
+        upstream = [
+            futures[uid]
+            for uid in t.cast(list[str], getattr(node, "depends_on_nodes", []))
+            if uid in futures
+        ]
+        futures[node.unique_id] = future = Future()
+        after_all(upstream, partial(_start, node, upstream, future))
+    for future in futures.values():
+        _ = future.result()
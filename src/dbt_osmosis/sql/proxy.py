@@ -3,10 +3,14 @@
 
 import asyncio
 import functools
+import os
 import re
+import threading
+import time
 import typing as t
 from collections import defaultdict
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 
 from dbt.adapters.contracts.connection import AdapterResponse
@@ -26,11 +30,14 @@ import dbt_osmosis.core.logger as logger
 from dbt_osmosis.core.osmosis import (
     DbtConfiguration,
     DbtProjectContext,
-    _has_jinja,  # pyright: ignore[reportPrivateUsage]
+    YamlRefactorContext,
+    commit_yamls,
     compile_sql_code,
     create_dbt_project_context,
-    execute_sql_code,
+    stream_sql_code,
+    sync_node_to_yaml,
 )
+from dbt_osmosis.core.sql_operations import _has_jinja  # pyright: ignore[reportPrivateUsage]
 
 ALTER_TABLE_MODIFY_COLUMN_COMMENT = re.compile(
     r"(?i)(?:/\*.*?\*/\s*)?ALTER TABLE\s+(?:(?P<schema>[^\s\.]+)\.)?(?P<table>[^\s\.]+)\s+MODIFY COLUMN\s+(?P<column>[^\s]+)\s+.*?COMMENT\s+'(?P<comment>[^']*)';?"
@@ -55,10 +62,304 @@ class QueryException(MysqlError):
         self.response: AdapterResponse = response
 
 
+T = t.TypeVar("T")
+
+
+class QueryExecutor:
+    """プロキシのクエリを実行する、接続スロットで構成された上限付きのエグゼキューター。
+
+    各スロットは 1 スレッドのエグゼキューターで、dbt アダプターの接続はスレッドごとに保持されるため、
+    スロットごとに専用の接続を持ちます。クエリはその実行中だけスロットを借りるので、同時に実行される
+    クエリ同士が 1 つの接続を奪い合うことはありません。空きスロットを待つクエリの数が上限を超えると、
+    新しいクエリはすぐにエラーになります (バックプレッシャー)。
+    """
+
+    def __init__(self, size: int = 4, max_queued: int = 64) -> None:
+        self.size = max(1, size)
+        self.max_queued = max_queued
+        self._slots = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"osmosis-proxy-{i}")
+            for i in range(self.size)
+        ]
+        self._free: asyncio.Queue[ThreadPoolExecutor] | None = None
+        self._queued = 0
+        self._active = 0
+        self._metrics: dict[str, float] = {
+            "queries": 0,
+            "rejected": 0,
+            "failed": 0,
+            "peak_queued": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, default_size: int = 4) -> "QueryExecutor":
+        """`OSMOSIS_PROXY_CONNECTIONS` と `OSMOSIS_PROXY_MAX_QUEUED` 環境変数から構成します。"""
+        return cls(
+            size=int(os.getenv("OSMOSIS_PROXY_CONNECTIONS", str(default_size))),
+            max_queued=int(os.getenv("OSMOSIS_PROXY_MAX_QUEUED", "64")),
+        )
+
+    def _free_slots(self) -> "asyncio.Queue[ThreadPoolExecutor]":
+        # NOTE: created lazily so the queue binds to the server's running event loop
+        if self._free is None:
+            self._free = asyncio.Queue()
+            for slot in self._slots:
+                self._free.put_nowait(slot)
+        return self._free
+
+    async def _acquire(self) -> ThreadPoolExecutor:
+        free = self._free_slots()
+        if free.empty() and self._queued >= self.max_queued:
+            self._metrics["rejected"] += 1
+            logger.warning(
+                ":no_entry: Rejecting query, => %s queries already waiting for a connection",
+                self._queued,
+            )
+            raise MysqlError("Too many queued queries, try again later")
+        self._queued += 1
+        self._metrics["peak_queued"] = max(self._metrics["peak_queued"], self._queued)
+        enqueued = time.perf_counter()
+        try:
+            slot = await free.get()
+        finally:
+            self._queued -= 1
+        waited = time.perf_counter() - enqueued
+        self._metrics["wait_seconds_total"] += waited
+        self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+        if waited > 1.0:
+            logger.info(":hourglass: Query waited => %.2fs for a free connection", waited)
+        self._active += 1
+        return slot
+
+    def _release(self, slot: ThreadPoolExecutor, started: float, failed: bool) -> None:
+        self._active -= 1
+        self._metrics["queries"] += 1
+        self._metrics["failed"] += failed
+        self._metrics["run_seconds_total"] += time.perf_counter() - started
+        self._free_slots().put_nowait(slot)
+
+    async def run(self, func: t.Callable[..., T], *args: t.Any) -> T:
+        """空きスロットで関数を実行し、結果を返します。"""
+        slot = await self._acquire()
+        started, failed = time.perf_counter(), False
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                slot, functools.partial(func, *args)
+            )
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(slot, started, failed)
+
+    async def stream(
+        self,
+        func: t.Callable[..., tuple[list[str], t.Iterator[list[T]]]],
+        *args: t.Any,
+    ) -> tuple[list[str], t.AsyncIterator[T]]:
+        """空きスロットで `(列名, チャンクのイテレーター)` を返す関数を実行し、行を非同期に返します。
+
+        チャンクは同じスロットで 1 つずつ取得され、スロットはすべての行が消費されるか
+        イテレーターが閉じられるまで貸し出されたままになります。
+        """
+        loop = asyncio.get_running_loop()
+        slot = await self._acquire()
+        started = time.perf_counter()
+        try:
+            columns, chunks = await loop.run_in_executor(slot, functools.partial(func, *args))
+        except Exception:
+            self._release(slot, started, failed=True)
+            raise
+
+        async def _rows() -> t.AsyncIterator[T]:
+            failed = False
+            try:
+                while (chunk := await loop.run_in_executor(slot, next, chunks, None)) is not None:
+                    for row in chunk:
+                        yield row
+            except Exception:
+                failed = True
+                raise
+            finally:
+                # NOTE: close on the slot thread so the adapter cursor is touched by its owner only
+                await loop.run_in_executor(slot, getattr(chunks, "close", lambda: None))
+                self._release(slot, started, failed)
+
+        return columns, _rows()
+
+    def metrics(self) -> dict[str, float]:
+        """キューの深さ、待機時間、実行時間などのメトリクスを返します。"""
+        queries = self._metrics["queries"] or 1
+        return {
+            **self._metrics,
+            "size": self.size,
+            "active": self._active,
+            "queued": self._queued,
+            "wait_seconds_avg": self._metrics["wait_seconds_total"] / queries,
+            "run_seconds_avg": self._metrics["run_seconds_total"] / queries,
+        }
+
+    def shutdown(self) -> None:
+        """すべてのスロットを停止します。"""
+        for slot in self._slots:
+            slot.shutdown(wait=False)
+
+
+class SchemaCache:
+    """プロジェクトのマニフェストから構築した InfoSchema とリレーション索引をセッション間で共有するキャッシュ。
+
+    マニフェストごとに 1 回だけ `(schema, name)` からノードへの索引とノードごとの列の索引を構築し、
+    InfoSchema は最初のアクセス時に構築します。マニフェストが再読み込みされる (コンテキストの
+    マニフェスト オブジェクトが置き換えられる) とすべてを再構築し、`invalidate` が呼び出されると
+    InfoSchema だけを再構築します。
+    """
+
+    def __init__(self, project: DbtProjectContext) -> None:
+        self.project = project
+        self._lock = threading.Lock()
+        self._manifest: t.Any = None
+        self._info_schema: InfoSchema | None = None
+        self._relations: dict[tuple[str, str], list[t.Any]] = {}
+        self._columns: dict[str, dict[str, t.Any]] = {}
+        self.builds = 0
+
+    def _refresh(self) -> t.Any:
+        manifest = self.project.manifest
+        if manifest is not self._manifest:
+            logger.debug(":books: Indexing proxy relations for manifest => %s", id(manifest))
+            relations: defaultdict[tuple[str, str], list[t.Any]] = defaultdict(list)
+            columns: dict[str, dict[str, t.Any]] = {}
+            for node in chain(manifest.sources.values(), manifest.nodes.values()):
+                relations[(node.schema, node.name)].append(node)
+                columns[node.unique_id] = {c.name: c for c in node.columns.values()}
+            self._relations, self._columns = dict(relations), columns
+            self._info_schema = None
+            self._manifest = manifest
+        return manifest
+
+    def invalidate(self) -> None:
+        """キャッシュされた InfoSchema を破棄し、次回のアクセスで再構築されるようにします。"""
+        with self._lock:
+            self._info_schema = None
+
+    def info_schema(self) -> InfoSchema:
+        """現在のマニフェストに対応する InfoSchema を返します。"""
+        with self._lock:
+            manifest = self._refresh()
+            if self._info_schema is None:
+                logger.debug(":books: Building proxy info schema for manifest => %s", id(manifest))
+                self._info_schema = _build_info_schema(manifest)
+                self.builds += 1
+            return self._info_schema
+
+    def nodes_for(self, schema: str, name: str) -> list[t.Any]:
+        """`(schema, name)` に一致するソースとノードを返します。"""
+        with self._lock:
+            _ = self._refresh()
+            return list(self._relations.get((schema, name), ()))
+
+    def column(self, node: t.Any, name: str) -> t.Any:
+        """ノードの指定された名前の列を返します。存在しない場合は None を返します。"""
+        with self._lock:
+            _ = self._refresh()
+            return self._columns.get(node.unique_id, {}).get(name)
+
+
+class YamlDocWriter:
+    """プロキシで編集された説明をまとめて YAML ファイルに書き込むライター。
+
+    編集されたノードは保留され、`batch_size` 件に達するか、最初の編集から `flush_interval` 秒が
+    経過すると、既存のスキーマ ライター (`sync_node_to_yaml` と `commit_yamls`) で一度に書き込まれます。
+    """
+
+    def __init__(
+        self, project: DbtProjectContext, batch_size: int = 20, flush_interval: float = 2.0
+    ) -> None:
+        self.context = YamlRefactorContext(project)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: dict[str, t.Any] = {}
+        self._timer: threading.Timer | None = None
+        self.flushes = 0
+
+    @classmethod
+    def from_env(cls, project: DbtProjectContext) -> "YamlDocWriter | None":
+        """`OSMOSIS_PROXY_WRITE_YAML`、`OSMOSIS_PROXY_YAML_BATCH_SIZE`、`OSMOSIS_PROXY_YAML_FLUSH_SECONDS` 環境変数から構成します。"""
+        if os.getenv("OSMOSIS_PROXY_WRITE_YAML", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            project,
+            batch_size=int(os.getenv("OSMOSIS_PROXY_YAML_BATCH_SIZE", "20")),
+            flush_interval=float(os.getenv("OSMOSIS_PROXY_YAML_FLUSH_SECONDS", "2.0")),
+        )
+
+    def mark(self, node: t.Any) -> bool:
+        """ノードを書き込み待ちにします。バッチが満杯になった場合は True を返します。"""
+        if node.package_name != self.context.project.runtime_cfg.project_name:
+            logger.debug(
+                ":no_entry_sign: Not persisting docs for package node => %s", node.unique_id
+            )
+            return False
+        with self._lock:
+            self._pending[node.unique_id] = node
+            if self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return len(self._pending) >= self.batch_size
+
+    def flush(self) -> int:
+        """保留中のノードを YAML ファイルに書き込み、書き込んだノードの数を返します。"""
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        # NOTE: serialize flushes, the YAML buffer is shared by the whole context
+        with self._flush_lock:
+            for node in pending:
+                sync_node_to_yaml(self.context, node, commit=False)
+            commit_yamls(self.context)
+            self.flushes += 1
+        logger.info(":writing_hand: Persisted proxy doc edits for => %s nodes", len(pending))
+        return len(pending)
+
+
+def _build_info_schema(manifest: t.Any) -> InfoSchema:
+    """マニフェストのソースとノードから InfoSchema を構築します。"""
+    schema: defaultdict[str, dict[str, dict[str, tuple[str, t.Optional[str]]]]] = defaultdict(dict)
+    for node in chain(manifest.sources.values(), manifest.nodes.values()):
+        schema[node.schema][node.name] = {
+            c.name: (c.data_type or "UNKOWN", c.description) for c in node.columns.values()
+        }
+    iter_columns = mapping_to_columns(schema)
+    return InfoSchema(info_schema_tables(iter_columns))
+
+
 class DbtSession(Session):
-    def __init__(self, project: DbtProjectContext, *args: t.Any, **kwargs: t.Any) -> None:
+    def __init__(
+        self,
+        project: DbtProjectContext,
+        executor: QueryExecutor | None = None,
+        schema_cache: SchemaCache | None = None,
+        doc_writer: YamlDocWriter | None = None,
+        *args: t.Any,
+        **kwargs: t.Any,
+    ) -> None:
         super().__init__(*args, **kwargs)
         self.project: DbtProjectContext = project
+        self.executor: QueryExecutor = executor or QueryExecutor(size=1)
+        self.schema_cache: SchemaCache = schema_cache or SchemaCache(project)
+        self.doc_writer: YamlDocWriter | None = doc_writer
+        self.fetch_size: int = int(os.getenv("OSMOSIS_PROXY_FETCH_SIZE", "1000"))
+        self.max_rows: int | None = int(os.getenv("OSMOSIS_PROXY_MAX_ROWS", "0")) or None
         self.middlewares.append(self._alter_table_comment_middleware)
 
     def _parse(self, sql: str) -> list[exp.Expression]:
@@ -71,9 +372,10 @@ class DbtSession(Session):
         """ALTER TABLE ... MODIFY COLUMN ... COMMENT 文をインターセプトします。
 
         このミドルウェアは、dbt プロジェクトマニフェスト内の列の説明を更新します。
-        最終的には、Yaml コンテキストクラスを使用して、変更内容をディスクに書き込むことも可能です。
+        YAML ライターが設定されている場合は、編集されたノードをまとめて YAML ファイルに書き込みます。
         """
         if isinstance(q.expression, exp.Command):
+            edited: list[t.Any] = []
             lower_sql = q.sql.lower()
             likely_alter_column_comment = all(
                 k in lower_sql for k in ("alter", "table", "modify", "column", "comment")
@@ -82,26 +384,29 @@ class DbtSession(Session):
                 likely_alter_column_comment
                 and _regex_parse_to_complete_dict(q.sql, ALTER_TABLE_MODIFY_COLUMN_COMMENT)
             ):
-                ref = (doc_update_req["schema"], doc_update_req["table"])
-                for node in chain(
-                    self.project.manifest.sources.values(), self.project.manifest.nodes.values()
+                for node in self.schema_cache.nodes_for(
+                    doc_update_req["schema"], doc_update_req["table"]
                 ):
-                    if ref == (node.schema, node.name):
-                        for column in node.columns.values():
-                            if column.name == doc_update_req["column"]:
-                                column.description = doc_update_req["comment"]
-                                break
+                    if column := self.schema_cache.column(node, doc_update_req["column"]):
+                        column.description = doc_update_req["comment"]
+                        edited.append(node)
             likely_alter_table_comment = all(k in lower_sql for k in ("alter", "table", "comment"))
             if doc_update_req := (
                 likely_alter_table_comment
                 and _regex_parse_to_complete_dict(q.sql, ALTER_TABLE_COMMENT)
             ):
-                ref = (doc_update_req["schema"], doc_update_req["table"])
-                for node in chain(
-                    self.project.manifest.sources.values(), self.project.manifest.nodes.values()
+                for node in self.schema_cache.nodes_for(
+                    doc_update_req["schema"], doc_update_req["table"]
                 ):
-                    if ref == (node.schema, node.name):
-                        node.description = doc_update_req["comment"]
+                    node.description = doc_update_req["comment"]
+                    edited.append(node)
+            if edited:
+                # NOTE: comments are surfaced through information_schema, so rebuild it on next access
+                self.schema_cache.invalidate()
+                if self.doc_writer is not None and any([
+                    self.doc_writer.mark(node) for node in edited
+                ]):
+                    _ = await asyncio.to_thread(self.doc_writer.flush)
             return [], []
         return await q.next()
 
@@ -109,26 +414,18 @@ class DbtSession(Session):
         self, expression: exp.Expression, sql: str, attrs: dict[str, t.Any]
     ) -> AllowedResult:
         logger.info("Query: %s", sql)
-        resp, table = await asyncio.to_thread(
-            execute_sql_code, self.project, expression.sql(dialect=self.project.adapter.type())
+        columns, rows = await self.executor.stream(
+            stream_sql_code,
+            self.project,
+            expression.sql(dialect=self.project.adapter.type()),
+            self.fetch_size,
+            self.max_rows,
         )
-        if resp.code:
-            raise QueryException(resp)
-        rows = t.cast(tuple[t.Any], table.rows.values())
-        return [row.values() for row in rows], t.cast(tuple[str], table.column_names)
+        logger.debug("Proxy executor metrics => %s", self.executor.metrics())
+        return rows, columns
 
     async def schema(self):
-        schema: defaultdict[str, dict[str, dict[str, tuple[str, t.Optional[str]]]]] = defaultdict(
-            dict
-        )
-        for node in chain(
-            self.project.manifest.sources.values(), self.project.manifest.nodes.values()
-        ):
-            schema[node.schema][node.name] = {
-                c.name: (c.data_type or "UNKOWN", c.description) for c in node.columns.values()
-            }
-        iter_columns = mapping_to_columns(schema)
-        return InfoSchema(info_schema_tables(iter_columns))
+        return self.schema_cache.info_schema()
 
 
 def mapping_to_columns(schema: dict[str, t.Any]) -> Iterator[Column]:
@@ -163,7 +460,17 @@ def mapping_to_columns(schema: dict[str, t.Any]) -> Iterator[Column]:
 
 if __name__ == "__main__":
     c = DbtConfiguration()
+    project = create_dbt_project_context(c)
+    executor = QueryExecutor.from_env(default_size=project.runtime_cfg.threads or 4)
+    doc_writer = YamlDocWriter.from_env(project)
     server = MysqlServer(
-        session_factory=functools.partial(DbtSession, create_dbt_project_context(c))
+        session_factory=functools.partial(
+            DbtSession, project, executor, SchemaCache(project), doc_writer
+        )
     )
-    asyncio.run(server.serve_forever())
+    try:
+        asyncio.run(server.serve_forever())
+    finally:
+        executor.shutdown()
+        if doc_writer is not None:
+            _ = doc_writer.flush()
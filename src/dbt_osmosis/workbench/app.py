@@ -1,17 +1,16 @@
 # pyright: reportMissingTypeStubs=false, reportUnusedCallResult=false, reportUnknownMemberType=false, reportUntypedFunctionDecorator=false
 import argparse
-import decimal
 import os
 import sys
+import time
 import typing as t
-from collections import OrderedDict
-from datetime import date, datetime
 from textwrap import dedent
 from types import SimpleNamespace
 
 import dbt.config.profile as dbt_profile
 import feedparser
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 import ydata_profiling
 from dbt_common.clients.system import get_env
@@ -21,16 +20,16 @@ from streamlit_elements_fluence import elements, event, sync
 
 from dbt_osmosis.core.osmosis import (
     DbtConfiguration,
-    _reload_manifest,  # pyright: ignore[reportPrivateUsage]
     compile_sql_code,
-    create_dbt_project_context,
     discover_profiles_dir,
     discover_project_dir,
-    execute_sql_code,
+    get_dbt_project_context,
+    stream_sql_code,
 )
 from dbt_osmosis.core.osmosis import (
     DbtProjectContext as DbtProject,
 )
+from dbt_osmosis.workbench.compiler import BackgroundCompiler, compile_into_app
 from dbt_osmosis.workbench.components.dashboard import Dashboard
 from dbt_osmosis.workbench.components.editor import Editor
 from dbt_osmosis.workbench.components.editor import TabName as EditorTab
@@ -38,6 +37,13 @@ from dbt_osmosis.workbench.components.feed import RssFeed
 from dbt_osmosis.workbench.components.preview import Preview
 from dbt_osmosis.workbench.components.profiler import Profiler
 from dbt_osmosis.workbench.components.renderer import Renderer
+from dbt_osmosis.workbench.profiling import ProfileRunner, frame_fingerprint
+from dbt_osmosis.workbench.queries import (
+    BackgroundQuery,
+    QueryRunner,
+    ThreadConnectionCancel,
+    has_pending_work,
+)
 
 st.set_page_config(page_title="dbt-osmosis Workbench", page_icon="🌊", layout="wide")
 
@@ -127,11 +133,37 @@ def change_target() -> None:
     ctx: DbtProject = state.app.ctx
     if ctx.runtime_cfg.target_name != state.app.target_name:
         print(f"Changing target to {state.app.target_name}")
-        ctx.runtime_cfg.target_name = state.app.target_name
-        _reload_manifest(ctx)
+        # NOTE: each target keeps its own parsed manifest and adapter in the process-wide registry
+        state.app.ctx = get_dbt_project_context(
+            DbtConfiguration(
+                project_dir=ctx.config.project_dir,
+                profiles_dir=ctx.config.profiles_dir,
+                profile=ctx.runtime_cfg.profile_name,
+                target=state.app.target_name,
+            )
+        )
         state.app.compiled_query = compile(state.app.query)
 
 
+def project_models(ctx: DbtProject) -> list[t.Any]:
+    """プロジェクト自身のモデル ノードを返す"""
+    model_nodes: list[t.Any] = []
+    for node in ctx.manifest.nodes.values():
+        if node.resource_type == "model" and node.package_name == ctx.runtime_cfg.project_name:
+            model_nodes.append(node)
+    return model_nodes
+
+
+def reload_project() -> None:
+    """ディスク上のプロジェクトからマニフェストを再読み込みする"""
+    set_invocation_context(get_env())
+    ctx: DbtProject = state.app.ctx
+    state.app.ctx = get_dbt_project_context(ctx.config, reload=True)
+    state.app.model_nodes = project_models(state.app.ctx)
+    state.app.compiler.clear()
+    state.app.compiled_query = compile(state.app.query)
+
+
 def inject_model() -> None:
     """モデルをエディターに挿入する"""
     set_invocation_context(get_env())
@@ -203,8 +235,9 @@ def sidebar(ctx: DbtProject) -> None:
 
     st.sidebar.write("Notes")
     st.sidebar.caption(
-        "Refresh the page to reparse dbt. This is useful if any updated models or macros in your physical project on disk have changed and are not yet reflected in the workbench as refable or updated."
+        "Parsed projects are shared by every workbench session and target. Reload to reparse dbt. This is useful if any updated models or macros in your physical project on disk have changed and are not yet reflected in the workbench as refable or updated."
     )
+    st.sidebar.button("🔄 - Reload project", on_click=reload_project, key="reload_project")
 
 
 def compile(sql: str) -> str:
@@ -216,52 +249,141 @@ def compile(sql: str) -> str:
         return str(e)
 
 
-def make_json_compat(v: t.Any) -> t.Any:
-    """JSON シリアル化に対して安全になるように値を変換します。"""
-    if isinstance(v, decimal.Decimal):
-        return float(v)
-    if isinstance(v, date):
-        return v.isoformat()
-    if isinstance(v, datetime):
-        return v.isoformat()
-    return v
+_COMPILE_WAIT_SECONDS = float(os.getenv("OSMOSIS_WORKBENCH_COMPILE_WAIT", "0.75"))
+"""エディターの変更時に、バックグラウンド コンパイルの完了を待つ最大時間 (秒)。"""
 
 
-def run_query() -> None:
-    """dbt コンテキストを使用して SQL クエリを実行します。
+def compile_in_background(sql: str) -> str:
+    """SQL のコンパイルをバックグラウンド コンパイラーに送信します。
 
-    これにより、アプリの状態が変更されます。
+    短時間で完了した場合はコンパイル済みの SQL を返し、そうでない場合は直前の結果を返します。
+    コンパイルが後で完了すると、アプリの状態に直接反映されます。完了するまでは `main` が再描画を
+    ポーリングするため、ユーザーの操作を待たずに表示が更新されます。
     """
-    ctx: DbtProject = state.app.ctx
-    sql = state.app.compiled_query
+    app = state.app
+    ctx: DbtProject = app.ctx
+    return compile_into_app(app, sql, ctx.runtime_cfg.target_name, _COMPILE_WAIT_SECONDS)
+
+
+_FETCH_CHUNK_SIZE = 10_000
+"""クエリ結果をアダプターのカーソルから取得し、Arrow 配列に変換する単位 (行数)。"""
+
+
+def _to_arrow_array(values: t.Sequence[t.Any]) -> pa.Array:
+    """1 列分の値を Arrow 配列に変換します。型を推論できない値は文字列として扱います。"""
     try:
-        state.app.query_state = "running"
-        resp, table = execute_sql_code(ctx, state.app.query_template.format(sql=sql))
-    except Exception as error:
-        state.app.query_state = "error"
-        state.app.query_adapter_resp = str(error)
-        state.app.query_result_columns = []
-    else:
-        state.app.query_state = "success"
-        state.app.query_adapter_resp = resp
-        output = [
-            OrderedDict(zip(table.column_names, (make_json_compat(v) for v in row)))  # pyright: ignore[reportUnknownVariableType,reportUnknownArgumentType]
-            for row in table.rows  # pyright: ignore[reportUnknownVariableType]
-        ]
-        state.app.query_result_df = pd.DataFrame(output)
-        state.app.query_result_columns = [
-            {"field": c, "headerName": c.upper()} for c in t.cast(tuple[str], table.column_names)
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def _concat_column(arrays: list[pa.Array]) -> pa.ChunkedArray:
+    """チャンクごとの配列を 1 列に結合します。チャンク間で型が一致しない場合は文字列に揃えます。"""
+    types = {a.type for a in arrays if not pa.types.is_null(a.type)}
+    if not types:
+        return pa.chunked_array(arrays, type=pa.null())
+    if len(types) == 1:
+        type_ = types.pop()
+        return pa.chunked_array(
+            [pa.nulls(len(a), type=type_) if pa.types.is_null(a.type) else a for a in arrays],
+            type=type_,
+        )
+    return pa.chunked_array([a.cast(pa.string()) for a in arrays], type=pa.string())
+
+
+def fetch_result_frame(
+    ctx: DbtProject, sql: str, progress: t.Callable[[int], None] | None = None
+) -> pd.DataFrame:
+    """SQL を実行し、結果を 1 つの列指向 DataFrame として返します。
+
+    行はアダプターのカーソルからチャンク単位で取得され、すぐに Arrow 配列に変換されるため、
+    結果全体が Python オブジェクトの行として保持されることはありません。decimal 列は float に、
+    date 列は datetime64 にベクトル化して変換されます。`progress` はチャンクを取得するたびに
+    取得済みの行数で呼び出されます。
+    """
+    columns, chunks = stream_sql_code(ctx, sql, chunk_size=_FETCH_CHUNK_SIZE)
+    arrays: list[list[pa.Array]] = [[] for _ in columns]
+    fetched = 0
+    for chunk in chunks:
+        for i, values in enumerate(zip(*chunk)):
+            arrays[i].append(_to_arrow_array(values))
+        fetched += len(chunk)
+        if progress is not None:
+            progress(fetched)
+    table_columns: list[pa.ChunkedArray] = []
+    for chunked in arrays:
+        column = _concat_column(chunked) if chunked else pa.chunked_array([], type=pa.null())
+        if pa.types.is_decimal(column.type):
+            column = column.cast(pa.float64())
+        table_columns.append(column)
+    # NOTE: from_arrays keeps duplicate column names, which SQL results may contain
+    table = pa.Table.from_arrays(table_columns, names=columns)
+    return table.to_pandas(date_as_object=False)
+
+
+_QUERY_TIMEOUT_SECONDS = float(os.getenv("OSMOSIS_WORKBENCH_QUERY_TIMEOUT", "300"))
+"""ワークベンチのクエリがキャンセルされるまでの秒数。`0` の場合はタイムアウトしません。"""
+
+
+def run_query() -> None:
+    """dbt コンテキストを使用して SQL クエリをバックグラウンドで実行します。
+
+    実行中のクエリがある場合はキャンセルされます。結果はクエリの完了時にアプリの状態に反映されます。
+    """
+    app = state.app
+    ctx: DbtProject = app.ctx
+    sql = app.query_template.format(sql=app.compiled_query)
+    if app.query_handle is not None:
+        _ = app.query_handle.cancel()
+
+    def _publish(handle: BackgroundQuery) -> None:
+        # NOTE: runs on the query thread, so it writes to the captured app rather than the session state proxy
+        if handle is not app.query_handle:
+            return
+        if handle.state != "success":
+            app.query_state = handle.state
+            app.query_adapter_resp = handle.error or handle.state
+            app.query_result_columns = []
+            return
+        df: pd.DataFrame = handle.result
+        app.query_adapter_resp = f"OK ({len(df):,} rows in {handle.elapsed:.2f}s)"
+        app.query_result_df = df
+        app.query_result_hash = frame_fingerprint(df)
+        app.query_result_page = 0
+        # NOTE: fields are positional so duplicate column names still render as separate columns
+        app.query_result_columns = [
+            {"field": str(i), "headerName": str(c).upper()} for i, c in enumerate(df.columns)
         ]
-        state.app.query_result_rows = output
+        app.query_state = "success"
+
+    # NOTE: only cancel the query thread's connection, other sessions share the adapter
+    cancel_hook = ThreadConnectionCancel(ctx.adapter)
+
+    def _fetch(progress: t.Callable[[int], None]) -> pd.DataFrame:
+        cancel_hook.bind()
+        return fetch_result_frame(ctx, sql, progress)
+
+    app.query_state = "running"
+    app.query_handle = app.query_runner.submit(
+        _fetch,
+        on_done=_publish,
+        cancel_hook=cancel_hook,
+        timeout=_QUERY_TIMEOUT_SECONDS or None,
+    )
+
+
+def cancel_query() -> None:
+    """実行中のクエリをキャンセルします。"""
+    if state.app.query_handle is not None:
+        _ = state.app.query_handle.cancel()
 
 
-def build_profile_report(minimal: bool = True) -> ydata_profiling.ProfileReport:
+def build_profile_report(df: pd.DataFrame, minimal: bool = True) -> ydata_profiling.ProfileReport:
     """指定されたデータフレームのプロファイルレポートを作成します。
 
     これは ydata_profiling ライブラリのラッパーです。
-    ユーザーがSQLクエリを変更するたびにレポートが再実行されるのを避けるためにキャッシュされます。
     """
-    return state.app.query_result_df.profile_report(minimal=minimal)
+    return df.profile_report(minimal=minimal)
 
 
 def convert_profile_report_to_html(profile: ydata_profiling.ProfileReport) -> str:
@@ -270,9 +392,34 @@ def convert_profile_report_to_html(profile: ydata_profiling.ProfileReport) -> st
 
 
 def run_profile(minimal: bool = True) -> None:
-    """プロファイル レポートを実行し、HTML レポートを返します。"""
-    if not state.app.query_result_df.empty:
-        state.app.profile_html = convert_profile_report_to_html(build_profile_report(minimal))
+    """クエリ結果のプロファイルをバックグラウンドで開始します。
+
+    大きな結果はサンプリングされ、レポートは結果ごとにキャッシュされるため、同じ結果を再度
+    プロファイルしても再計算されません。完了したレポートは次の再描画で表示されます。
+    """
+    app = state.app
+    df: pd.DataFrame = app.query_result_df
+    if df.empty:
+        return
+
+    def _publish(html: str, cached: bool) -> None:
+        # NOTE: runs on the profiler thread, so it writes to the captured app rather than the session state proxy
+        app.profile_html = html
+        app.profile_state = "cached" if cached else "done"
+
+    app.profile_state = "profiling"
+    sample_size = app.profile_runner.sample_size
+    app.profile_rows = min(len(df), sample_size) if sample_size > 0 else len(df)
+    _ = app.profile_runner.submit(df, app.query_result_hash, minimal, _publish)
+
+
+_POLL_INTERVAL_SECONDS = 0.5
+"""バックグラウンドの処理が実行中のときに、再描画する間隔 (秒)。"""
+
+
+def _rerun() -> None:
+    rerun = getattr(st, "rerun", None) or getattr(st, "experimental_rerun")
+    rerun()
 
 
 def main():
@@ -287,9 +434,19 @@ def main():
         app = SimpleNamespace(
             model="SCRATCH",
             dashboard=board,
-            editor=Editor(board, 0, 0, 6, 11, minW=3, minH=3, compile_action=compile),
+            editor=Editor(board, 0, 0, 6, 11, minW=3, minH=3, compile_action=compile_in_background),
             renderer=Renderer(board, 6, 0, 6, 11, minW=3, minH=3),
-            preview=Preview(board, 0, 11, 12, 9, minW=3, minH=3, query_action=run_query),
+            preview=Preview(
+                board,
+                0,
+                11,
+                12,
+                9,
+                minW=3,
+                minH=3,
+                query_action=run_query,
+                cancel_action=cancel_query,
+            ),
             profiler=Profiler(board, 0, 20, 8, 9, minW=3, minH=3, prof_action=run_profile),
             feed=RssFeed(board, 8, 20, 4, 9, minW=3, minH=3),
         )
@@ -298,6 +455,16 @@ def main():
                 for k, v in v.initial_state().items():
                     setattr(app, k, v)
 
+        # NOTE: the compiler thread has no script context, so bind the app object instead of `state`
+        app.compiler = BackgroundCompiler(
+            lambda sql: compile_sql_code(app.ctx, sql).compiled_code or "",
+            debounce=float(os.getenv("OSMOSIS_WORKBENCH_COMPILE_DEBOUNCE", "0.3")),
+        )
+        app.query_runner = QueryRunner()
+        app.profile_runner = ProfileRunner(
+            lambda df, minimal: convert_profile_report_to_html(build_profile_report(df, minimal)),
+            sample_size=int(os.getenv("OSMOSIS_WORKBENCH_PROFILE_SAMPLE", "10000")),
+        )
         state.app = app
 
         proj_dir = args.get("project_dir") or discover_project_dir()
@@ -310,7 +477,7 @@ def main():
         else:
             app.query = default_prompt
 
-        app.ctx = create_dbt_project_context(
+        app.ctx = get_dbt_project_context(
             config=DbtConfiguration(project_dir=proj_dir, profiles_dir=prof_dir)
         )
         app.target_name = app.ctx.runtime_cfg.target_name
@@ -318,14 +485,7 @@ def main():
         app.editor.tabs[EditorTab.SQL]["content"] = app.query
         app.compiled_query = compile(app.query) if app.query else ""
 
-        model_nodes: list[t.Any] = []
-        for node in app.ctx.manifest.nodes.values():
-            if (
-                node.resource_type == "model"
-                and node.package_name == app.ctx.runtime_cfg.project_name
-            ):
-                model_nodes.append(node)
-        app.model_nodes = model_nodes
+        app.model_nodes = project_models(app.ctx)
 
         app.editor.update_content("SQL", app.query)
 
@@ -366,6 +526,11 @@ def main():
             app.profiler()
             app.feed()
 
+    if has_pending_work(app):
+        # NOTE: background work publishes into the app state, rerun to pick up progress and results
+        time.sleep(_POLL_INTERVAL_SECONDS)
+        _rerun()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+"""ワークベンチのエディター向けの、デバウンス付きバックグラウンド コンパイラー。"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+__all__ = ["BackgroundCompiler", "compile_into_app"]
+
+
+class BackgroundCompiler:
+    """SQL のコンパイルを 1 つのワーカー スレッドで実行し、結果をキャッシュするコンパイラー。
+
+    `submit` されたジョブは `debounce` 秒待ってから実行され、その間に新しい SQL が送信されると
+    破棄されます (まだ開始していないジョブはキャンセルされます)。結果は SQL のハッシュとターゲットを
+    キーとする LRU キャッシュに保存され、同じ SQL の再送信はすぐに完了します。コンパイル関数が送出した
+    例外はメッセージが結果として返されますが、キャッシュはされません。
+    """
+
+    def __init__(
+        self,
+        compile_fn: t.Callable[[str], str],
+        debounce: float = 0.3,
+        cache_size: int = 64,
+    ) -> None:
+        self._compile_fn = compile_fn
+        self.debounce = debounce
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending: Future[str | None] | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="osmosis-compile")
+        self.stats = {"submitted": 0, "compiled": 0, "cached": 0, "superseded": 0}
+
+    @staticmethod
+    def key(sql: str, target: str) -> tuple[str, str]:
+        """SQL のハッシュとターゲットからキャッシュ キーを作成します。"""
+        return hashlib.sha256(sql.encode("utf-8")).hexdigest(), target
+
+    def submit(
+        self,
+        sql: str,
+        target: str,
+        on_done: t.Callable[[str, float, bool], None],
+    ) -> Future[str | None]:
+        """SQL のコンパイルを予約します。
+
+        完了すると、最新のジョブである場合に限り `on_done(compiled, seconds, cached)` が呼び出されます。
+        破棄されたジョブの Future は None で完了するか、キャンセルされます。
+        """
+        key = self.key(sql, target)
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self.stats["submitted"] += 1
+            if self._pending is not None and self._pending.cancel():
+                self.stats["superseded"] += 1
+            self._pending = None
+            if (compiled := self._cache.get(key)) is not None:
+                self._cache.move_to_end(key)
+                self.stats["cached"] += 1
+                on_done(compiled, 0.0, True)
+                done: Future[str | None] = Future()
+                done.set_result(compiled)
+                return done
+            self._pending = self._executor.submit(self._run, generation, key, sql, on_done)
+            return self._pending
+
+    def _is_current(self, generation: int) -> bool:
+        with self._lock:
+            return generation == self._generation
+
+    def _run(
+        self,
+        generation: int,
+        key: tuple[str, str],
+        sql: str,
+        on_done: t.Callable[[str, float, bool], None],
+    ) -> str | None:
+        time.sleep(self.debounce)
+        if not self._is_current(generation):
+            with self._lock:
+                self.stats["superseded"] += 1
+            return None
+        started = time.perf_counter()
+        try:
+            compiled, failed = self._compile_fn(sql), False
+        except Exception as error:
+            # NOTE: errors are shown in place of the compiled SQL but never cached
+            compiled, failed = str(error), True
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["compiled"] += 1
+            if not failed:
+                self._cache[key] = compiled
+                while len(self._cache) > self.cache_size:
+                    _ = self._cache.popitem(last=False)
+            current = generation == self._generation
+        if current:
+            on_done(compiled, elapsed, False)
+        return compiled
+
+    def clear(self) -> None:
+        """キャッシュされたコンパイル結果を破棄します。"""
+        with self._lock:
+            self._cache.clear()
+
+    def shutdown(self) -> None:
+        """ワーカー スレッドを停止します。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def compile_into_app(app: t.Any, sql: str, target: str, wait: float) -> str:
+    """SQL のコンパイルを `app.compiler` に送信し、結果を `app` に反映します。
+
+    `wait` 秒以内に完了した場合はコンパイル済みの SQL を返し、そうでない場合は直前の結果を返します。
+    コンパイルが後で完了すると `app` に直接反映されます。それまで `app.compile_state` は
+    `compiling` のままなので、呼び出し側はそれを見て再描画をポーリングします。
+    """
+
+    def _publish(compiled: str, seconds: float, cached: bool) -> None:
+        # NOTE: runs on the compiler thread, so it writes to the captured app rather than the session state proxy
+        app.compiled_query = compiled
+        app.compile_state = "cached" if cached else "compiled"
+        app.compile_latency_ms = seconds * 1000
+
+    app.compile_state = "compiling"
+    future = app.compiler.submit(sql, target, _publish)
+    try:
+        _ = future.result(timeout=wait)
+    except (FuturesTimeoutError, CancelledError):
+        pass
+    return app.compiled_query
@@ -23,7 +23,13 @@ class TabName(str, Enum):
 class Editor(Dashboard.Item):
     @staticmethod
     def initial_state() -> dict[str, t.Any]:
-        return {"query": "", "theme": "dark", "lang": "sql"}
+        return {
+            "query": "",
+            "theme": "dark",
+            "lang": "sql",
+            "compile_state": "idle",
+            "compile_latency_ms": None,
+        }
 
     def __init__(
         self,
@@ -56,6 +62,16 @@ class Editor(Dashboard.Item):
         if tab_name == TabName.SQL:
             state.app.compiled_query = self._compile_action(content)
 
+    @staticmethod
+    def _compile_status() -> str:
+        if state.app.compile_state == "compiling":
+            return "Compiling..."
+        if state.app.compile_state == "cached":
+            return "Compiled (cached)"
+        if state.app.compile_latency_ms is not None:
+            return f"Compiled in {state.app.compile_latency_ms:,.0f} ms"
+        return ""
+
     def get_content(self, tab_name: TabName) -> str:
         return self.tabs[tab_name]["content"]
 
@@ -73,6 +89,7 @@ class Editor(Dashboard.Item):
             with self.title_bar("0px 15px 0px 15px"):
                 _ = mui.icon.Terminal()
                 _ = mui.Typography("dbt Workbench")
+                _ = mui.Typography(self._compile_status(), sx={"color": "text.secondary"})
 
                 with mui.Tabs(
                     value=self._index,
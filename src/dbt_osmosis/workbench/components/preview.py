@@ -4,6 +4,8 @@ import typing as t
 from streamlit import session_state as state
 from streamlit_elements_fluence import JSCallback, mui
 
+from dbt_osmosis.workbench.results import PAGE_SIZE, ResultPager
+
 from .dashboard import Dashboard
 
 
@@ -17,14 +19,32 @@ class Preview(Dashboard.Item):
             "query_adapter_resp": None,
             "query_result_df": pd.DataFrame(),
             "query_result_columns": [],
-            "query_result_rows": [],
+            "query_result_hash": "",
+            "query_result_page": 0,
+            "query_result_sort": [],
+            "query_result_pager": ResultPager(),
+            "query_handle": None,
             "query_state": "test",
             "query_template": "select * from ({sql}) as _query limit 200",
         }
 
-    def __init__(self, *args: t.Any, query_action: t.Callable[[], None], **kwargs: t.Any) -> None:
+    def __init__(
+        self,
+        *args: t.Any,
+        query_action: t.Callable[[], None],
+        cancel_action: t.Callable[[], None],
+        **kwargs: t.Any,
+    ) -> None:
         super().__init__(*args, **kwargs)
         self._query_action = query_action
+        self._cancel_action = cancel_action
+
+    def _change_page(self, page: int, *_: t.Any) -> None:
+        state.app.query_result_page = page
+
+    def _change_sort(self, sort_model: list[dict[str, t.Any]], *_: t.Any) -> None:
+        state.app.query_result_sort = list(sort_model or [])
+        state.app.query_result_page = 0
 
     def __call__(self, **props: t.Any) -> None:
         with mui.Paper(
@@ -48,7 +68,24 @@ class Preview(Dashboard.Item):
 
             with mui.Box(sx={"flex": 1, "minHeight": 0}):
                 if state.app.query_state == "running":
-                    _ = mui.CircularProgress(sx={"padding": "25px"})
+                    handle = state.app.query_handle
+                    with mui.Stack(
+                        direction="row", spacing=2, alignItems="center", sx={"padding": "25px"}
+                    ):
+                        _ = mui.CircularProgress()
+                        _ = mui.Typography(
+                            "Fetched {:,} rows in {:.1f}s...".format(
+                                handle.rows_fetched, handle.elapsed
+                            )
+                        )
+                elif state.app.query_state in ("cancelled", "timeout"):
+                    _ = mui.Typography(
+                        "Query {} after {:.1f}s".format(
+                            "cancelled" if state.app.query_state == "cancelled" else "timed out",
+                            state.app.query_handle.elapsed,
+                        ),
+                        sx={"padding": "25px"},
+                    )
                 elif state.app.query_state == "error":
                     _ = mui.Typography(
                         "Error running query\n\n{}".format(state.app.query_adapter_resp),
@@ -57,14 +94,28 @@ class Preview(Dashboard.Item):
                 elif not state.app.query_result_columns:
                     _ = mui.Typography("No results to show...", sx={"padding": "25px"})
                 else:
+                    # NOTE: only the visible page is serialized and sent to the browser, sorting
+                    # happens on the server against a cached row order
                     _ = mui.DataGrid(
                         columns=state.app.query_result_columns,
-                        rows=state.app.query_result_rows,
-                        pageSize=20,
-                        rowsPerPageOptions=[20, 50, 100],
+                        rows=state.app.query_result_pager.page(
+                            state.app.query_result_df,
+                            state.app.query_result_hash,
+                            state.app.query_result_page,
+                            state.app.query_result_sort,
+                        ),
+                        rowCount=len(state.app.query_result_df),
+                        paginationMode="server",
+                        page=state.app.query_result_page,
+                        onPageChange=self._change_page,
+                        sortingMode="server",
+                        sortModel=state.app.query_result_sort,
+                        onSortModelChange=self._change_sort,
+                        pageSize=PAGE_SIZE,
+                        rowsPerPageOptions=[PAGE_SIZE],
                         checkboxSelection=False,
                         disableSelectionOnClick=True,
-                        getRowId=JSCallback("(row) => Math.random()"),
+                        getRowId=JSCallback("(row) => row._rowid"),
                     )
 
             with mui.Stack(direction="row", spacing=2, alignItems="center", sx={"padding": "10px"}):
@@ -74,4 +125,10 @@ class Preview(Dashboard.Item):
                     variant="contained",
                     onClick=lambda: self._query_action(),
                 )
+                _ = mui.Button(
+                    "Cancel",
+                    variant="outlined",
+                    disabled=state.app.query_state != "running",
+                    onClick=lambda: self._cancel_action(),
+                )
                 _ = mui.Typography(f"Or press {run_keybind}", sx={"flex": 1})
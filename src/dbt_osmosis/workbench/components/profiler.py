@@ -11,7 +11,7 @@ from .dashboard import Dashboard
 class Profiler(Dashboard.Item):
     @staticmethod
     def initial_state() -> dict[str, t.Any]:
-        return {"profile_html": ""}
+        return {"profile_html": "", "profile_state": "idle", "profile_rows": 0}
 
     def __init__(self, *args: t.Any, prof_action: t.Callable[[], None], **kwargs: t.Any) -> None:
         super().__init__(*args, **kwargs)
@@ -35,9 +35,20 @@ class Profiler(Dashboard.Item):
                     _ = mui.Typography(
                         "No data to profile, execute a query first", sx={"color": "text.secondary"}
                     )
+                elif state.app.profile_rows and state.app.profile_rows < len(
+                    state.app.query_result_df
+                ):
+                    _ = mui.Typography(
+                        "Sampled {:,} of {:,} rows".format(
+                            state.app.profile_rows, len(state.app.query_result_df)
+                        ),
+                        sx={"color": "text.secondary"},
+                    )
 
             with mui.Box(sx={"flex": 1, "minHeight": 0}):
-                if state.app.profile_html:
+                if state.app.profile_state == "profiling":
+                    _ = mui.CircularProgress(sx={"padding": "25px"})
+                elif state.app.profile_html:
                     _ = html.Iframe(
                         srcDoc=state.app.profile_html,
                         style={"width": "100%", "height": "100%", "border": "none"},
@@ -0,0 +1,125 @@
+"""ワークベンチのプロファイラー向けの、サンプリングとキャッシュ付きのバックグラウンド プロファイリング。"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import threading
+import typing as t
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from html import escape
+from itertools import islice
+
+__all__ = ["ProfileRunner", "frame_fingerprint", "reservoir_sample"]
+
+T = t.TypeVar("T")
+
+
+def reservoir_sample(items: t.Iterable[T], k: int, rng: random.Random | None = None) -> list[T]:
+    """イテラブルから `k` 個の要素を一様に無作為抽出します (Algorithm L)。
+
+    入力は 1 回だけ走査され、長さを事前に知る必要はありません。返される要素は入力順ではありません。
+    """
+    rng = rng or random.Random()
+    iterator = iter(items)
+    reservoir = list(islice(iterator, k))
+    if k <= 0 or len(reservoir) < k:
+        return reservoir
+    w = math.exp(math.log(rng.random()) / k)
+    while True:
+        skip = math.floor(math.log(rng.random()) / math.log(1 - w))
+        try:
+            item = next(islice(iterator, skip, None))
+        except StopIteration:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(rng.random()) / k)
+
+
+def frame_fingerprint(df: t.Any) -> str:
+    """DataFrame の列名と値から、結果を識別するハッシュを作成します。
+
+    ハッシュできない値 (リストなど) を含む場合は、一意なランダム値を返します。
+    """
+    import pandas as pd
+
+    digest = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    except TypeError:
+        return uuid.uuid4().hex
+    return digest.hexdigest()
+
+
+class ProfileRunner:
+    """プロファイル レポートを 1 つのワーカー スレッドで作成し、HTML をキャッシュするランナー。
+
+    `sample_size` 行を超える結果はリザーバー サンプリングした行だけをプロファイルします。
+    レポートは結果のハッシュ、minimal フラグ、サンプル サイズをキーとしてキャッシュされます。
+    """
+
+    def __init__(
+        self,
+        build_html: t.Callable[[t.Any, bool], str],
+        sample_size: int = 10_000,
+        cache_size: int = 8,
+    ) -> None:
+        self._build_html = build_html
+        self.sample_size = sample_size
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, bool, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="osmosis-profile")
+
+    def sample(self, df: t.Any, fingerprint: str) -> t.Any:
+        """プロファイル対象の行を返します。サンプルは結果ごとに決定的です。"""
+        if self.sample_size <= 0 or len(df) <= self.sample_size:
+            return df
+        rows = reservoir_sample(range(len(df)), self.sample_size, random.Random(fingerprint))
+        return df.iloc[sorted(rows)]
+
+    def submit(
+        self,
+        df: t.Any,
+        fingerprint: str,
+        minimal: bool,
+        on_done: t.Callable[[str, bool], None],
+    ) -> Future[str]:
+        """プロファイルを予約します。完了すると `on_done(html, cached)` が呼び出されます。"""
+        key = (fingerprint, minimal, self.sample_size)
+        with self._lock:
+            if (html := self._cache.get(key)) is not None:
+                self._cache.move_to_end(key)
+                on_done(html, True)
+                done: Future[str] = Future()
+                done.set_result(html)
+                return done
+        return self._executor.submit(self._run, key, df, minimal, on_done)
+
+    def _run(
+        self,
+        key: tuple[str, bool, int],
+        df: t.Any,
+        minimal: bool,
+        on_done: t.Callable[[str, bool], None],
+    ) -> str:
+        try:
+            html = self._build_html(self.sample(df, key[0]), minimal)
+        except Exception as error:
+            # NOTE: surface the failure in the report pane instead of leaving it spinning
+            html = f"<pre>Profiling failed: {escape(str(error))}</pre>"
+            on_done(html, False)
+            return html
+        with self._lock:
+            self._cache[key] = html
+            while len(self._cache) > self.cache_size:
+                _ = self._cache.popitem(last=False)
+        on_done(html, False)
+        return html
+
+    def shutdown(self) -> None:
+        """ワーカー スレッドを停止します。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
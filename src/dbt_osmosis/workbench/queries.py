@@ -0,0 +1,179 @@
+"""ワークベンチのクエリをバックグラウンドで実行し、進捗の確認とキャンセルを可能にするランナー。"""
+
+from __future__ import annotations
+
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import dbt_osmosis.core.logger as logger
+
+__all__ = [
+    "BackgroundQuery",
+    "QueryCancelled",
+    "QueryRunner",
+    "ThreadConnectionCancel",
+    "has_pending_work",
+]
+
+
+class QueryCancelled(Exception):
+    """キャンセルまたはタイムアウトによってクエリが中断されたことを示します。"""
+
+
+class ThreadConnectionCancel:
+    """クエリを実行したスレッドの接続だけをキャンセルする `cancel_hook`。
+
+    `adapter.cancel_open_connections` は他のセッションのクエリも含めてすべての接続をキャンセルするため、
+    `bind` を呼び出したスレッドの接続に対してだけアダプターの `cancel` を実行します。アダプターが
+    キャンセルをサポートしていない場合は `NotImplementedError` が送出され、チャンクの取得時に停止します。
+    """
+
+    def __init__(self, adapter: t.Any) -> None:
+        self.adapter = adapter
+        self._thread: t.Hashable | None = None
+
+    def bind(self) -> None:
+        """呼び出したスレッドを、キャンセルの対象として記録します。クエリのスレッドで呼び出します。"""
+        self._thread = self.adapter.connections.get_thread_identifier()
+
+    def __call__(self) -> None:
+        if self._thread is None:
+            return
+        connections = self.adapter.connections
+        with connections.lock:
+            connection = connections.thread_connections.get(self._thread)
+        # NOTE: a failed connection has no handle and nothing in flight to cancel
+        if connection is None or connection.handle is None or connection.state != "open":
+            return
+        connections.cancel(connection)
+
+
+class BackgroundQuery:
+    """バックグラウンドで実行中のクエリのハンドル。
+
+    状態は `running`、`success`、`error`、`cancelled`、`timeout` のいずれかです。
+    `rows_fetched` はクエリの実行中に更新されます。
+    """
+
+    def __init__(self, cancel_hook: t.Callable[[], t.Any] | None = None) -> None:
+        self.state = "running"
+        self.rows_fetched = 0
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.result: t.Any = None
+        self.error: str | None = None
+        self._cancel_hook = cancel_hook
+        self._stop_reason: str | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def elapsed(self) -> float:
+        """クエリの開始から (完了している場合は完了までの) 経過秒数。"""
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def progress(self, rows_fetched: int) -> None:
+        """取得済みの行数を更新します。停止が要求されている場合は `QueryCancelled` を送出します。"""
+        self.rows_fetched = rows_fetched
+        if self._stop_reason is not None:
+            raise QueryCancelled(self._stop_reason)
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """クエリの停止を要求します。
+
+        アダプターがサポートしている場合はウェアハウス側のクエリもキャンセルされ、そうでない場合は
+        次のチャンクの取得時に停止します。すでに完了している場合は False を返します。
+        """
+        with self._lock:
+            if not self.running or self._stop_reason is not None:
+                return False
+            self._stop_reason = reason
+        logger.info(":octagonal_sign: Stopping workbench query => %s", reason)
+        if self._cancel_hook is not None:
+            try:
+                _ = self._cancel_hook()
+            except NotImplementedError:
+                logger.debug(":warning: Adapter cannot cancel queries, stopping between chunks.")
+            except Exception as error:
+                logger.warning(":warning: Failed to cancel the query on the adapter => %s", error)
+        return True
+
+    def _execute(
+        self,
+        fetch: t.Callable[[t.Callable[[int], None]], t.Any],
+        on_done: t.Callable[[BackgroundQuery], None],
+        timeout: float | None,
+    ) -> None:
+        timer: threading.Timer | None = None
+        if timeout:
+            timer = threading.Timer(timeout, self.cancel, kwargs={"reason": "timeout"})
+            timer.daemon = True
+            timer.start()
+        try:
+            # NOTE: stop right away if the query was cancelled while it was still queued
+            self.progress(0)
+            result = fetch(self.progress)
+            # NOTE: a cancel that lands after the last chunk still wins, the user asked to stop
+            self.progress(self.rows_fetched)
+        except Exception as error:
+            self._finish(self._stop_reason or "error", error=str(error))
+        else:
+            self._finish("success", result=result)
+        finally:
+            if timer is not None:
+                timer.cancel()
+        on_done(self)
+
+    def _finish(self, state: str, result: t.Any = None, error: str | None = None) -> None:
+        with self._lock:
+            self.result, self.error = result, error
+            self.finished_at = time.perf_counter()
+            self.state = state
+
+
+class QueryRunner:
+    """クエリを 1 つのワーカー スレッドで実行するランナー。
+
+    ワーカーは専用のスレッドなので、dbt アダプターのスレッドごとの接続を 1 つだけ使用します。
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="osmosis-query")
+
+    def submit(
+        self,
+        fetch: t.Callable[[t.Callable[[int], None]], t.Any],
+        on_done: t.Callable[[BackgroundQuery], None],
+        cancel_hook: t.Callable[[], t.Any] | None = None,
+        timeout: float | None = None,
+    ) -> BackgroundQuery:
+        """`fetch(progress)` をバックグラウンドで実行し、ハンドルを返します。
+
+        `fetch` は行を取得するたびに `progress(rows_fetched)` を呼び出す必要があります。
+        `timeout` 秒を超えるとクエリはキャンセルされ、状態は `timeout` になります。
+        完了すると、状態に関わらず `on_done(handle)` が呼び出されます。
+        """
+        handle = BackgroundQuery(cancel_hook)
+        _ = self._executor.submit(handle._execute, fetch, on_done, timeout)  # pyright: ignore[reportPrivateUsage]
+        return handle
+
+    def shutdown(self) -> None:
+        """ワーカー スレッドを停止します。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def has_pending_work(app: t.Any) -> bool:
+    """クエリ、プロファイル、コンパイルのいずれかがバックグラウンドで実行中かどうかを返します。
+
+    いずれも完了時にアプリの状態へ直接書き込むため、実行中は再描画をポーリングして結果を反映します。
+    """
+    return (
+        app.query_state == "running"
+        or app.profile_state == "profiling"
+        or app.compile_state == "compiling"
+    )
@@ -0,0 +1,107 @@
+"""ワークベンチのプレビュー向けの、サーバー側のページングと並べ替え。"""
+
+from __future__ import annotations
+
+import json
+import threading
+import typing as t
+from collections import OrderedDict
+
+__all__ = ["PAGE_SIZE", "ResultPager", "sort_order"]
+
+PAGE_SIZE = 20
+
+SortModel = t.Sequence[t.Mapping[str, t.Any]]
+
+
+def _is_null(value: t.Any) -> bool:
+    return value is None or value != value
+
+
+def sort_order(
+    values: t.Callable[[str], t.Sequence[t.Any]], sort_model: SortModel, rows: int
+) -> list[int]:
+    """DataGrid の並べ替えモデルに従った行の順序 (元の行番号のリスト) を返します。
+
+    `values(field)` は列の値を返す関数です。並べ替えは安定で、NULL は昇順・降順に関わらず末尾に並びます。
+    比較できない値が混在する列は文字列として比較します。
+    """
+    order = list(range(rows))
+    for item in reversed(sort_model):
+        column = values(str(item["field"]))
+        descending = item.get("sort") == "desc"
+        present = [i for i in order if not _is_null(column[i])]
+        missing = [i for i in order if _is_null(column[i])]
+        try:
+            present.sort(key=column.__getitem__, reverse=descending)
+        except TypeError:
+            present.sort(key=lambda i: str(column[i]), reverse=descending)
+        order = present + missing
+    return order
+
+
+class ResultPager:
+    """クエリ結果の並べ替え済みの行順をキャッシュし、表示するページだけを取り出すページャー。
+
+    行順は結果のハッシュと並べ替えモデルをキーとする LRU キャッシュに保存されるため、
+    ページを移動するたびに結果全体を並べ替え直すことはありません。
+    """
+
+    def __init__(self, cache_size: int = 8) -> None:
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, tuple[tuple[str, str], ...]], list[int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.sorts = 0
+
+    def order(
+        self,
+        fingerprint: str,
+        sort_model: SortModel,
+        values: t.Callable[[str], t.Sequence[t.Any]],
+        rows: int,
+    ) -> list[int] | None:
+        """並べ替え済みの行順を返します。並べ替えが指定されていない場合は None を返します。"""
+        if not sort_model:
+            return None
+        key = (fingerprint, tuple((str(s["field"]), str(s.get("sort"))) for s in sort_model))
+        with self._lock:
+            if (order := self._cache.get(key)) is not None:
+                self._cache.move_to_end(key)
+                return order
+        order = sort_order(values, sort_model, rows)
+        with self._lock:
+            self.sorts += 1
+            self._cache[key] = order
+            while len(self._cache) > self.cache_size:
+                _ = self._cache.popitem(last=False)
+        return order
+
+    def page(
+        self,
+        df: t.Any,
+        fingerprint: str,
+        page: int,
+        sort_model: SortModel = (),
+        page_size: int = PAGE_SIZE,
+    ) -> list[dict[str, t.Any]]:
+        """DataFrame の 1 ページ分だけを JSON 互換のレコードに変換します。
+
+        フィールド名は列の位置で、`_rowid` に結果全体での元の行番号が入ります。
+        """
+        order = self.order(
+            fingerprint, sort_model, lambda field: df.iloc[:, int(field)].tolist(), len(df)
+        )
+        start = page * page_size
+        rowids = list(
+            range(start, min(start + page_size, len(df)))
+            if order is None
+            else order[start : start + page_size]
+        )
+        window = df.iloc[rowids]
+        window = window.set_axis([str(i) for i in range(window.shape[1])], axis=1)
+        records = json.loads(
+            window.to_json(orient="records", date_format="iso", default_handler=str)
+        )
+        for rowid, record in zip(rowids, records):
+            record["_rowid"] = rowid
+        return records
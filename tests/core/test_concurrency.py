@@ -0,0 +1,67 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import threading
+import time
+from types import SimpleNamespace
+
+from dbt_osmosis.core.concurrency import InstrumentedLock, InstrumentedThreadPool
+from dbt_osmosis.core.settings import YamlRefactorContext
+
+
+def test_instrumented_lock_records_waits_and_holds():
+    lock = InstrumentedLock("test")
+    with lock:
+        assert lock.locked()
+        assert not lock.acquire(blocking=False)
+        assert not lock.acquire(timeout=0.01)
+
+        waiter = threading.Thread(target=lambda: lock.acquire() and lock.release())
+        waiter.start()
+        while lock.stats()["waiting"] == 0:
+            time.sleep(0.001)
+        time.sleep(0.02)
+    waiter.join()
+
+    stats = lock.stats()
+    assert stats["acquisitions"] == 2
+    assert stats["contended"] == 1
+    assert stats["wait_seconds"] >= 0.02
+    assert stats["hold_seconds"] >= stats["max_hold_seconds"] >= 0.02
+    assert stats["peak_waiting"] == 1 and stats["waiting"] == 0
+
+
+def test_instrumented_pool_records_queue_depth():
+    pool = InstrumentedThreadPool(max_workers=2)
+    try:
+        assert list(pool.map(lambda i: time.sleep(0.01) or i, range(6))) == list(range(6))
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["tasks"] == 6
+    assert stats["peak_active"] == 2
+    assert stats["peak_queued"] >= 4
+    assert stats["queued"] == 0 and stats["active"] == 0
+    assert stats["max_queue_wait_seconds"] > 0
+    assert 0 < stats["utilization"] <= 1
+
+
+def test_context_exposes_concurrency_metrics():
+    project = SimpleNamespace(
+        runtime_cfg=SimpleNamespace(vars=SimpleNamespace(to_dict=dict), threads=2),
+        _adapter_mutex=InstrumentedLock("adapter_mutex"),
+        _manifest_mutex=threading.Lock(),
+    )
+    context = YamlRefactorContext(project)  # pyright: ignore[reportArgumentType]
+    try:
+        with context.yaml_handler_lock:
+            pass
+        _ = context.pool.submit(int).result()
+        metrics = context.concurrency_metrics()
+    finally:
+        context.pool.shutdown()
+
+    assert metrics["pool"]["workers"] == 2 and metrics["pool"]["tasks"] == 1
+    # NOTE: plain locks are not instrumented, so they are left out
+    assert set(metrics["locks"]) == {"yaml_handler_lock", "adapter_mutex"}
+    assert metrics["locks"]["yaml_handler_lock"]["acquisitions"] == 1
@@ -7,16 +7,22 @@ from pathlib import Path
 from unittest import mock
 
 import pytest
+from dbt.adapters.factory import get_adapter
+from dbt.parser.manifest import ManifestLoader
 
 from dbt_osmosis.core.config import (
     DbtConfiguration,
+    _instantiate_adapter,
+    clear_dbt_project_contexts,
     config_to_namespace,
     create_dbt_project_context,
     discover_profiles_dir,
     discover_project_dir,
+    get_dbt_project_context,
     _reload_manifest,
 )
 from dbt_osmosis.core.settings import YamlRefactorContext, YamlRefactorSettings
+from dbt_osmosis.core.sql_operations import compile_sql_code
 
 
 @pytest.fixture(scope="module")
@@ -105,3 +111,82 @@ def test_adapter_ttl_expiration(yaml_context: YamlRefactorContext):
         assert new_adapter == old_adapter
         mock_release.assert_called_once()
         mock_clear.assert_called_once()
+
+
+def test_get_dbt_project_context_reuses_contexts_per_target():
+    """
+    同じプロジェクトとターゲットではコンテキストが再利用され、ターゲットごとに別のコンテキストと
+    アダプターが作成されることを確認します。
+    """
+    clear_dbt_project_contexts()
+    try:
+        default = get_dbt_project_context(
+            DbtConfiguration(project_dir="demo_duckdb", profiles_dir="demo_duckdb")
+        )
+        dev = get_dbt_project_context(
+            DbtConfiguration(project_dir="demo_duckdb", profiles_dir="demo_duckdb", target="dev")
+        )
+        assert dev is default
+
+        other = get_dbt_project_context(
+            DbtConfiguration(project_dir="demo_duckdb", profiles_dir="demo_duckdb", target="test")
+        )
+        assert other is not default
+        assert other.runtime_cfg.target_name == "test"
+        # NOTE: dbt keeps one adapter per type, the second target must not borrow the first one's
+        assert _instantiate_adapter(other.runtime_cfg).config is other.runtime_cfg
+        # NOTE: jinja compiled in each context must resolve that context's adapter
+        raw_sql = "select '{{ target.name }}', '{{ adapter.config.target_name }}'"
+        assert compile_sql_code(default, raw_sql).compiled_code == "select 'dev', 'dev'"
+        assert compile_sql_code(other, raw_sql).compiled_code == "select 'test', 'test'"
+        assert compile_sql_code(default, raw_sql + " ").compiled_code == "select 'dev', 'dev' "
+        assert default.adapter.config is default.runtime_cfg
+
+        with mock.patch("dbt_osmosis.core.config._reload_manifest") as mock_reload:
+            assert get_dbt_project_context(default.config, reload=True) is default
+            mock_reload.assert_called_once_with(default)
+    finally:
+        clear_dbt_project_contexts()
+
+
+def test_adapter_scope_defers_swaps_until_released():
+    """
+    あるターゲットのアダプターの使用中は、別のターゲットのコンテキストはアダプターを入れ替えずに待つことを確認します。
+    """
+    clear_dbt_project_contexts()
+    try:
+        default = get_dbt_project_context(
+            DbtConfiguration(project_dir="demo_duckdb", profiles_dir="demo_duckdb")
+        )
+        parsed_with: list[str] = []
+        load = ManifestLoader.load
+
+        def _load(loader: ManifestLoader):
+            parsed_with.append(get_adapter(loader.root_project).config.target_name)
+            return load(loader)
+
+        with mock.patch.object(ManifestLoader, "load", autospec=True, side_effect=_load):
+            other = get_dbt_project_context(
+                DbtConfiguration(
+                    project_dir="demo_duckdb", profiles_dir="demo_duckdb", target="test"
+                )
+            )
+        # NOTE: parsing looks the adapter up through dbt, it must not use the dev target's adapter
+        assert parsed_with == ["test"]
+        compiled: list[str] = []
+        with default.adapter_scope():
+            worker = threading.Thread(
+                target=lambda: compiled.append(
+                    compile_sql_code(
+                        other, "select '{{ adapter.config.target_name }}'"
+                    ).compiled_code
+                )
+            )
+            worker.start()
+            worker.join(0.5)
+            assert worker.is_alive()
+            assert default.adapter.config is default.runtime_cfg
+        worker.join(10)
+        assert compiled == ["select 'test'"]
+    finally:
+        clear_dbt_project_contexts()
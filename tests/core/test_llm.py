@@ -0,0 +1,323 @@
+# pyright: reportPrivateImportUsage=false, reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportArgumentType=false, reportUnknownVariableType=false
+
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+
+from dbt_osmosis.core import llm  # noqa: E402
+from dbt_osmosis.core.llm import (  # noqa: E402
+    CompletionCache,
+    RateLimiter,
+    SynthesisEngine,
+    compact_sql,
+    count_tokens,
+    generate_column_doc,
+    generate_column_docs,
+    select_upstream_docs,
+)
+
+
+def _timeout_error():
+    return openai.APITimeoutError(request=httpx.Request("POST", "https://example.invalid"))
+
+
+@pytest.fixture
+def engine_factory():
+    """テスト用のエンジンを作成し、テスト終了時に停止します。"""
+    engines: list[SynthesisEngine] = []
+
+    def factory(request, **kwargs):
+        engine = SynthesisEngine(request=request, **kwargs)
+        engine._backoff = lambda attempt: 0.0
+        engines.append(engine)
+        return engine
+
+    yield factory
+    for engine in engines:
+        engine.close()
+
+
+def test_engine_bounds_concurrency(engine_factory):
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def request(messages, temperature):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return messages[0]["content"].upper(), 10
+
+    engine = engine_factory(request, concurrency=3)
+    results = engine.complete_many([([{"content": f"c{i}"}], 0.0) for i in range(12)])
+    assert results == [f"C{i}" for i in range(12)]
+    assert 1 < peak <= 3
+    assert engine.stats["completed"] == 12
+    assert engine.stats["tokens"] == 120
+
+
+def test_engine_retries_transient_errors(engine_factory):
+    attempts = 0
+
+    def request(messages, temperature):
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise _timeout_error()
+        return "ok", None
+
+    engine = engine_factory(request, max_retries=5)
+    assert engine.complete([{"content": "x"}], 0.0) == "ok"
+    assert engine.stats["retries"] == 2
+
+
+def test_engine_gives_up_after_max_retries(engine_factory):
+    def request(messages, temperature):
+        raise _timeout_error()
+
+    engine = engine_factory(request, max_retries=1)
+    (result,) = engine.complete_many([([{"content": "x"}], 0.0)])
+    assert isinstance(result, openai.APITimeoutError)
+    assert engine.stats == {**engine.stats, "failed": 1, "retries": 1}
+
+
+def test_rate_limiter_requests_and_tokens():
+    limiter = RateLimiter(requests_per_minute=2)
+    assert limiter.reserve(10) == 0
+    assert limiter.reserve(10) == 0
+    assert limiter.reserve(10) > 0
+
+    limiter = RateLimiter(tokens_per_minute=100)
+    assert limiter.reserve(80) == 0
+    assert limiter.reserve(80) == pytest.approx(36.0, abs=0.5)
+
+    unlimited = RateLimiter()
+    assert all(unlimited.reserve(10_000) == 0 for _ in range(100))
+
+
+def test_generate_column_docs_runs_concurrently(engine_factory):
+    def request(messages, temperature):
+        if "The column name is: broken" in messages[1]["content"]:
+            raise ValueError("bad request")
+        return f"  doc for {messages[1]['content'].splitlines()[0]}  ", None
+
+    engine = engine_factory(request)
+    with mock.patch.object(llm, "_ENGINE", engine):
+        docs = generate_column_docs({"id": None, "broken": None}, table_name="orders", batch=False)
+    assert docs["id"] == "doc for The column name is: id"
+    assert isinstance(docs["broken"], ValueError)
+
+
+def test_generate_column_docs_batches_columns(engine_factory, monkeypatch):
+    monkeypatch.setenv("OSMOSIS_LLM_BATCH_TOKEN_BUDGET", "150")
+    prompts: list[str] = []
+
+    def request(messages, temperature):
+        prompt = messages[1]["content"]
+        prompts.append(prompt)
+        if "The column name is:" in prompt:
+            return "single " + prompt.splitlines()[0].rsplit(" ", 1)[-1], None
+        names = [line[2:].split(":")[0] for line in prompt.splitlines() if line.startswith("- c")]
+        # NOTE: the model "forgets" one column, which must be retried on its own
+        columns = [{"name": n.upper(), "description": f"batched {n}"} for n in names if n != "c3"]
+        return json.dumps({"description": "ignored", "columns": columns}), None
+
+    engine = engine_factory(request)
+    columns = {f"c{i}": "DataType=int" for i in range(6)}
+    with mock.patch.object(llm, "_ENGINE", engine):
+        docs = generate_column_docs(columns, table_name="orders", sql_content="select 1")
+    assert docs == {**{f"c{i}": f"batched c{i}" for i in range(6)}, "c3": "single c3"}
+    assert list(docs) == list(columns)
+    # two batches of three columns (budget 150 / 44 tokens each) plus one fallback prompt
+    assert len(prompts) == 3
+    assert all(p.count("- c") == 3 for p in prompts[:2])
+
+
+def test_chunk_columns_respects_budget():
+    columns = {f"col_{i}": "x" * 400 for i in range(5)}
+    chunks = llm._chunk_columns(columns, token_budget=300)
+    assert [list(c) for c in chunks] == [["col_0", "col_1"], ["col_2", "col_3"], ["col_4"]]
+    # a single oversized column still gets its own chunk
+    assert llm._chunk_columns({"wide": "x" * 10_000}, token_budget=10) == [{"wide": "x" * 10_000}]
+
+
+def test_shared_llm_client_is_reused(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    monkeypatch.setattr(llm, "_CLIENT_CACHE", {})
+    with mock.patch.object(llm, "get_llm_client", side_effect=lambda: (object(), "gpt")) as factory:
+        first = llm.get_shared_llm_client()
+        assert llm.get_shared_llm_client() is first
+        monkeypatch.setenv("OPENAI_MODEL", "other")
+        assert llm.get_shared_llm_client() is not first
+    assert factory.call_count == 2
+
+
+class _FakeOpenAI:
+    """chat.completions.create だけを実装した OpenAI クライアントの代替。"""
+
+    def __init__(self):
+        self.calls: list[dict] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, temperature):
+        self.calls.append({"model": model, "messages": messages, "temperature": temperature})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {len(self.calls)}"))],
+            usage=SimpleNamespace(total_tokens=7),
+        )
+
+
+def test_completion_cache_skips_repeated_requests(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    client = _FakeOpenAI()
+    monkeypatch.setattr(llm, "get_shared_llm_client", lambda: (client, "fake-model"))
+    engine = SynthesisEngine(cache=CompletionCache(tmp_path / "cache"))
+    try:
+        with mock.patch.object(llm, "_ENGINE", engine):
+            first = generate_column_doc("email", table_name="users", temperature=0.2)
+            again = generate_column_doc("email", table_name="users", temperature=0.2)
+            other = generate_column_doc("email", table_name="users", temperature=0.9)
+    finally:
+        engine.close()
+    assert first == again == "answer 1"
+    assert other == "answer 2"
+    assert len(client.calls) == 2
+    assert engine.stats["cached"] == 1
+    assert len(list((tmp_path / "cache").glob("*/*.txt"))) == 2
+
+
+def test_completion_cache_key_covers_inputs():
+    messages = [{"role": "user", "content": "select 1"}]
+    key = CompletionCache.key(messages, "gpt-4o", 0.3)
+    assert key == CompletionCache.key([dict(m) for m in messages], "gpt-4o", 0.3)
+    assert key != CompletionCache.key(messages, "gpt-4o-mini", 0.3)
+    assert key != CompletionCache.key(messages, "gpt-4o", 0.4)
+    with mock.patch.object(llm, "PROMPT_TEMPLATE_VERSION", "next"):
+        assert key != CompletionCache.key(messages, "gpt-4o", 0.3)
+
+
+def test_completion_cache_evicts_least_recently_used(tmp_path):
+    cache = CompletionCache(tmp_path, max_bytes=100)
+    for i in range(3):
+        cache.put(f"{i:02d}key", "x" * 30)
+        os.utime(cache._path(f"{i:02d}key"), (1_000 + i, 1_000 + i))
+    # NOTE: reading an entry refreshes it, so the oldest untouched entry goes first
+    assert cache.get("00key") == "x" * 30
+    cache.put("03key", "x" * 30)
+    assert cache.get("01key") is None
+    assert cache.get("00key") is not None
+    assert sum(p.stat().st_size for p in cache._entries()) <= 100
+
+
+def test_compact_sql_strips_comments_and_whitespace():
+    sql = """
+        -- leading comment
+        select
+            id,   /* inline
+                     block */ 'a -- not a comment' as s,
+            "weird  name"
+        from   orders  -- trailing
+
+
+        where x = '/* keep */'
+    """
+    assert compact_sql(sql) == (
+        "select\nid, 'a -- not a comment' as s,\n\"weird  name\"\nfrom orders\nwhere x = '/* keep */'"
+    )
+
+
+def test_select_upstream_docs_prefers_target_columns():
+    docs = [
+        "# The following is not exhaustive, but provides some context.",
+        "model.p.a: # Orders",
+        "- noise: |\n  " + "blah " * 200,
+        "- email: |\n  The user email",
+        "model.p.b: # Customers",
+    ]
+    budget = (
+        count_tokens(docs[0])
+        + count_tokens(docs[1])
+        + count_tokens(docs[3])
+        + count_tokens(docs[4])
+    )
+    selected = select_upstream_docs(docs, ["EMAIL"], max_tokens=budget)
+    assert selected == [
+        docs[0],
+        docs[1],
+        docs[3],
+        docs[4],
+        "# (1 less relevant upstream entries omitted)",
+    ]
+    assert select_upstream_docs(docs, max_tokens=10_000) == docs
+
+
+def test_prompts_are_compacted_to_budget(monkeypatch):
+    monkeypatch.setenv("OSMOSIS_LLM_MAX_SQL_TOKENS", "50")
+    sql = "select 1 -- comment\n" + "union all select 1\n" * 500
+    messages = llm._create_llm_prompt_for_table(sql, "t", ["- a: |\n  doc"])
+    user = messages[1]["content"]
+    assert "-- comment" not in user
+    assert "... (TRUNCATED)" in user
+    assert count_tokens(user) < 200
+
+
+def test_engine_summary_reports_tokens_and_latency(engine_factory):
+    def request(messages, temperature):
+        time.sleep(0.01)
+        return "ok", SimpleNamespace(prompt_tokens=30, completion_tokens=5, total_tokens=35)
+
+    engine = engine_factory(request)
+    _ = engine.complete_many([([{"content": "x"}], 0.0)] * 4)
+    summary = engine.summary()
+    assert summary["prompt_tokens"] == 120
+    assert summary["completion_tokens"] == 20
+    assert summary["tokens"] == 140
+    assert summary["prompt_tokens_per_request"] == 30
+    assert 10 <= summary["latency_mean_ms"] <= summary["latency_max_ms"]
+
+
+def test_completion_cache_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "get_shared_llm_client", lambda: (None, "fake-model"))
+    threads: list[str] = []
+
+    class _RecordingCache(CompletionCache):
+        def get(self, key):
+            threads.append(threading.current_thread().name)
+            return super().get(key)
+
+        def put(self, key, content):
+            threads.append(threading.current_thread().name)
+            super().put(key, content)
+
+    engine = SynthesisEngine(
+        request=lambda messages, temperature: ("ok", None),
+        cache=_RecordingCache(tmp_path / "cache"),
+    )
+    try:
+        assert engine.complete([{"content": "x"}], 0.0) == "ok"
+        assert engine.complete([{"content": "x"}], 0.0) == "ok"
+    finally:
+        engine.close()
+    assert len(threads) == 3
+    assert "osmosis-llm-loop" not in threads
+
+
+def test_engine_reset_stats(engine_factory):
+    engine = engine_factory(lambda messages, temperature: ("ok", None))
+    _ = engine.complete_many([([{"content": "x"}], 0.0)] * 3)
+    assert engine.stats["completed"] == 3
+    engine.reset_stats()
+    assert engine.stats["completed"] == 0
+    assert engine.summary()["latency_max_ms"] == 0.0
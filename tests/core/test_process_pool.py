@@ -0,0 +1,191 @@
+# pyright: reportPrivateImportUsage=false, reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false
+
+import os
+import shutil
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from dbt_osmosis.core.config import DbtConfiguration, create_dbt_project_context
+from dbt_osmosis.core.node_filters import _iter_candidate_nodes
+from dbt_osmosis.core.inheritance import _build_node_ancestor_tree
+from dbt_osmosis.core.process_pool import _shard_nodes, _topological_levels, can_fork
+from dbt_osmosis.core.settings import YamlRefactorContext, YamlRefactorSettings
+from dbt_osmosis.core.transforms import (
+    TransformOperation,
+    TransformPipeline,
+    inherit_upstream_column_knowledge,
+    inject_missing_columns,
+    synchronize_data_types,
+)
+
+pytestmark = pytest.mark.skipif(not can_fork(), reason="requires the fork start method")
+
+
+@pytest.fixture(scope="function")
+def fresh_caches():
+    """
+    内部キャッシュにパッチを適用して、各テストが新しい状態で開始されるようにします。
+    """
+    with (
+        mock.patch("dbt_osmosis.core.introspection._COLUMN_LIST_CACHE", {}),
+        mock.patch("dbt_osmosis.core.schema.reader._YAML_BUFFER_CACHE", {}),
+    ):
+        yield
+
+
+@pytest.fixture(scope="module")
+def project_copy(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """書き込みを伴うテスト用に、「demo duckdb」プロジェクトを一時ディレクトリにコピーします。"""
+    return _copy_project(tmp_path_factory.mktemp("process_pool"))
+
+
+def _copy_project(root: Path) -> Path:
+    return Path(
+        shutil.copytree(
+            "demo_duckdb", root / "demo_duckdb", ignore=shutil.ignore_patterns("target", "logs")
+        )
+    )
+
+
+def _context(
+    project_dir: Path | str, threads: int | None = None, **settings: object
+) -> YamlRefactorContext:
+    cfg = DbtConfiguration(
+        project_dir=str(project_dir), profiles_dir=str(project_dir), threads=threads
+    )
+    cfg.vars = {"dbt-osmosis": {}}
+    return YamlRefactorContext(
+        create_dbt_project_context(cfg), settings=YamlRefactorSettings(**settings)
+    )
+
+
+def test_shard_nodes_assigns_each_schema_file_to_one_shard(fresh_caches):
+    context = _context("demo_duckdb", dry_run=True)
+    shards = _shard_nodes(context, 3)
+    assert len(shards) == 3
+    paths = [path for shard_paths, _ in shards for path in shard_paths]
+    assert len(paths) == len(set(paths))
+    uids = sorted(uid for _, members in shards for uid in members)
+    assert uids == sorted(uid for uid, _ in _iter_candidate_nodes(context))
+
+
+def test_pipeline_in_processes_writes_merged_yaml(project_copy: Path, fresh_caches):
+    context = _context(project_copy, processes=2)
+    pipeline = TransformPipeline() >> inject_missing_columns >> synchronize_data_types
+    _ = pipeline(context)
+    assert pipeline.metadata["processes"] == 2
+    assert context.mutated
+    # NOTE: worker results are merged back into the parent's manifest
+    orders = context.project.manifest.nodes["model.jaffle_shop_duckdb.orders"]
+    assert orders.columns["order_id"].data_type
+    assert "data_type:" in (project_copy / "models/jaffle_shop/main/orders.yml").read_text()
+
+    from dbt_osmosis.core.schema.reader import _YAML_BUFFER_CACHE
+
+    assert not _YAML_BUFFER_CACHE
+
+
+def test_pipeline_falls_back_to_threads_without_batch_commit(fresh_caches):
+    context = _context("demo_duckdb", dry_run=True, processes=2)
+    pipeline = TransformPipeline(commit_mode="none") >> inject_missing_columns
+    _ = pipeline(context)
+    assert "processes" not in pipeline.metadata
+    assert pipeline.metadata["steps"]
+
+
+def _describe_staging_columns(context: YamlRefactorContext, node=None) -> None:
+    """staging モデルの列の説明を書き換えます。下流への継承を確認するためのノード単位の操作です。"""
+    if node is None:
+        for _, candidate in _iter_candidate_nodes(context):
+            _describe_staging_columns(context, candidate)
+        return
+    if node.name.startswith("stg_"):
+        for name, column in node.columns.items():
+            node.columns[name] = column.replace(description=f"Staged {name}")
+
+
+def test_pipeline_in_processes_matches_threads(tmp_path: Path, fresh_caches):
+    """上流ノードを参照する継承を含むパイプラインでも、スレッドとワーカー プロセスで同じ YAML になります。"""
+    describe = TransformOperation(_describe_staging_columns, "Describe Staging", node_local=True)
+    outputs: list[dict[str, str]] = []
+    for processes in (0, 2):
+        root = _copy_project(tmp_path / f"processes_{processes}")
+        pipeline = (
+            TransformPipeline()
+            >> inject_missing_columns
+            >> describe
+            >> inherit_upstream_column_knowledge
+            >> synchronize_data_types
+        )
+        # NOTE: one thread keeps the project-wide inheritance order deterministic across runs
+        context = _context(root, threads=1, processes=processes, force_inherit_descriptions=True)
+        _ = pipeline(context)
+        assert ("processes" in pipeline.metadata) is bool(processes)
+        outputs.append({
+            str(path.relative_to(root)): path.read_text() for path in root.rglob("models/**/*.yml")
+        })
+    # NOTE: inheritance must see the upstream descriptions written earlier in the same run
+    assert "Staged first_name" in outputs[0]["models/jaffle_shop/main/customers.yml"]
+    assert outputs[0] == outputs[1]
+
+
+def test_pipeline_falls_back_to_threads_with_checkpoints(fresh_caches):
+    context = _context("demo_duckdb", dry_run=True, processes=2, checkpoint=True)
+    pipeline = TransformPipeline() >> inject_missing_columns
+    _ = pipeline(context)
+    assert "processes" not in pipeline.metadata
+
+
+def test_topological_levels_put_upstream_nodes_first(fresh_caches):
+    context = _context("demo_duckdb", dry_run=True)
+    levels = _topological_levels(context)
+    assert len(levels) > 1
+    level_of = {uid: index for index, level in enumerate(levels) for uid in level}
+    assert sorted(level_of) == sorted(
+        uid for uid, _ in _iter_candidate_nodes(context, include_external=True)
+    )
+    manifest = context.project.manifest
+    for uid, index in level_of.items():
+        node = manifest.nodes.get(uid) or manifest.sources[uid]
+        tree = _build_node_ancestor_tree(manifest, node)
+        ancestors = {
+            a for generation, a_uids in tree.items() if generation != "generation_0" for a in a_uids
+        }
+        assert all(level_of[a] < index for a in ancestors if a in level_of)
+
+
+def _describe_with_pid(context: YamlRefactorContext, node=None) -> None:
+    """ノードの説明を、実行したプロセスの ID に書き換えます。"""
+    if node is None:
+        for _, candidate in _iter_candidate_nodes(context, include_external=True):
+            _describe_with_pid(context, candidate)
+        return
+    node.description = f"pid {os.getpid()}"
+
+
+def test_topological_operations_run_in_worker_processes(fresh_caches):
+    """
+    上流ノードだけを読み取る操作はワーカーで実行され、それ以外の操作が親プロセスで実行されることが
+    ログに出力されることを確認します。
+    """
+    context = _context("demo_duckdb", dry_run=True, processes=2)
+    nodes = [n for _, n in _iter_candidate_nodes(context, include_external=True)]
+    originals = {n.unique_id: n.description for n in nodes}
+    pipeline = (
+        TransformPipeline()
+        >> TransformOperation(_describe_with_pid, "Describe With PID", topological=True)
+        >> TransformOperation(lambda context, node=None: None, "Cross Shard")
+    )
+    try:
+        with mock.patch("dbt_osmosis.core.process_pool.logger.info") as info:
+            _ = pipeline(context)
+        descriptions = {n.description for n in nodes}
+    finally:
+        for n in nodes:
+            n.description = originals[n.unique_id]
+    assert pipeline.metadata["processes"] == 2
+    assert f"pid {os.getpid()}" not in descriptions
+    assert all(d.startswith("pid ") for d in descriptions)
+    assert any(call.args[1:] == (["Cross Shard"],) for call in info.call_args_list)
@@ -1,16 +1,31 @@
 # pyright: reportPrivateImportUsage=false, reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportArgumentType=false, reportFunctionMemberAccess=false, reportUnknownVariableType=false
 
+import datetime
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
+from dbt.artifacts.resources.types import NodeType
 
 from dbt_osmosis.core.config import DbtConfiguration, create_dbt_project_context
 from dbt_osmosis.core.settings import YamlRefactorContext, YamlRefactorSettings
 from dbt_osmosis.core.restructuring import (
+    _merge_restructure_operations,
+    _remove_models,
+    _remove_seeds,
+    _remove_sources,
+    apply_restructure_operations,
     apply_restructure_plan,
     draft_restructure_delta_plan,
+    dump_restructure_plan,
+    iter_restructure_operations,
+    iter_restructure_plan_file,
+    load_restructure_plan,
     pretty_print_plan,
     RestructureOperation,
     RestructureDeltaPlan,
@@ -144,3 +159,350 @@ def test_apply_restructure_plan_confirm_yes(
         captured = capsys.readouterr()
         assert "Committing all restructure changes" in captured.err
         assert "Reloading the dbt project manifest" in captured.err
+
+
+def test_iter_restructure_operations_unique_targets(
+    yaml_context: YamlRefactorContext, fresh_caches
+):
+    """
+    ストリーミング プランナーはターゲット ファイルごとに 1 つの操作のみを生成し、
+    その結果は draft_restructure_delta_plan と一致する必要があります。
+    """
+    streamed = list(iter_restructure_operations(yaml_context))
+    paths = [op.file_path for op in streamed]
+    assert len(paths) == len(set(paths))
+    drafted = draft_restructure_delta_plan(yaml_context)
+    assert [op.file_path for op in drafted.operations] == paths
+
+
+def test_merge_restructure_operations_dedupes_by_name():
+    """
+    同じターゲットへの操作をマージする際、models/seeds は名前で、
+    sources はソース名とテーブル名で重複排除されることを確認します。
+    """
+    target = Path("models/schema.yml")
+    source_a = {"name": "raw", "tables": [{"name": "orders"}]}
+    ops = [
+        RestructureOperation(
+            file_path=target,
+            content={"version": 2, "models": [{"name": "m1"}], "sources": [source_a]},
+            superseded_paths={Path("a.yml"): ["n1"]},
+        ),
+        RestructureOperation(
+            file_path=target,
+            content={
+                "version": 2,
+                "models": [{"name": "m1"}, {"name": "m2"}],
+                "sources": [source_a, {"name": "raw", "tables": [{"name": "payments"}]}],
+            },
+            superseded_paths={Path("a.yml"): ["n2"], Path("b.yml"): ["n3"]},
+        ),
+    ]
+    merged = _merge_restructure_operations(target, ops)
+    assert merged is not None
+    assert merged.file_path == target
+    assert [m["name"] for m in merged.content["models"]] == ["m1", "m2"]
+    assert len(merged.content["sources"]) == 1
+    assert [t["name"] for t in merged.content["sources"][0]["tables"]] == ["orders", "payments"]
+    assert source_a["tables"] == [{"name": "orders"}], "inputs must not be mutated"
+    assert merged.superseded_paths == {Path("a.yml"): ["n1", "n2"], Path("b.yml"): ["n3"]}
+    assert _merge_restructure_operations(target, []) is None
+
+
+def test_apply_restructure_operations_streams_lazily(
+    yaml_context: YamlRefactorContext, fresh_caches
+):
+    """
+    apply_restructure_operations は生成された操作をそのまま適用し、
+    最後に一度だけマニフェストを再読み込みします。
+    """
+    applied: list[Path] = []
+
+    def _ops():
+        for name in ("first", "second"):
+            yield RestructureOperation(
+                file_path=Path(f"models/{name}.yml"), content={"models": [{"name": name}]}
+            )
+
+    with (
+        mock.patch(
+            "dbt_osmosis.core.restructuring._apply_restructure_operation",
+            side_effect=lambda _, op: applied.append(op.file_path),
+        ),
+        mock.patch("dbt_osmosis.core.config._reload_manifest") as mock_reload,
+    ):
+        count = apply_restructure_operations(yaml_context, _ops())
+    assert count == 2
+    assert sorted(applied) == [Path("models/first.yml"), Path("models/second.yml")]
+    mock_reload.assert_called_once()
+
+
+def test_apply_restructure_operations_orders_per_file():
+    """
+    同じファイルに触れる操作は入力順に直列に適用され、
+    独立した操作は並行に適用されることを確認します。
+    """
+    events: list[tuple[str, str]] = []
+    events_lock = threading.Lock()
+
+    def _fake_apply(_, op: RestructureOperation) -> None:
+        with events_lock:
+            events.append(("start", op.file_path.name))
+        if op.file_path.name == "a.yml":
+            time.sleep(0.2)
+        with events_lock:
+            events.append(("end", op.file_path.name))
+
+    ops = [
+        RestructureOperation(
+            file_path=Path("a.yml"), content={}, superseded_paths={Path("x.yml"): []}
+        ),
+        RestructureOperation(file_path=Path("b.yml"), content={}),
+        RestructureOperation(
+            file_path=Path("c.yml"), content={}, superseded_paths={Path("x.yml"): []}
+        ),
+    ]
+    with (
+        ThreadPoolExecutor(max_workers=4) as pool,
+        mock.patch(
+            "dbt_osmosis.core.restructuring._apply_restructure_operation", side_effect=_fake_apply
+        ),
+        mock.patch("dbt_osmosis.core.schema.writer.commit_yamls"),
+        mock.patch("dbt_osmosis.core.config._reload_manifest"),
+    ):
+        context = SimpleNamespace(pool=pool, project=None, settings=SimpleNamespace(dry_run=True))
+        context.yaml_handler = context.yaml_handler_lock = context.register_mutations = None
+        assert apply_restructure_operations(context, ops) == 3
+    assert events.index(("end", "a.yml")) < events.index(("start", "c.yml"))
+    assert events.index(("end", "b.yml")) < events.index(("end", "a.yml"))
+
+
+def test_apply_restructure_operations_propagates_errors():
+    """
+    独立した後続の操作だけが失敗した場合でも、その例外が送出されることを確認します。
+    """
+    applied: list[str] = []
+
+    def _fake_apply(_, op: RestructureOperation) -> None:
+        if op.file_path.name == "b.yml":
+            raise RuntimeError("boom")
+        applied.append(op.file_path.name)
+
+    ops = [
+        RestructureOperation(file_path=Path("a.yml"), content={}),
+        RestructureOperation(file_path=Path("b.yml"), content={}),
+    ]
+    with (
+        ThreadPoolExecutor(max_workers=2) as pool,
+        mock.patch(
+            "dbt_osmosis.core.restructuring._apply_restructure_operation", side_effect=_fake_apply
+        ),
+        pytest.raises(RuntimeError, match="boom"),
+    ):
+        apply_restructure_operations(SimpleNamespace(pool=pool), ops)
+    assert applied == ["a.yml"]
+
+
+def test_apply_restructure_operations_stops_after_failure():
+    """
+    操作が失敗した後は、後続の独立した操作も投入されず、例外が送出されることを確認します。
+    """
+    applied: list[str] = []
+    consumed: list[str] = []
+
+    def _fake_apply(_, op: RestructureOperation) -> None:
+        if op.file_path.name == "a.yml":
+            raise RuntimeError("boom")
+        applied.append(op.file_path.name)
+
+    def _ops():
+        for name in ("a", "b", "c", "d"):
+            consumed.append(name)
+            yield RestructureOperation(file_path=Path(f"{name}.yml"), content={})
+
+    with (
+        ThreadPoolExecutor(max_workers=2) as pool,
+        mock.patch(
+            "dbt_osmosis.core.restructuring._apply_restructure_operation", side_effect=_fake_apply
+        ),
+        pytest.raises(RuntimeError, match="boom"),
+    ):
+        apply_restructure_operations(SimpleNamespace(pool=pool), _ops(), max_pending=1)
+    assert applied == []
+    assert consumed == ["a", "b"]
+
+
+def test_apply_restructure_operations_waits_when_planning_fails():
+    """
+    操作の生成中に例外が発生した場合、投入済みの操作が完了してから例外が送出されることを確認します。
+    """
+    finished: list[str] = []
+
+    def _fake_apply(_, op: RestructureOperation) -> None:
+        time.sleep(0.2)
+        finished.append(op.file_path.name)
+
+    def _ops():
+        yield RestructureOperation(file_path=Path("a.yml"), content={})
+        raise RuntimeError("planning failed")
+
+    with (
+        ThreadPoolExecutor(max_workers=2) as pool,
+        mock.patch(
+            "dbt_osmosis.core.restructuring._apply_restructure_operation", side_effect=_fake_apply
+        ),
+    ):
+        with pytest.raises(RuntimeError, match="planning failed"):
+            apply_restructure_operations(SimpleNamespace(pool=pool), _ops())
+        assert finished == ["a.yml"]
+
+
+def test_apply_restructure_operation_leaves_cached_docs_intact(tmp_path: Path, fresh_caches):
+    """
+    操作の適用が、作成中の他の操作と共有しているキャッシュ済みのドキュメントをその場で書き換えないことを確認します。
+    """
+    from dbt_osmosis.core.restructuring import _apply_restructure_operation
+    from dbt_osmosis.core.schema.parser import create_yaml_instance
+    from dbt_osmosis.core.schema.reader import _read_yaml
+
+    source = tmp_path / "sources.yml"
+    _ = source.write_text(
+        "version: 2\nsources:\n  - name: raw\n    tables:\n      - name: orders\n      - name: payments\n"
+    )
+    context = SimpleNamespace(
+        yaml_handler=create_yaml_instance(),
+        yaml_handler_lock=threading.Lock(),
+        settings=SimpleNamespace(dry_run=False),
+        register_mutations=lambda _: None,
+    )
+    cached = _read_yaml(context.yaml_handler, context.yaml_handler_lock, source)
+    op = RestructureOperation(
+        file_path=tmp_path / "orders.yml",
+        content={"version": 2, "sources": [{"name": "raw", "tables": [{"name": "orders"}]}]},
+        superseded_paths={source: [_fake_node(NodeType.Source, "orders", "raw")]},
+    )
+    _apply_restructure_operation(context, op)
+    assert [tbl["name"] for tbl in cached["sources"][0]["tables"]] == ["orders", "payments"]
+    assert "orders" not in source.read_text()
+
+
+def _fake_node(resource_type: NodeType, name: str, source_name: str | None = None):
+    unique_id = ".".join(filter(None, (str(resource_type), "proj", source_name, name)))
+    return SimpleNamespace(
+        unique_id=unique_id, resource_type=resource_type, name=name, source_name=source_name
+    )
+
+
+def test_remove_superseded_entries():
+    """
+    _remove_models / _remove_seeds / _remove_sources が対象のエントリのみを取り除き、
+    テーブルが残らないソースを削除することを確認します。
+    """
+    doc = {
+        "version": 2,
+        "models": [{"name": "m1"}, {"name": "m2"}],
+        "seeds": [{"name": "s1"}, {"name": "s2"}],
+        "sources": [
+            {"name": "raw", "tables": [{"name": "orders"}, {"name": "payments"}]},
+            {"name": "other", "tables": [{"name": "orders"}]},
+            {"name": "gone", "tables": [{"name": "t"}]},
+        ],
+    }
+    nodes = [
+        _fake_node(NodeType.Model, "m1"),
+        _fake_node(NodeType.Seed, "s2"),
+        _fake_node(NodeType.Source, "orders", "raw"),
+        _fake_node(NodeType.Source, "t", "gone"),
+    ]
+    _remove_models(doc, nodes)
+    _remove_seeds(doc, nodes)
+    _remove_sources(doc, nodes)
+    assert doc["models"] == [{"name": "m2"}]
+    assert doc["seeds"] == [{"name": "s1"}]
+    assert doc["sources"] == [
+        {"name": "raw", "tables": [{"name": "payments"}]},
+        {"name": "other", "tables": [{"name": "orders"}]},
+    ]
+
+
+def _plan_context(root: Path) -> SimpleNamespace:
+    from dbt_osmosis.core.schema.parser import create_yaml_instance
+
+    return SimpleNamespace(
+        project=SimpleNamespace(
+            runtime_cfg=SimpleNamespace(project_root=str(root), project_name="jaffle_shop")
+        ),
+        yaml_handler=create_yaml_instance(),
+    )
+
+
+def test_restructure_plan_round_trip(tmp_path: Path):
+    """計画ファイルへの書き出しと読み込みで、パスと置き換え対象ノードが保持されることを確認します。"""
+    root = tmp_path / "proj"
+    context = _plan_context(root)
+    op = RestructureOperation(
+        file_path=root / "models" / "schema.yml",
+        content={
+            "version": 2,
+            "models": [{"name": "m1", "columns": [], "meta": {"since": datetime.date(2024, 1, 2)}}],
+        },
+        superseded_paths={
+            root / "models" / "old.yml": [
+                _fake_node(NodeType.Model, "m1"),
+                _fake_node(NodeType.Source, "orders", "raw"),
+            ]
+        },
+    )
+    plan_file = tmp_path / "plan" / "restructure.jsonl"
+    assert dump_restructure_plan(context, [op], plan_file) == 1
+    assert '"file_path":"models/schema.yml"' in plan_file.read_text()
+
+    plan = load_restructure_plan(context, plan_file)
+    assert len(plan.operations) == 1
+    loaded = plan.operations[0]
+    assert loaded.file_path == op.file_path
+    assert loaded.content == op.content
+    assert isinstance(loaded.content["models"][0]["meta"]["since"], datetime.date)
+    ((old_path, nodes),) = loaded.superseded_paths.items()
+    assert old_path == root / "models" / "old.yml"
+    assert [(n.unique_id, n.resource_type, n.name, n.source_name) for n in nodes] == [
+        ("model.proj.m1", NodeType.Model, "m1", None),
+        ("source.proj.raw.orders", NodeType.Source, "orders", "raw"),
+    ]
+    # NOTE: the removal helpers only need the lightweight refs, not manifest nodes
+    doc = {"sources": [{"name": "raw", "tables": [{"name": "orders"}, {"name": "customers"}]}]}
+    _remove_sources(doc, nodes)
+    assert doc == {"sources": [{"name": "raw", "tables": [{"name": "customers"}]}]}
+
+
+def test_restructure_plan_rejects_stale_files(tmp_path: Path):
+    """計画の書き出し後に、触れるファイルが変更または作成された場合は適用を拒否することを確認します。"""
+    context = _plan_context(tmp_path)
+    old = tmp_path / "models" / "old.yml"
+    old.parent.mkdir(parents=True)
+    _ = old.write_text("version: 2\nmodels:\n  - name: m1\n")
+    op = RestructureOperation(
+        file_path=tmp_path / "models" / "new.yml",
+        content={"version": 2, "models": [{"name": "m1"}]},
+        superseded_paths={old: [_fake_node(NodeType.Model, "m1")]},
+    )
+    plan_file = tmp_path / "plan.jsonl"
+    _ = dump_restructure_plan(context, [op], plan_file)
+    assert len(load_restructure_plan(context, plan_file).operations) == 1
+
+    _ = old.write_text("version: 2\nmodels:\n  - name: m1\n    description: edited\n")
+    with pytest.raises(ValueError, match="models/old.yml"):
+        _ = iter_restructure_plan_file(context, plan_file)
+
+    _ = dump_restructure_plan(context, [op], plan_file)
+    _ = (tmp_path / "models" / "new.yml").write_text("version: 2\n")
+    with pytest.raises(ValueError, match="models/new.yml"):
+        _ = iter_restructure_plan_file(context, plan_file)
+
+
+def test_restructure_plan_rejects_unknown_format(tmp_path: Path):
+    context = _plan_context(tmp_path)
+    plan_file = tmp_path / "plan.jsonl"
+    _ = plan_file.write_text('{"format":"something-else","version":1}\n')
+    with pytest.raises(ValueError):
+        _ = load_restructure_plan(context, plan_file)
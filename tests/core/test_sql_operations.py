@@ -1,12 +1,19 @@
 # pyright: reportPrivateImportUsage=false, reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportArgumentType=false, reportFunctionMemberAccess=false, reportUnknownVariableType=false
 
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import pytest
 
 from dbt_osmosis.core.config import DbtConfiguration, create_dbt_project_context
 from dbt_osmosis.core.settings import YamlRefactorContext, YamlRefactorSettings
-from dbt_osmosis.core.sql_operations import compile_sql_code, execute_sql_code
+from dbt_osmosis.core import sql_operations
+from dbt_osmosis.core.sql_operations import (
+    CompiledSqlCache,
+    compile_sql_code,
+    execute_sql_code,
+    stream_sql_code,
+)
 
 
 @pytest.fixture(scope="module")
@@ -28,6 +35,14 @@ def yaml_context() -> YamlRefactorContext:
     return context
 
 
+@pytest.fixture(autouse=True)
+def compiled_sql_cache():
+    """テストごとに空のコンパイル済み SQL キャッシュを使用します。"""
+    cache = CompiledSqlCache(maxsize=2)
+    with mock.patch.object(sql_operations, "_COMPILED_SQL_CACHE", cache):
+        yield cache
+
+
 def test_compile_sql_code_no_jinja(yaml_context: YamlRefactorContext):
     """
     compile_sql_code を単純なSELECT（Jinjaなし）で確認します。
@@ -95,3 +110,85 @@ def test_execute_sql_code_with_jinja(yaml_context: YamlRefactorContext):
         mock_compile.assert_called_once()
         assert resp == "OK"
         assert table.rows[0] == (4,)
+
+
+def test_stream_sql_code_yields_chunks(yaml_context: YamlRefactorContext):
+    """
+    「stream_sql_code」は結果を実体化せず、カーソルからチャンク単位で行を返し、行数の上限で打ち切ります。
+    """
+    columns, chunks = stream_sql_code(
+        yaml_context.project, "SELECT range AS n FROM range(2500)", chunk_size=1000
+    )
+    assert columns == ["n"]
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+
+    _, chunks = stream_sql_code(
+        yaml_context.project, "SELECT range AS n FROM range(2500)", chunk_size=1000, max_rows=1200
+    )
+    rows = [row for chunk in chunks for row in chunk]
+    assert rows == [(n,) for n in range(1200)]
+
+
+def test_compile_sql_code_is_cached(
+    yaml_context: YamlRefactorContext, compiled_sql_cache: CompiledSqlCache
+):
+    """
+    同じ SQL の再コンパイルはキャッシュから返され、マニフェストが置き換えられるとヒットしません。
+    """
+    raw_sql = "SELECT {{ 3 + 3 }} AS six"
+    with mock.patch.object(
+        sql_operations, "_compile_sql_code", wraps=sql_operations._compile_sql_code
+    ) as mock_compile:
+        first = compile_sql_code(yaml_context.project, raw_sql)
+        assert compile_sql_code(yaml_context.project, raw_sql) is first
+        assert mock_compile.call_count == 1
+
+        original = yaml_context.project.manifest
+        yaml_context.project.manifest = original.deepcopy()
+        try:
+            assert compile_sql_code(yaml_context.project, raw_sql) is not first
+        finally:
+            yaml_context.project.manifest = original
+        assert mock_compile.call_count == 2
+    assert first.compiled_code == "SELECT 6 AS six"
+    assert compiled_sql_cache.stats()["hits"] == 1
+
+
+def test_compiled_sql_cache_evicts_least_recently_used(yaml_context: YamlRefactorContext):
+    cache = CompiledSqlCache(maxsize=2)
+    nodes = {sql: mock.Mock() for sql in ("a", "b", "c")}
+    keys = {sql: cache.key(yaml_context.project, sql) for sql in nodes}
+    cache.put(yaml_context.project, keys["a"], nodes["a"])
+    cache.put(yaml_context.project, keys["b"], nodes["b"])
+    assert cache.get(yaml_context.project, keys["a"]) is nodes["a"]
+    cache.put(yaml_context.project, keys["c"], nodes["c"])
+    assert cache.get(yaml_context.project, keys["b"]) is None
+    assert cache.get(yaml_context.project, keys["a"]) is nodes["a"]
+    stats = cache.stats()
+    assert stats == {**stats, "size": 2, "evictions": 1, "hits": 2, "misses": 1}
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_compile_sql_code_runs_concurrently_without_the_manifest_lock(
+    yaml_context: YamlRefactorContext,
+):
+    """
+    コンパイルはリクエストごとのオーバーレイで行われるため、マニフェストのロックを取得せずに並行して実行でき、
+    共有マニフェストにノードが残りません。
+    """
+    project = yaml_context.project
+    _ = compile_sql_code(project, "SELECT {{ 0 }} AS warmup")
+    node_ids = set(project.manifest.nodes)
+    with project.manifest_mutex, ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [
+            pool.submit(
+                compile_sql_code, project, f"SELECT {{{{ {i} }}}} AS n FROM {{{{ ref('orders') }}}}"
+            )
+            for i in range(8)
+        ]
+        # NOTE: a timeout instead of a hang if compilation ever needs the lock again
+        nodes = [f.result(timeout=60) for f in futures]
+    for i, node in enumerate(nodes):
+        assert node.compiled_code.startswith(f"SELECT {i} AS n FROM ")
+        assert "orders" in node.compiled_code
+    assert set(project.manifest.nodes) == node_ids
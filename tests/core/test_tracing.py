@@ -0,0 +1,80 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+import dbt_osmosis.core.tracing as tracing
+from dbt_osmosis.core.transforms import TransformOperation, TransformPipeline
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.start_tracing()
+    yield tracer
+    _ = tracing.stop_tracing()
+
+
+def test_span_is_a_noop_without_a_tracer():
+    assert tracing.get_tracer() is None
+    with tracing.span("Nothing", node="model.p.a"):
+        pass
+    lock = threading.Lock()
+    with tracing.locked(lock, "lock"):
+        assert lock.locked()
+    assert not lock.locked()
+
+
+def test_tracer_exports_chrome_and_otel(tracer, tmp_path):
+    with tracing.span("Outer", "transform", node="model.p.a"):
+        with tracing.span("Inner", "yaml", path="a.yml"):
+            pass
+    with pytest.raises(ValueError):
+        with tracing.span("Broken", "transform", node="model.p.b"):
+            raise ValueError("boom")
+
+    chrome = json.loads(tracer.export(tmp_path / "trace.json").read_text())
+    complete = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["Outer", "Inner", "Broken"]
+    assert complete[0]["dur"] >= complete[1]["dur"]
+    assert complete[2]["args"]["error"] == "ValueError('boom')"
+    assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in chrome["traceEvents"])
+
+    otel = json.loads(tracer.export(tmp_path / "trace.otel.json", "otel").read_text())
+    spans = {s["name"]: s for s in otel["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert spans["Inner"]["parentSpanId"] == spans["Outer"]["spanId"]
+    assert spans["Outer"]["parentSpanId"] == ""
+    assert spans["Broken"]["status"]["code"] == 2
+    assert int(spans["Outer"]["endTimeUnixNano"]) >= int(spans["Outer"]["startTimeUnixNano"])
+    # NOTE: the nested span belongs to the same node and is not counted twice
+    assert sorted(node for node, _ in tracer.slowest_nodes()) == ["model.p.a", "model.p.b"]
+
+
+def test_pipeline_records_a_span_per_node_and_operation(tracer):
+    nodes = [SimpleNamespace(unique_id=f"model.p.{name}") for name in "abc"]
+
+    def touch(context, node=None):
+        if node is None:
+            for _ in context.pool.map(partial(operation, context), nodes):
+                ...
+            return
+        with tracing.locked(context.lock, "YAML lock"):
+            pass
+
+    operation = TransformOperation(touch, "Touch")
+    context = SimpleNamespace(pool=ThreadPoolExecutor(max_workers=2), lock=threading.Lock())
+    try:
+        _ = TransformPipeline([operation], commit_mode="none")(context)
+    finally:
+        context.pool.shutdown()
+
+    touched = sorted(
+        s.attributes["node"] for s in tracer.spans if s.name == "Touch" and s.attributes
+    )
+    assert touched == ["model.p.a", "model.p.b", "model.p.c"]
+    assert sum(s.category == "lock" for s in tracer.spans) == 3
+    assert {s.name for s in tracer.spans if s.category == "pipeline"} == {"Run pipeline"}
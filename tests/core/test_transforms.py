@@ -1,12 +1,21 @@
 # pyright: reportPrivateImportUsage=false, reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportArgumentType=false, reportFunctionMemberAccess=false, reportUnknownVariableType=false
 
+import threading
+import time
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
 
 from dbt_osmosis.core.config import DbtConfiguration, create_dbt_project_context
 from dbt_osmosis.core.settings import YamlRefactorContext, YamlRefactorSettings
+from dbt_osmosis.core.node_filters import _iter_candidate_nodes
 from dbt_osmosis.core.transforms import (
+    TransformOperation,
+    TransformPipeline,
+    _synthesize_in_dependency_order,
     inherit_upstream_column_knowledge,
     inject_missing_columns,
     remove_columns_not_in_database,
@@ -98,3 +107,259 @@ def test_synchronize_data_types(yaml_context: YamlRefactorContext, fresh_caches)
     データ型を DB と同期します。
     """
     synchronize_data_types(yaml_context)
+
+
+def test_pipeline_resumes_from_journal(yaml_context: YamlRefactorContext, fresh_caches, tmp_path):
+    """
+    途中で失敗したパイプラインを再開すると、ジャーナルに記録済みのノードがスキップされ、
+    スナップショットが復元されることを確認します。
+    """
+    nodes = [n for _, n in _iter_candidate_nodes(yaml_context)]
+    originals = {n.unique_id: n.description for n in nodes}
+    marked: list[str] = []
+    checked: list[str] = []
+    fail_on = {nodes[1].unique_id}
+
+    def _mark(context, node=None):
+        if node is None:
+            for n in nodes:
+                _ = mark(context, n)
+            return
+        marked.append(node.unique_id)
+        node.description = "marked"
+
+    def _check(context, node=None):
+        if node is None:
+            for n in nodes:
+                _ = check(context, n)
+            return
+        if node.unique_id in fail_on:
+            raise RuntimeError("warehouse timeout")
+        checked.append(node.unique_id)
+
+    mark = TransformOperation(_mark, "Mark")
+    check = TransformOperation(_check, "Check")
+    journal_path = tmp_path / "journal.jsonl"
+    yaml_context.settings.dry_run = False
+    yaml_context.settings.checkpoint = True
+    try:
+        with mock.patch("dbt_osmosis.core.journal.get_journal_path", return_value=journal_path):
+            with pytest.raises(RuntimeError):
+                _ = TransformPipeline([mark, check], commit_mode="none")(yaml_context)
+            assert journal_path.exists()
+            assert yaml_context.journal is None
+            assert checked == [nodes[0].unique_id]
+
+            for n in nodes:
+                n.description = originals[n.unique_id]
+            marked.clear()
+            checked.clear()
+            fail_on.clear()
+            yaml_context.settings.resume = True
+            pipeline = TransformPipeline([mark, check], commit_mode="none")
+            _ = pipeline(yaml_context)
+            assert {n.description for n in nodes} == {"marked"}
+            assert not journal_path.exists()
+    finally:
+        yaml_context.settings.resume = False
+        yaml_context.settings.checkpoint = False
+        yaml_context.settings.dry_run = True
+        for n in nodes:
+            n.description = originals[n.unique_id]
+
+    assert marked == []
+    assert checked == [n.unique_id for n in nodes[1:]]
+    assert pipeline.metadata["resumed_steps"] == len(nodes) + 1
+
+
+def test_pipeline_journal_is_opt_in(yaml_context: YamlRefactorContext, fresh_caches, tmp_path):
+    """
+    チェックポイントが無効な場合やドライランでは、ジャーナルが作成されないことを確認します。
+    """
+    journal_path = tmp_path / "journal.jsonl"
+    op = TransformOperation(lambda context, node=None: None, "Noop")
+    with mock.patch("dbt_osmosis.core.journal.get_journal_path", return_value=journal_path):
+        _ = TransformPipeline([op], commit_mode="none")(yaml_context)
+        assert not journal_path.exists()
+        yaml_context.settings.checkpoint = True
+        try:
+            _ = TransformPipeline([op], commit_mode="none")(yaml_context)
+        finally:
+            yaml_context.settings.checkpoint = False
+        assert not journal_path.exists()
+
+
+def test_journal_refuses_changed_project(yaml_context: YamlRefactorContext, tmp_path):
+    """
+    ジャーナルの作成後にモデルや YAML が変更された場合、再開に使用されないことを確認します。
+    """
+    from dbt_osmosis.core.journal import RefactorJournal
+
+    node = next(n for _, n in _iter_candidate_nodes(yaml_context))
+    journal_path = tmp_path / "journal.jsonl"
+    with mock.patch("dbt_osmosis.core.journal.get_journal_path", return_value=journal_path):
+        journal = RefactorJournal.open(yaml_context, ["Op"])
+        journal.record("Op", node)
+        journal.close()
+        resumed = RefactorJournal.open(yaml_context, ["Op"], resume=True)
+        resumed.close()
+        assert len(resumed) == 1
+        with mock.patch(
+            "dbt_osmosis.core.journal.project_fingerprint", return_value="something else"
+        ):
+            refused = RefactorJournal.open(yaml_context, ["Op"], resume=True)
+            refused.clear()
+        assert len(refused) == 0
+
+
+def test_pipeline_resumes_after_atomic_commits(
+    yaml_context: YamlRefactorContext, fresh_caches, tmp_path
+):
+    """
+    atomic コミットで YAML を書き込んだ後に失敗した実行を再開できること、
+    および再開前に YAML が外部で変更された場合はジャーナルが使用されないことを確認します。
+    """
+    nodes = [n for _, n in _iter_candidate_nodes(yaml_context)]
+    originals = {n.unique_id: n.description for n in nodes}
+    schema = tmp_path / "schema.yml"
+    _ = schema.write_text("version: 2\n")
+    marked: list[str] = []
+    fail = [True]
+
+    def _mark(context, node=None):
+        if node is None:
+            for n in nodes:
+                _ = mark(context, n)
+            return
+        marked.append(node.unique_id)
+        node.description = "marked"
+
+    def _check(context, node=None):
+        if fail[0]:
+            raise RuntimeError("warehouse timeout")
+
+    def _commit(context, node=None, commit=True):
+        with schema.open("a") as f:
+            _ = f.write("# committed\n")
+
+    def _run() -> TransformPipeline:
+        return TransformPipeline([mark, check], commit_mode="atomic")(yaml_context)
+
+    mark = TransformOperation(_mark, "Mark")
+    check = TransformOperation(_check, "Check")
+
+    journal_path = tmp_path / "journal.jsonl"
+    yaml_context.settings.dry_run = False
+    yaml_context.settings.checkpoint = True
+    try:
+        with (
+            mock.patch("dbt_osmosis.core.journal.get_journal_path", return_value=journal_path),
+            mock.patch(
+                "dbt_osmosis.core.path_management.get_current_yaml_path", return_value=schema
+            ),
+            mock.patch("dbt_osmosis.core.sync_operations.sync_node_to_yaml", _commit),
+        ):
+            with pytest.raises(RuntimeError):
+                _ = _run()
+            assert schema.read_text().count("# committed") == 1
+
+            yaml_context.settings.resume = True
+            marked.clear()
+            with pytest.raises(RuntimeError):
+                _ = _run()
+            assert marked == []
+
+            _ = schema.write_text("version: 2\n# edited by hand\n")
+            marked.clear()
+            fail[0] = False
+            pipeline = _run()
+            assert marked == [n.unique_id for n in nodes]
+            assert "resumed_steps" not in pipeline.metadata
+            assert not journal_path.exists()
+    finally:
+        yaml_context.settings.resume = False
+        yaml_context.settings.checkpoint = False
+        yaml_context.settings.dry_run = True
+        for n in nodes:
+            n.description = originals[n.unique_id]
+
+
+def _dag_nodes():
+    """a <- b <- c と a <- d の依存関係を持つノードを返します。"""
+    edges = {"a": [], "b": ["a"], "c": ["b"], "d": ["a"]}
+    return [SimpleNamespace(unique_id=uid, depends_on_nodes=edges[uid]) for uid in "cdba"]
+
+
+class _LifoPool:
+    """最後に投入されたタスクから実行する、ワーカー 1 つのプール。投入順 (FIFO) に依存しないことの確認用。"""
+
+    def __init__(self):
+        self._tasks: list[tuple[Future, t.Callable[..., t.Any], tuple[t.Any, ...]]] = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, fn, *args):
+        future: Future = Future()
+        with self._cond:
+            self._tasks.append((future, fn, args))
+            self._cond.notify()
+        return future
+
+    def _work(self):
+        # NOTE: let the caller queue everything it submits up front before the first pop
+        time.sleep(0.05)
+        while True:
+            with self._cond:
+                while not self._tasks:
+                    _ = self._cond.wait()
+                future, fn, args = self._tasks.pop()
+            try:
+                future.set_result(fn(*args))
+            except BaseException as error:
+                future.set_exception(error)
+
+
+def test_synthesize_in_dependency_order_never_blocks_workers():
+    """
+    ワーカーが上流の完了を待ってブロックしないため、LIFO 順のワーカー 1 つのプールでも完了することを確認します。
+    """
+    ran: list[str] = []
+    nodes = _dag_nodes()
+    runner = threading.Thread(
+        target=_synthesize_in_dependency_order,
+        args=(
+            SimpleNamespace(pool=_LifoPool()),
+            lambda _, node: ran.append(node.unique_id),
+            [nodes[3], nodes[2], nodes[0], nodes[1]],
+        ),
+        daemon=True,
+    )
+    runner.start()
+    runner.join(5)
+    assert not runner.is_alive()
+    assert ran.index("a") < ran.index("b") < ran.index("c")
+    assert ran.index("a") < ran.index("d")
+    assert sorted(ran) == ["a", "b", "c", "d"]
+
+
+def test_synthesize_in_dependency_order_skips_downstream_of_failures():
+    """
+    上流の合成が失敗すると下流のノードは実行されず、その例外が送出されることを確認します。
+    """
+    ran: list[str] = []
+
+    def op(_, node):
+        if node.unique_id == "b":
+            raise RuntimeError("rate limited")
+        ran.append(node.unique_id)
+
+    nodes = _dag_nodes()
+    with (
+        ThreadPoolExecutor(max_workers=2) as pool,
+        pytest.raises(RuntimeError, match="rate limited"),
+    ):
+        _synthesize_in_dependency_order(
+            SimpleNamespace(pool=pool), op, [nodes[3], nodes[2], nodes[0], nodes[1]]
+        )
+    assert "c" not in ran
+    assert sorted(ran) == ["a", "d"]
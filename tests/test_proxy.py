@@ -0,0 +1,180 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("mysql_mimic")
+
+from mysql_mimic.errors import MysqlError  # noqa: E402
+from mysql_mimic.session import Query  # noqa: E402
+from sqlglot import exp  # noqa: E402
+
+from dbt_osmosis.core.osmosis import DbtConfiguration, create_dbt_project_context  # noqa: E402
+from dbt_osmosis.sql.proxy import DbtSession, QueryExecutor, SchemaCache  # noqa: E402
+
+
+def test_query_executor_bounds_connections():
+    executor = QueryExecutor(size=2)
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    threads: set[str] = set()
+
+    def work(i: int) -> int:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return i
+
+    async def main() -> list[int]:
+        return await asyncio.gather(*(executor.run(work, i) for i in range(8)))
+
+    try:
+        assert asyncio.run(main()) == list(range(8))
+    finally:
+        executor.shutdown()
+    assert peak == 2
+    # NOTE: each slot is a single dedicated thread, so each holds its own adapter connection
+    assert len(threads) == 2
+    metrics = executor.metrics()
+    assert metrics["queries"] == 8
+    assert metrics["peak_queued"] >= 6
+    assert metrics["active"] == 0 and metrics["queued"] == 0
+
+
+def test_query_executor_rejects_when_queue_is_full():
+    executor = QueryExecutor(size=1, max_queued=1)
+
+    async def main():
+        return await asyncio.gather(
+            *(executor.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert sum(isinstance(r, MysqlError) for r in results) == 1
+    assert executor.metrics()["rejected"] == 1
+
+
+def test_query_executor_streams_on_a_leased_slot():
+    executor = QueryExecutor(size=1)
+    threads: set[str] = set()
+
+    def produce(n: int):
+        def chunks():
+            for start in range(0, n, 2):
+                threads.add(threading.current_thread().name)
+                yield [(i,) for i in range(start, min(start + 2, n))]
+
+        return ["i"], chunks()
+
+    async def main():
+        columns, rows = await executor.stream(produce, 5)
+        assert executor.metrics()["active"] == 1
+        return columns, [row async for row in rows]
+
+    try:
+        assert asyncio.run(main()) == (["i"], [(i,) for i in range(5)])
+    finally:
+        executor.shutdown()
+    # NOTE: every chunk is fetched on the same slot thread, which owns the adapter connection
+    assert len(threads) == 1
+    metrics = executor.metrics()
+    assert metrics["active"] == 0 and metrics["queries"] == 1
+
+
+def test_session_query_streams_from_duckdb(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("OSMOSIS_PROXY_FETCH_SIZE", "100")
+    monkeypatch.setenv("OSMOSIS_PROXY_MAX_ROWS", "250")
+    cfg = DbtConfiguration(project_dir="demo_duckdb", profiles_dir="demo_duckdb")
+    cfg.vars = {"dbt-osmosis": {}}
+    session = DbtSession(create_dbt_project_context(cfg))
+    sql = "SELECT range AS n FROM range(1000)"
+
+    async def main():
+        rows, columns = await session.query(exp.Command(this=sql), sql, {})
+        return columns, [row async for row in rows]
+
+    try:
+        columns, rows = asyncio.run(main())
+    finally:
+        session.executor.shutdown()
+    assert columns == ["n"]
+    # NOTE: fetching stops at the row cap instead of materializing the full result
+    assert rows == [(n,) for n in range(250)]
+    assert session.executor.metrics()["active"] == 0
+
+
+def _fake_manifest(description: str = "The order id"):
+    column = SimpleNamespace(name="id", data_type="int", description=description)
+    node = SimpleNamespace(
+        unique_id="model.p.orders", schema="main", name="orders", columns={"id": column}
+    )
+    return SimpleNamespace(sources={}, nodes={"model.p.orders": node})
+
+
+def test_schema_cache_rebuilds_only_on_manifest_change():
+    project = SimpleNamespace(manifest=_fake_manifest())
+    cache = SchemaCache(project)
+    first = cache.info_schema()
+    assert cache.info_schema() is first
+    assert cache.builds == 1
+
+    project.manifest = _fake_manifest("Reloaded")
+    assert cache.info_schema() is not first
+    assert cache.builds == 2
+
+    cache.invalidate()
+    _ = cache.info_schema()
+    assert cache.builds == 3
+
+
+class _RecordingWriter:
+    """YamlDocWriter の代替。編集されたノードを記録し、2 件ごとにバッチを満杯とみなします。"""
+
+    def __init__(self):
+        self.marked: list[str] = []
+        self.flushes = 0
+
+    def mark(self, node) -> bool:
+        self.marked.append(node.unique_id)
+        return len(self.marked) % 2 == 0
+
+    def flush(self) -> int:
+        self.flushes += 1
+        return 0
+
+
+def test_alter_comment_middleware_uses_index_and_batches_writes():
+    project = SimpleNamespace(manifest=_fake_manifest())
+    cache = SchemaCache(project)
+    writer = _RecordingWriter()
+    session = DbtSession(project, schema_cache=cache, doc_writer=writer)
+    _ = cache.info_schema()
+
+    async def alter(sql: str):
+        query = Query(exp.Command(this="ALTER"), sql, {}, [], None)  # pyright: ignore[reportArgumentType]
+        return await session._alter_table_comment_middleware(query)
+
+    _ = asyncio.run(alter("ALTER TABLE main.orders MODIFY COLUMN id int COMMENT 'Primary key';"))
+    _ = asyncio.run(alter("ALTER TABLE main.missing MODIFY COLUMN id int COMMENT 'x';"))
+    assert project.manifest.nodes["model.p.orders"].columns["id"].description == "Primary key"
+    assert writer.marked == ["model.p.orders"] and writer.flushes == 0
+
+    _ = asyncio.run(alter("ALTER TABLE main.orders COMMENT = 'All orders';"))
+    assert project.manifest.nodes["model.p.orders"].description == "All orders"
+    assert writer.flushes == 1
+    # NOTE: the edits invalidate the info schema, but the relation index is reused
+    _ = cache.info_schema()
+    assert cache.builds == 2
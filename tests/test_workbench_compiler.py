@@ -0,0 +1,89 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from dbt_osmosis.workbench.compiler import BackgroundCompiler, compile_into_app
+from dbt_osmosis.workbench.queries import has_pending_work
+
+
+@pytest.fixture
+def compiled():
+    """コンパイル関数の呼び出しと、完了通知を記録します。"""
+    calls: list[str] = []
+    published: list[tuple[str, bool]] = []
+    gate = threading.Event()
+
+    def compile_fn(sql: str) -> str:
+        _ = gate.wait(5)
+        calls.append(sql)
+        if "broken" in sql:
+            raise ValueError(f"cannot compile {sql}")
+        return sql.upper()
+
+    compiler = BackgroundCompiler(compile_fn, debounce=0.05)
+    yield compiler, calls, published, gate
+    compiler.shutdown()
+
+
+def _on_done(published):
+    return lambda sql, seconds, cached: published.append((sql, cached))
+
+
+def test_background_compiler_drops_superseded_edits(compiled):
+    compiler, calls, published, gate = compiled
+    futures = [compiler.submit(sql, "dev", _on_done(published)) for sql in ("a", "ab", "abc")]
+    gate.set()
+    assert futures[-1].result(timeout=5) == "ABC"
+    # NOTE: the first edit may already be sleeping out its debounce, the second never starts
+    assert futures[1].cancelled()
+    assert calls == ["abc"]
+    assert published == [("ABC", False)]
+    assert compiler.stats["superseded"] == 2
+
+
+def test_background_compiler_caches_by_sql_and_target(compiled):
+    compiler, calls, published, gate = compiled
+    gate.set()
+    assert compiler.submit("a", "dev", _on_done(published)).result(timeout=5) == "A"
+    assert compiler.submit("a", "dev", _on_done(published)).result(timeout=5) == "A"
+    assert compiler.submit("a", "prod", _on_done(published)).result(timeout=5) == "A"
+    assert calls == ["a", "a"]
+    assert published == [("A", False), ("A", True), ("A", False)]
+
+
+def test_background_compiler_does_not_cache_errors(compiled):
+    compiler, calls, published, gate = compiled
+    gate.set()
+    for _ in range(2):
+        result = compiler.submit("broken", "dev", _on_done(published)).result(timeout=5)
+        assert result == "cannot compile broken"
+    assert calls == ["broken", "broken"]
+
+
+def test_slow_compile_is_published_while_polling(compiled):
+    compiler, calls, _, gate = compiled
+    app = SimpleNamespace(
+        compiler=compiler,
+        compiled_query="OLD",
+        compile_state="compiled",
+        compile_latency_ms=0.0,
+        query_state="idle",
+        profile_state="idle",
+    )
+    # NOTE: the compile outlasts the wait, so the editor keeps the previous SQL for now
+    assert compile_into_app(app, "select 1", "dev", wait=0.01) == "OLD"
+    assert app.compile_state == "compiling"
+    assert has_pending_work(app)
+
+    gate.set()
+    deadline = time.monotonic() + 5
+    while has_pending_work(app) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not has_pending_work(app)
+    assert app.compile_state == "compiled"
+    assert app.compiled_query == "SELECT 1"
+    assert calls == ["select 1"]
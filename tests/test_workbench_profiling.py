@@ -0,0 +1,77 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import random
+from collections import Counter
+
+from dbt_osmosis.workbench.profiling import ProfileRunner, reservoir_sample
+
+
+def test_reservoir_sample_is_uniform_and_deterministic():
+    assert reservoir_sample(range(3), 5) == [0, 1, 2]
+    assert reservoir_sample(range(100), 10, random.Random("a")) == reservoir_sample(
+        range(100), 10, random.Random("a")
+    )
+
+    counts: Counter[int] = Counter()
+    rng = random.Random(0)
+    for _ in range(4000):
+        sample = reservoir_sample(iter(range(20)), 5, rng)
+        assert len(set(sample)) == 5
+        counts.update(sample)
+    # each of the 20 items is expected 1000 times (4000 * 5 / 20)
+    assert set(counts) == set(range(20))
+    assert all(850 < c < 1150 for c in counts.values())
+
+
+class _Frame:
+    """len と iloc だけを実装した DataFrame の代替。"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.iloc = self
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, positions):
+        return _Frame(self.rows[i] for i in positions)
+
+
+def test_profile_runner_samples_and_caches():
+    built: list[tuple[int, bool]] = []
+    published: list[tuple[str, bool]] = []
+
+    def build_html(df, minimal):
+        built.append((len(df), minimal))
+        return f"<p>{len(df)}</p>"
+
+    runner = ProfileRunner(build_html, sample_size=50)
+    frame = _Frame(range(1000))
+
+    def on_done(html, cached):
+        published.append((html, cached))
+
+    try:
+        assert runner.submit(frame, "hash", True, on_done).result(timeout=5) == "<p>50</p>"
+        assert runner.submit(frame, "hash", True, on_done).result(timeout=5) == "<p>50</p>"
+        _ = runner.submit(frame, "hash", False, on_done).result(timeout=5)
+    finally:
+        runner.shutdown()
+    assert built == [(50, True), (50, False)]
+    assert published == [("<p>50</p>", False), ("<p>50</p>", True), ("<p>50</p>", False)]
+    assert runner.sample(frame, "hash").rows == runner.sample(frame, "hash").rows
+    assert runner.sample(frame, "hash").rows == sorted(runner.sample(frame, "hash").rows)
+
+
+def test_profile_runner_reports_failures():
+    def build_html(df, minimal):
+        raise RuntimeError("<boom>")
+
+    runner = ProfileRunner(build_html)
+    published: list[str] = []
+    try:
+        html = runner.submit(_Frame(range(3)), "x", True, lambda h, c: published.append(h))
+        assert html.result(timeout=5) == "<pre>Profiling failed: &lt;boom&gt;</pre>"
+    finally:
+        runner.shutdown()
+    assert published == [html.result()]
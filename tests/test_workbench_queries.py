@@ -0,0 +1,135 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from dbt_osmosis.workbench.queries import QueryRunner, ThreadConnectionCancel
+
+
+@pytest.fixture
+def runner():
+    runner = QueryRunner()
+    yield runner
+    runner.shutdown()
+
+
+def _submit(runner, fetch, **kwargs):
+    done = threading.Event()
+    handle = runner.submit(fetch, on_done=lambda _: done.set(), **kwargs)
+    assert done.wait(5)
+    return handle
+
+
+def test_query_runner_reports_progress_and_result(runner):
+    seen: list[int] = []
+
+    def fetch(progress):
+        for fetched in (10, 20, 25):
+            progress(fetched)
+            seen.append(fetched)
+        return "frame"
+
+    handle = _submit(runner, fetch)
+    assert handle.state == "success" and handle.result == "frame"
+    assert handle.rows_fetched == 25 and seen == [10, 20, 25]
+    assert not handle.cancel()
+
+
+def test_query_runner_cancels_through_the_adapter(runner):
+    started, interrupted = threading.Event(), threading.Event()
+    hook_calls: list[str] = []
+
+    def cancel_hook():
+        hook_calls.append("cancel")
+        interrupted.set()
+
+    def fetch(progress):
+        progress(5)
+        started.set()
+        # NOTE: stands in for a warehouse query that only returns once the adapter interrupts it
+        assert interrupted.wait(5)
+        raise RuntimeError("INTERRUPT")
+
+    done = threading.Event()
+    handle = runner.submit(fetch, on_done=lambda _: done.set(), cancel_hook=cancel_hook)
+    assert started.wait(5)
+    assert handle.cancel()
+    assert done.wait(5)
+    assert handle.state == "cancelled"
+    assert hook_calls == ["cancel"]
+    assert handle.rows_fetched == 5
+
+
+def test_query_runner_times_out_between_chunks(runner):
+    def cancel_hook():
+        raise NotImplementedError
+
+    def fetch(progress):
+        fetched = 0
+        while True:
+            fetched += 1
+            progress(fetched)
+            threading.Event().wait(0.01)
+
+    handle = _submit(runner, fetch, cancel_hook=cancel_hook, timeout=0.1)
+    assert handle.state == "timeout"
+    assert handle.elapsed >= 0.1
+
+
+def test_query_runner_surfaces_errors(runner):
+    def fetch(progress):
+        raise ValueError("syntax error at or near 'selec'")
+
+    handle = _submit(runner, fetch)
+    assert handle.state == "error"
+    assert handle.error == "syntax error at or near 'selec'"
+
+
+class _FakeConnections:
+    """dbt の接続マネージャーの代替。スレッドごとの接続と、キャンセルされた接続を記録します。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread_connections: dict[int, SimpleNamespace] = {}
+        self.cancelled: list[str] = []
+
+    @staticmethod
+    def get_thread_identifier() -> int:
+        return threading.get_ident()
+
+    def open(self, name: str) -> None:
+        self.thread_connections[self.get_thread_identifier()] = SimpleNamespace(
+            name=name, handle=object(), state="open"
+        )
+
+    def cancel(self, connection) -> None:
+        self.cancelled.append(connection.name)
+
+
+def test_thread_connection_cancel_only_targets_the_query_thread(runner):
+    connections = _FakeConnections()
+    connections.open("other-session")
+    cancel_hook = ThreadConnectionCancel(SimpleNamespace(connections=connections))
+    # NOTE: a cancel before the query thread binds has nothing to interrupt
+    cancel_hook()
+    assert connections.cancelled == []
+
+    started = threading.Event()
+
+    def fetch(progress):
+        cancel_hook.bind()
+        connections.open("workbench-query")
+        started.set()
+        while True:
+            progress(1)
+            threading.Event().wait(0.01)
+
+    done = threading.Event()
+    handle = runner.submit(fetch, on_done=lambda _: done.set(), cancel_hook=cancel_hook)
+    assert started.wait(5)
+    assert handle.cancel()
+    assert done.wait(5)
+    assert handle.state == "cancelled"
+    assert connections.cancelled == ["workbench-query"]
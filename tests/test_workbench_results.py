@@ -0,0 +1,36 @@
+# pyright: reportPrivateUsage=false, reportUnknownParameterType=false, reportMissingParameterType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportUnknownVariableType=false
+
+from dbt_osmosis.workbench.results import ResultPager, sort_order
+
+COLUMNS = {
+    "0": ["b", "a", "c", "a", None],
+    "1": [2, 3, float("nan"), 1, 5],
+    "2": [1, "x", 2, None, "y"],
+}
+
+
+def test_sort_order_is_stable_and_puts_nulls_last():
+    assert sort_order(COLUMNS.__getitem__, [{"field": "0", "sort": "asc"}], 5) == [1, 3, 0, 2, 4]
+    assert sort_order(COLUMNS.__getitem__, [{"field": "1", "sort": "desc"}], 5) == [4, 1, 0, 3, 2]
+    multi = [{"field": "0", "sort": "asc"}, {"field": "1", "sort": "desc"}]
+    assert sort_order(COLUMNS.__getitem__, multi, 5) == [1, 3, 0, 2, 4]
+    # NOTE: mixed types fall back to comparing the text
+    assert sort_order(COLUMNS.__getitem__, [{"field": "2", "sort": "asc"}], 5) == [0, 2, 1, 4, 3]
+
+
+def test_result_pager_caches_the_row_order_per_result_and_sort():
+    pager = ResultPager(cache_size=2)
+    asc = [{"field": "1", "sort": "asc"}]
+    assert pager.order("r1", [], COLUMNS.__getitem__, 5) is None
+
+    first = pager.order("r1", asc, COLUMNS.__getitem__, 5)
+    assert first == [3, 0, 1, 4, 2]
+    assert pager.order("r1", asc, COLUMNS.__getitem__, 5) is first
+    assert pager.sorts == 1
+
+    _ = pager.order("r2", asc, COLUMNS.__getitem__, 5)
+    _ = pager.order("r1", [{"field": "1", "sort": "desc"}], COLUMNS.__getitem__, 5)
+    assert pager.sorts == 3
+    # NOTE: the least recently used order was evicted
+    assert pager.order("r1", asc, COLUMNS.__getitem__, 5) == first
+    assert pager.sorts == 4